@@ -0,0 +1,3 @@
+"""
+Offline tools that measure the performance of the bot without connecting to Discord.
+"""
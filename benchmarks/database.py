@@ -0,0 +1,269 @@
+"""
+Measures the warn throughput of the data layer on a temporary database file.
+
+A burst of concurrent ``add_warn`` calls, like moderators mass-warning during a raid, is committed
+once with a write per transaction (``batch_size=1``) and once with the default write-behind batches.
+
+Then tasks keep adding warns while others keep looking warnings up, for a few seconds, to count the
+inserts and lookups per second under concurrent load. Lookups go straight to the database instead
+of the warning cache, so they exercise the reader pool. The load runs on the bot's configuration, WAL
+with 4 readers, on a single reader, and on the rollback journal and full sync SQLite defaults to.
+
+With ``--backend postgres``, the same runs go to the server of ``DATABASE_URL`` instead. They only
+touch the warns of their own guild, which are deleted first.
+
+Usage: python -m benchmarks.database [--backend sqlite] [--burst 1000] [--batch-size 100] [--duration 5]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.load import percentiles
+from benchmarks.startup import ROOT
+
+GUILD_ID = 100000000000000000
+MODERATOR_ID = 200000000000000000
+MEMBER_IDS = 300000000000000000
+
+
+def rollback_journal_database(path: str, *, readers: int):
+    import aiosqlite
+
+    from database.sqlite import PRAGMAS, SQLiteDatabase
+
+    # What the file used before the data layer: a rollback journal and an fsync per commit
+    pragmas = tuple(
+        pragma
+        for pragma in PRAGMAS
+        if not pragma.startswith(("PRAGMA journal_mode", "PRAGMA synchronous"))
+    ) + ("PRAGMA journal_mode=DELETE", "PRAGMA synchronous=FULL")
+
+    class RollbackJournalDatabase(SQLiteDatabase):
+        async def open_connection(self, *, read_only: bool) -> aiosqlite.Connection:
+            connection = await aiosqlite.connect(
+                self.path, isolation_level=None, cached_statements=self.statement_cache
+            )
+            for pragma in pragmas:
+                await connection.execute(pragma)
+            if read_only:
+                await connection.execute("PRAGMA query_only=ON")
+            self.connections.append(connection)
+            return connection
+
+    return RollbackJournalDatabase(path, readers=readers)
+
+
+async def open_manager(database, *, batch_size: int):
+    from database import DatabaseManager
+    from database.migrate import MigrationRunner
+
+    await database.connect()
+    await MigrationRunner(database).run()
+    # A shared server keeps the warns of previous runs
+    await database.execute("DELETE FROM warns WHERE server_id=?", (GUILD_ID,))
+    return DatabaseManager(database=database, batch_size=batch_size)
+
+
+async def timed(coroutine, latencies: list):
+    started_at = time.perf_counter()
+    result = await coroutine
+    latencies.append(time.perf_counter() - started_at)
+    return result
+
+
+async def burst(database, *, warns: int, members: int, batch_size: int) -> dict:
+    """
+    Adds warns concurrently, spread over the members of a guild.
+
+    :param database: The database, not connected yet.
+    :param warns: The number of concurrent warns.
+    :param members: The number of members the warns are spread over.
+    :param batch_size: The maximum number of writes committed together.
+    """
+    manager = await open_manager(database, batch_size=batch_size)
+    latencies = []
+    try:
+        started_at = time.perf_counter()
+        warn_ids = await asyncio.gather(
+            *(
+                timed(
+                    manager.add_warn(MEMBER_IDS + number % members, GUILD_ID, MODERATOR_ID, "Raid"),
+                    latencies,
+                )
+                for number in range(warns)
+            )
+        )
+        elapsed = time.perf_counter() - started_at
+        stats = manager.writes.stats()
+    finally:
+        await manager.close()
+    # Every member got consecutive IDs, however the writes were grouped
+    assert sorted(warn_ids) == sorted(
+        number // members + 1 for number in range(warns)
+    ), "Duplicate warn IDs"
+    return {
+        "elapsed": elapsed,
+        "warns_per_second": warns / elapsed,
+        "commits": stats["flushes"],
+        "average_batch": stats["average_batch"],
+        "latency": percentiles(latencies),
+    }
+
+
+async def load(
+    database,
+    *,
+    duration: float,
+    writers: int,
+    lookups: int,
+    members: int,
+    batch_size: int,
+    seed: int,
+) -> dict:
+    """
+    Adds warns and looks warnings up from concurrent tasks for a while.
+
+    :param database: The database, not connected yet.
+    :param duration: The number of seconds the load lasts.
+    :param writers: The number of tasks adding warns one after the other.
+    :param lookups: The number of tasks looking warnings up one after the other.
+    :param members: The number of members the warns and lookups are spread over.
+    :param batch_size: The maximum number of writes committed together.
+    :param seed: The seed of the member choices.
+    """
+    from database import WARNINGS_QUERY
+
+    manager = await open_manager(database, batch_size=batch_size)
+    rng = random.Random(seed)
+    insert_latencies = []
+    lookup_latencies = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def write() -> None:
+        while loop.time() < deadline:
+            member = MEMBER_IDS + rng.randrange(members)
+            await timed(manager.add_warn(member, GUILD_ID, MODERATOR_ID, "Spam"), insert_latencies)
+
+    async def look_up() -> None:
+        while loop.time() < deadline:
+            member = MEMBER_IDS + rng.randrange(members)
+            await timed(manager.database.fetchall(WARNINGS_QUERY, (GUILD_ID, member)), lookup_latencies)
+
+    try:
+        started_at = time.perf_counter()
+        await asyncio.gather(*(write() for _ in range(writers)), *(look_up() for _ in range(lookups)))
+        elapsed = time.perf_counter() - started_at
+    finally:
+        await manager.close()
+    return {
+        "inserts_per_second": len(insert_latencies) / elapsed,
+        "lookups_per_second": len(lookup_latencies) / elapsed,
+        "insert_latency": percentiles(insert_latencies),
+        "lookup_latency": percentiles(lookup_latencies),
+    }
+
+
+async def run(arguments: argparse.Namespace, directory: str) -> dict:
+    from database.postgres import PostgresDatabase
+    from database.sqlite import SQLiteDatabase
+
+    if arguments.backend == "postgres":
+        dsn = os.getenv("DATABASE_URL")
+        configurations = {"postgres": lambda: PostgresDatabase(dsn)}
+    else:
+        # Every run gets a file of its own
+        paths = (os.path.join(directory, f"{number}.db") for number in range(100))
+        configurations = {
+            "wal, 4 readers": lambda: SQLiteDatabase(next(paths), readers=4),
+            "wal, 1 reader": lambda: SQLiteDatabase(next(paths), readers=1),
+            "rollback journal": lambda: rollback_journal_database(next(paths), readers=4),
+        }
+    default = next(iter(configurations.values()))
+
+    report = {"burst": {}, "load": {}}
+    for batch_size in (1, arguments.batch_size):
+        report["burst"][batch_size] = await burst(
+            default(), warns=arguments.burst, members=arguments.members, batch_size=batch_size
+        )
+    for name, database in configurations.items():
+        report["load"][name] = await load(
+            database(),
+            duration=arguments.duration,
+            writers=arguments.writers,
+            lookups=arguments.lookups,
+            members=arguments.members,
+            batch_size=arguments.batch_size,
+            seed=arguments.seed,
+        )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--backend",
+        choices=["sqlite", "postgres"],
+        default="sqlite",
+        help="The storage backend, postgres connects to DATABASE_URL.",
+    )
+    parser.add_argument("--burst", type=int, default=1000, help="The number of concurrent warns.")
+    parser.add_argument(
+        "--members", type=int, default=50, help="The number of members the warns are spread over."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="The batch size compared with one write per transaction, the default of the bot.",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=5.0, help="The number of seconds every load lasts."
+    )
+    parser.add_argument(
+        "--writers", type=int, default=50, help="The number of tasks adding warns during the load."
+    )
+    parser.add_argument(
+        "--lookups",
+        type=int,
+        default=50,
+        help="The number of tasks looking warnings up during the load.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the member choices.")
+    parser.add_argument(
+        "--directory",
+        default=None,
+        help="Where the database files are created, a temporary folder by default.",
+    )
+    arguments = parser.parse_args()
+    if arguments.backend == "postgres" and not os.getenv("DATABASE_URL"):
+        parser.error("the postgres backend needs the DATABASE_URL environment variable")
+
+    sys.path.insert(0, ROOT)
+    with tempfile.TemporaryDirectory(dir=arguments.directory) as directory:
+        report = asyncio.run(run(arguments, directory))
+
+    print(f"{arguments.burst} concurrent warns")
+    print(f"{'batch':>6} {'elapsed':>9} {'warns/s':>9} {'commits':>8} {'p50':>9} {'p99':>9}")
+    for batch_size, result in report["burst"].items():
+        latency = result["latency"]
+        print(
+            f"{batch_size:>6} {result['elapsed'] * 1000:>7.0f}ms {result['warns_per_second']:>9.0f} {result['commits']:>8} {latency['p50']:>7.1f}ms {latency['p99']:>7.1f}ms"
+        )
+
+    print()
+    print(f"{arguments.writers} writers and {arguments.lookups} lookups for {arguments.duration:g}s")
+    print(f"{'database':<18} {'inserts/s':>10} {'insert p99':>11} {'lookups/s':>10} {'lookup p99':>11}")
+    for name, result in report["load"].items():
+        print(
+            f"{name:<18} {result['inserts_per_second']:>10.0f} {result['insert_latency']['p99']:>9.1f}ms {result['lookups_per_second']:>10.0f} {result['lookup_latency']['p99']:>9.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
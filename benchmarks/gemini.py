@@ -0,0 +1,110 @@
+"""
+Measures how much concurrent Gemini calls delay the event loop.
+
+Fires concurrent ``GeminiClient.chat`` calls at a fake model that blocks its thread like the real
+SDK, and samples the event loop lag while they run. The same calls made directly on the loop, as
+the cogs used to, are timed as well for comparison.
+
+Usage: python -m benchmarks.gemini [--calls 50] [--latency 0.2] [--max-concurrency 8]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from benchmarks.load import FakeLatency, FakeModel, percentiles
+from benchmarks.startup import ROOT
+
+
+async def sample_lag(lags: list, interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(loop.time() - expected, 0.0))
+
+
+async def measure(calls, count: int) -> dict:
+    """
+    Runs calls concurrently while sampling the loop lag.
+
+    :param calls: A coroutine function making one call.
+    :param count: The number of concurrent calls.
+    """
+    lags = []
+    sampler = asyncio.create_task(sample_lag(lags, 0.01))
+    # Let the sampler take its first sample before the calls start
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    await asyncio.gather(*(calls(number) for number in range(count)))
+    elapsed = time.perf_counter() - start
+    # A sampler delayed by blocking calls only records it once it gets to run again
+    await asyncio.sleep(0.02)
+    sampler.cancel()
+    return {"elapsed": elapsed, "loop_lag": percentiles(lags)}
+
+
+async def run(arguments: argparse.Namespace) -> dict:
+    sys.path.insert(0, ROOT)
+    from helpers.gemini import GeminiClient
+
+    latency = FakeLatency(arguments.latency, random.Random(arguments.seed))
+    client = GeminiClient(
+        api_key=None,
+        max_concurrency=arguments.max_concurrency,
+        model_factory=lambda **kwargs: FakeModel(latency, 1, **kwargs),
+    )
+
+    async def chat(number: int) -> None:
+        await client.chat([], f"Question {number}")
+
+    model = FakeModel(latency, 1)
+
+    async def inline(number: int) -> None:
+        model.generate_content([{"role": "user", "parts": [f"Question {number}"]}])
+
+    try:
+        report = {"client": await measure(chat, arguments.calls)}
+        if not arguments.skip_inline:
+            report["inline"] = await measure(inline, arguments.calls)
+    finally:
+        client.close()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50, help="The number of concurrent calls.")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.2,
+        help="The mean latency of the fake model, in seconds.",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=8,
+        help="The number of calls the client runs at the same time.",
+    )
+    parser.add_argument(
+        "--skip-inline",
+        action="store_true",
+        help="Do not time the calls made directly on the event loop.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the latency jitter.")
+    arguments = parser.parse_args()
+
+    report = asyncio.run(run(arguments))
+    print(f"{'path':<8} {'elapsed':>9} {'lag p50':>9} {'lag p95':>9} {'lag p99':>9} {'lag max':>9}")
+    for name, result in report.items():
+        lag = result["loop_lag"]
+        print(
+            f"{name:<8} {result['elapsed'] * 1000:>7.0f}ms {lag['p50']:>7.1f}ms {lag['p95']:>7.1f}ms {lag['p99']:>7.1f}ms {lag['max']:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,587 @@
+"""
+Replays synthetic command traffic against the bot, without connecting to Discord.
+
+The bot logs in against the same stubbed gateway as the startup benchmark and gets a fake guild.
+Messages are built from gateway payloads and handed to ``on_message`` and the ``on_message``
+listeners of the cogs like real ones, so prefixes, checks and converters all run. The REST calls
+of discord.py, Gemini and the HTTP APIs are replaced by fakes answering after a set latency.
+
+Every scenario sends messages at a fixed rate, and the latency of a message is measured from the
+moment it was due, so a saturated bot cannot hide its backlog. The event loop lag is sampled during
+the whole run.
+
+Usage: python -m benchmarks.load [--duration 10] [--rate ask=5 --rate warn=20 ...] [--output load.json]
+"""
+
+import argparse
+import asyncio
+import base64
+import functools
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+from benchmarks.startup import FAKE_USER, ROOT, peak_rss_mb, stub_login
+
+GUILD_ID = 100000000000000000
+CHANNEL_ID = 200000000000000000
+MEMBER_IDS = 300000000000000000
+
+# Messages per second of every scenario when no rate is given
+DEFAULT_RATES = {
+    "ask": 5,
+    "mention": 5,
+    "warn": 20,
+    "purge": 2,
+    "help": 20,
+    "bitcoin": 10,
+    "randomfact": 10,
+}
+
+ANSWER = "This is a fake answer from the load test, long enough to be streamed in a few chunks. " * 4
+
+# A 1x1 PNG, served as every downloaded image
+PIXEL = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+
+
+def user_payload(user_id: int, name: str) -> dict:
+    return {
+        "id": str(user_id),
+        "username": name,
+        "discriminator": "0",
+        "global_name": None,
+        "avatar": None,
+        "bot": False,
+    }
+
+
+def scenario_content(name: str, number: int, prefix: str, target: int) -> str:
+    """
+    Returns the content of a message of a scenario.
+
+    :param name: The name of the scenario.
+    :param number: The number of the message within its scenario.
+    :param prefix: The prefix of the bot.
+    :param target: The member that commands acting on someone should target.
+    """
+    if name == "ask":
+        return f"{prefix}ask What is the answer to question {number}?"
+    if name == "mention":
+        return f"Hey <@{FAKE_USER['id']}>, what is the answer to question {number}?"
+    if name == "warn":
+        return f"{prefix}warn add <@{target}> Load test warning {number}"
+    if name == "purge":
+        return f"{prefix}purge 10"
+    return f"{prefix}{name}"
+
+
+def percentiles(values: list) -> dict:
+    # Nearest-rank percentiles, in milliseconds
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(values)
+
+    def rank(fraction: float) -> float:
+        return ordered[max(int(fraction * len(ordered) + 0.999999) - 1, 0)] * 1000
+
+    return {
+        "p50": rank(0.50),
+        "p95": rank(0.95),
+        "p99": rank(0.99),
+        "max": ordered[-1] * 1000,
+    }
+
+
+class FakeLatency:
+    def __init__(self, seconds: float, rng: random.Random) -> None:
+        self.seconds = seconds
+        self.rng = rng
+        self.calls = 0
+
+    def next(self) -> float:
+        # Spread the latency around its mean, so that calls do not all finish in lockstep
+        self.calls += 1
+        return self.seconds * self.rng.uniform(0.5, 1.5)
+
+    async def wait(self) -> None:
+        await asyncio.sleep(self.next())
+
+
+class FakeModel:
+    """
+    Stands in for a Gemini model. It blocks the calling worker thread like the real SDK does.
+    """
+
+    def __init__(self, latency: FakeLatency, chunks: int, **kwargs) -> None:
+        self.latency = latency
+        self.chunks = chunks
+
+    def generate_content(self, contents, stream: bool = False):
+        if not stream:
+            time.sleep(self.latency.next())
+            return SimpleNamespace(text=ANSWER)
+        return self.stream()
+
+    def stream(self):
+        size = len(ANSWER) // self.chunks + 1
+        delay = self.latency.next() / self.chunks
+        for start in range(0, len(ANSWER), size):
+            time.sleep(delay)
+            yield SimpleNamespace(text=ANSWER[start : start + size])
+
+
+class FakeDiscord:
+    """
+    Answers the REST calls discord.py makes for the commands, instead of the Discord API.
+    """
+
+    def __init__(self, bot, latency: FakeLatency) -> None:
+        import discord
+
+        self.discord = discord
+        self.bot = bot
+        self.latency = latency
+        self.sequence = itertools.count()
+
+    def snowflake(self) -> int:
+        now = self.discord.utils.utcnow()
+        return self.discord.utils.time_snowflake(now) + (next(self.sequence) & 0x3FFFFF)
+
+    def message_payload(
+        self,
+        channel_id: int,
+        author: dict,
+        content: str,
+        *,
+        message_id: int = 0,
+        embeds: list = (),
+        mentions: list = (),
+    ) -> dict:
+        payload = {
+            "id": str(message_id or self.snowflake()),
+            "channel_id": str(channel_id),
+            "author": author,
+            "content": content,
+            "timestamp": self.discord.utils.utcnow().isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": list(mentions),
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": list(embeds),
+            "pinned": False,
+            "type": 0,
+        }
+        if channel_id == CHANNEL_ID:
+            payload["guild_id"] = str(GUILD_ID)
+            if not author.get("bot"):
+                payload["member"] = {"roles": [], "joined_at": payload["timestamp"], "flags": 0}
+        return payload
+
+    def install(self) -> None:
+        for name in (
+            "send_message",
+            "edit_message",
+            "send_typing",
+            "add_reaction",
+            "delete_message",
+            "delete_messages",
+            "logs_from",
+            "start_private_message",
+        ):
+            setattr(self.bot.http, name, getattr(self, name))
+
+    async def send_message(self, channel_id: int, *, params) -> dict:
+        await self.latency.wait()
+        return self.message_payload(
+            int(channel_id),
+            FAKE_USER,
+            params.payload.get("content") or "",
+            embeds=params.payload.get("embeds") or [],
+        )
+
+    async def edit_message(self, channel_id: int, message_id: int, *, params) -> dict:
+        await self.latency.wait()
+        return self.message_payload(
+            int(channel_id),
+            FAKE_USER,
+            params.payload.get("content") or "",
+            message_id=int(message_id),
+            embeds=params.payload.get("embeds") or [],
+        )
+
+    async def send_typing(self, channel_id: int) -> None:
+        await self.latency.wait()
+
+    async def add_reaction(self, channel_id: int, message_id: int, emoji: str) -> None:
+        await self.latency.wait()
+
+    async def delete_message(self, channel_id: int, message_id: int, *, reason=None) -> None:
+        await self.latency.wait()
+
+    async def delete_messages(self, channel_id: int, message_ids: list, *, reason=None) -> None:
+        await self.latency.wait()
+
+    async def logs_from(
+        self, channel_id: int, limit: int, before=None, after=None, around=None
+    ) -> list:
+        await self.latency.wait()
+        author = user_payload(MEMBER_IDS, "member0")
+        return [self.message_payload(int(channel_id), author, "Old message") for _ in range(limit)]
+
+    async def start_private_message(self, user_id: int) -> dict:
+        await self.latency.wait()
+        return {
+            "id": str(self.snowflake()),
+            "type": 1,
+            "last_message_id": None,
+            "recipients": [user_payload(int(user_id), f"member{int(user_id) - MEMBER_IDS}")],
+        }
+
+
+def fake_http_client(latency: FakeLatency):
+    """
+    Returns an HTTP client answering the APIs the cogs use with canned data.
+
+    :param latency: The latency of every request.
+    """
+    from helpers.http import HTTPClient, HTTPResponse
+
+    class FakeHTTPClient(HTTPClient):
+        def __init__(self) -> None:
+            # No session is needed, but the latency histograms still feed the httpstats command
+            self.latencies = {}
+
+        async def request(self, method: str, url: str, **kwargs) -> HTTPResponse:
+            host = urlparse(url).hostname or ""
+            started_at = time.perf_counter()
+            await latency.wait()
+            if host == "api.coindesk.com":
+                body = {"bpi": {"USD": {"rate": "64,123.4567"}}}
+            elif host == "uselessfacts.jsph.pl":
+                body = {"text": "Load tests are faster with fake APIs."}
+            elif host == "api.pexels.com":
+                body = {"photos": [{"id": 1, "src": {"original": "https://images.pexels.com/1.png"}}]}
+            else:
+                body = None
+            self.histogram(host).observe((time.perf_counter() - started_at) * 1000)
+            if body is None:
+                return HTTPResponse(200, {"Content-Type": "image/png"}, PIXEL)
+            return HTTPResponse(200, {"Content-Type": "application/json"}, json.dumps(body).encode())
+
+        async def close(self) -> None:
+            pass
+
+    return FakeHTTPClient()
+
+
+class LoadTest:
+    def __init__(self, bot, fake: FakeDiscord, *, users: int) -> None:
+        self.bot = bot
+        self.fake = fake
+        self.users = users
+        self.latencies = {}
+        self.errors = {}
+        self.sent = {}
+        self.scenarios = {}
+        self.lag = []
+
+    def create_guild(self) -> None:
+        """
+        Adds a guild with a text channel and a few members to the cache of the bot. Everyone has
+        every permission, so no command is refused by its checks.
+        """
+        import discord
+
+        state = self.bot._connection
+        everyone = str(discord.Permissions.all().value)
+        guild = state._add_guild_from_data(
+            {
+                "id": str(GUILD_ID),
+                "name": "Load test",
+                "owner_id": str(MEMBER_IDS),
+                "member_count": self.users + 1,
+                "roles": [
+                    {
+                        "id": str(GUILD_ID),
+                        "name": "@everyone",
+                        "permissions": everyone,
+                        "position": 0,
+                        "color": 0,
+                        "hoist": False,
+                        "managed": False,
+                        "mentionable": False,
+                    }
+                ],
+                "channels": [
+                    {
+                        "id": str(CHANNEL_ID),
+                        "type": 0,
+                        "name": "load-test",
+                        "position": 0,
+                        "permission_overwrites": [],
+                    }
+                ],
+                "members": [],
+            }
+        )
+        joined_at = discord.utils.utcnow().isoformat()
+        members = [(int(FAKE_USER["id"]), FAKE_USER)] + [
+            (MEMBER_IDS + i, user_payload(MEMBER_IDS + i, f"member{i}"))
+            for i in range(self.users)
+        ]
+        for member_id, user in members:
+            guild._add_member(
+                discord.Member(
+                    data={"user": user, "roles": [], "joined_at": joined_at, "flags": 0},
+                    guild=guild,
+                    state=state,
+                )
+            )
+        self.channel = guild.get_channel(CHANNEL_ID)
+
+    def build_message(self, name: str, number: int):
+        author = MEMBER_IDS + number % self.users
+        target = MEMBER_IDS + (number + 1) % self.users
+        content = scenario_content(name, number, self.bot.config["prefix"], target)
+        mentions = []
+        if name == "mention":
+            mentions.append(FAKE_USER)
+        elif name == "warn":
+            mentions.append(user_payload(target, f"member{target - MEMBER_IDS}"))
+        payload = self.fake.message_payload(
+            CHANNEL_ID,
+            user_payload(author, f"member{author - MEMBER_IDS}"),
+            content,
+            mentions=mentions,
+        )
+        return self.bot._connection.create_message(channel=self.channel, data=payload)
+
+    def record_error(self, name: str, error: BaseException) -> None:
+        errors = self.errors.setdefault(name, {})
+        errors[type(error).__name__] = errors.get(type(error).__name__, 0) + 1
+
+    async def on_command_error(self, context, error) -> None:
+        name = self.scenarios.get(context.message.id)
+        if name is not None:
+            self.record_error(name, getattr(error, "original", error))
+
+    async def deliver(self, name: str, number: int, due: float) -> None:
+        # The gateway would dispatch the message to the bot and to every cog listening for it
+        message = self.build_message(name, number)
+        self.scenarios[message.id] = name
+        handlers = [self.bot.on_message(message)] + [
+            listener(message) for listener in self.bot.extra_events.get("on_message", [])
+        ]
+        for result in await asyncio.gather(*handlers, return_exceptions=True):
+            if isinstance(result, BaseException):
+                self.record_error(name, result)
+        self.latencies[name].append(asyncio.get_running_loop().time() - due)
+
+    async def drive(self, name: str, rate: float, duration: float) -> None:
+        """
+        Sends the messages of a scenario at a fixed rate, without waiting for the previous ones.
+
+        :param name: The name of the scenario.
+        :param rate: The number of messages per second.
+        :param duration: The number of seconds messages are sent for.
+        """
+        loop = asyncio.get_running_loop()
+        self.latencies[name] = []
+        tasks = []
+        start = loop.time()
+        for number in range(int(rate * duration)):
+            due = start + number / rate
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.deliver(name, number, due)))
+        self.sent[name] = len(tasks)
+        await asyncio.gather(*tasks)
+
+    async def sample_lag(self, interval: float) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            self.lag.append(max(loop.time() - expected, 0.0))
+
+    async def run(self, rates: dict, duration: float) -> dict:
+        self.create_guild()
+        self.bot.add_listener(self.on_command_error)
+        sampler = asyncio.create_task(self.sample_lag(0.01))
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(self.drive(name, rate, duration) for name, rate in rates.items())
+        )
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+        self.bot.remove_listener(self.on_command_error)
+
+        commands = {}
+        for name, rate in rates.items():
+            commands[name] = {
+                "rate": rate,
+                "sent": self.sent[name],
+                "errors": self.errors.get(name, {}),
+                **percentiles(self.latencies[name]),
+            }
+        return {
+            "elapsed": elapsed,
+            "commands": commands,
+            "loop_lag": percentiles(self.lag),
+        }
+
+
+async def load(arguments: argparse.Namespace, rates: dict) -> dict:
+    """
+    Boots the bot in this process and runs the scenarios against it.
+
+    :param arguments: The parsed command line.
+    :param rates: The messages per second of every scenario.
+    """
+    sys.path.insert(0, ROOT)
+    import bot as bot_module
+
+    bot = bot_module.DiscordBot()
+    bot.database_path = os.path.join(os.getcwd(), "database.db")
+    # Only the log file is kept, a console line per command would slow the run down
+    for handler in list(bot.logger.handlers):
+        if not isinstance(handler, logging.FileHandler):
+            bot.logger.removeHandler(handler)
+    stub_login(bot)
+
+    rng = random.Random(arguments.seed)
+    discord_latency = FakeLatency(arguments.discord_latency, rng)
+    gemini_latency = FakeLatency(arguments.gemini_latency, rng)
+    api_latency = FakeLatency(arguments.api_latency, rng)
+    fake = FakeDiscord(bot, discord_latency)
+    fake.install()
+
+    await bot.login("load")
+    # There is no gateway to change the presence on
+    bot.status_task.cancel()
+    await bot.http_client.close()
+    bot.http_client = fake_http_client(api_latency)
+    bot.gemini.model_factory = functools.partial(
+        FakeModel, gemini_latency, arguments.gemini_chunks
+    )
+    bot._ready.set()
+    try:
+        await bot.on_demand_loading
+        report = await LoadTest(bot, fake, users=arguments.users).run(rates, arguments.duration)
+    finally:
+        await bot.close()
+    report["fake_calls"] = {
+        "discord": discord_latency.calls,
+        "gemini": gemini_latency.calls,
+        "http": api_latency.calls,
+    }
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def parse_rates(parser: argparse.ArgumentParser, values: list) -> dict:
+    if not values:
+        return dict(DEFAULT_RATES)
+    rates = {}
+    for value in values:
+        name, _, rate = value.partition("=")
+        if name not in DEFAULT_RATES:
+            parser.error(f"Unknown scenario '{name}', expected one of {', '.join(DEFAULT_RATES)}")
+        try:
+            rates[name] = float(rate)
+        except ValueError:
+            parser.error(f"Expected NAME=RATE, got '{value}'")
+    return rates
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=10.0,
+        help="The number of seconds messages are sent for.",
+    )
+    parser.add_argument(
+        "--rate",
+        action="append",
+        default=[],
+        metavar="NAME=RATE",
+        help=f"The messages per second of a scenario, can be repeated. Scenarios: {', '.join(DEFAULT_RATES)}.",
+    )
+    parser.add_argument(
+        "--users",
+        type=int,
+        default=50,
+        help="The number of members sending messages.",
+    )
+    parser.add_argument(
+        "--discord-latency",
+        type=float,
+        default=0.05,
+        help="The mean latency of the Discord API, in seconds.",
+    )
+    parser.add_argument(
+        "--gemini-latency",
+        type=float,
+        default=1.0,
+        help="The mean latency of a Gemini answer, in seconds.",
+    )
+    parser.add_argument(
+        "--gemini-chunks",
+        type=int,
+        default=4,
+        help="The number of chunks a streamed answer arrives in.",
+    )
+    parser.add_argument(
+        "--api-latency",
+        type=float,
+        default=0.1,
+        help="The mean latency of the HTTP APIs, in seconds.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the latency jitter.")
+    parser.add_argument("--output", default="", help="The file the JSON report is written to.")
+    arguments = parser.parse_args()
+    rates = parse_rates(parser, arguments.rate)
+    output = os.path.abspath(arguments.output) if arguments.output else ""
+
+    # The bot writes its database and log file in the working directory, so the run gets its own
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            report = asyncio.run(load(arguments, rates))
+        finally:
+            os.chdir(cwd)
+
+    report["python"] = sys.version.split()[0]
+    if output:
+        with open(output, "w") as file:
+            file.write(json.dumps(report, indent=2) + "\n")
+    print(f"{'command':<12} {'rate':>6} {'sent':>6} {'p50':>9} {'p95':>9} {'p99':>9}  errors")
+    for name, stats in report["commands"].items():
+        errors = ", ".join(f"{error} x{count}" for error, count in stats["errors"].items())
+        print(
+            f"{name:<12} {stats['rate']:>6g} {stats['sent']:>6} {stats['p50']:>7.1f}ms {stats['p95']:>7.1f}ms {stats['p99']:>7.1f}ms  {errors or '-'}"
+        )
+    lag = report["loop_lag"]
+    print(
+        f"{'loop lag':<12} {'':>6} {'':>6} {lag['p50']:>7.1f}ms {lag['p95']:>7.1f}ms {lag['p99']:>7.1f}ms  max {lag['max']:.1f}ms"
+    )
+    print(f"peak RSS {report['peak_rss_mb']:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Measures the overhead the command metrics add to every invocation.
+
+Times what the bot does around each command: two clock reads and the recording of the latency in
+the registry, for a prefix, a hybrid and an application command spread over a number of guilds. It
+also times the rendering of a scrape of the resulting registry.
+
+Usage: python -m benchmarks.metrics [--invocations 200000] [--guilds 100]
+"""
+
+import argparse
+import os
+import sys
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def build_commands() -> dict:
+    from discord import app_commands
+    from discord.ext import commands
+
+    async def callback(context) -> None:
+        pass
+
+    async def app_callback(interaction) -> None:
+        pass
+
+    return {
+        "prefix": commands.command(name="prefix")(callback),
+        "hybrid": commands.hybrid_command(name="hybrid", description="Hybrid")(callback),
+        "app": app_commands.command(name="app", description="App")(app_callback),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--invocations",
+        type=int,
+        default=200000,
+        help="The number of invocations timed for every command type.",
+    )
+    parser.add_argument(
+        "--guilds",
+        type=int,
+        default=100,
+        help="The number of guilds the invocations are spread over.",
+    )
+    arguments = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from helpers.metrics import CommandMetrics
+
+    metrics = CommandMetrics()
+    guilds = list(range(arguments.guilds))
+    for kind, command in build_commands().items():
+        # The same work as DiscordBot.invoke does around a command
+        def invoke(guild_id: int) -> None:
+            started_at = time.perf_counter()
+            metrics.observe(command, guild_id, time.perf_counter() - started_at)
+
+        start = time.perf_counter()
+        for number in range(arguments.invocations):
+            invoke(guilds[number % len(guilds)])
+        elapsed = time.perf_counter() - start
+        print(f"{kind:<8} {elapsed / arguments.invocations * 1e6:6.2f}µs per invocation")
+
+    error = ValueError("Benchmark")
+    seconds = timeit.timeit(lambda: metrics.count_error(command, error), number=arguments.invocations)
+    print(f"{'error':<8} {seconds / arguments.invocations * 1e6:6.2f}µs per error")
+
+    runs = 20
+    seconds = timeit.timeit(metrics.render, number=runs)
+    size = len(metrics.render().encode("utf-8"))
+    print(f"{'scrape':<8} {seconds / runs * 1000:6.2f}ms for {size / 1024:.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measures how fast slide outlines are parsed, whole and as a stream.
+
+Parses a synthetic tag outline at once with ``parse_outline``, then fed in chunks of a few sizes to
+an ``OutlineParser`` like a streamed Gemini answer. Bracketed words that are not tags are sprinkled
+in the text, as they make the parser look for partial tags more often.
+
+Usage: python -m benchmarks.outline [--slides 200] [--chunk 4 --chunk 32 ...] [--runs 20]
+"""
+
+import argparse
+import sys
+import time
+
+from benchmarks.startup import ROOT
+
+SLIDE = (
+    "[L_{kind}]\n[TITLE]Slide {number} about [AI] models[/TITLE]\n"
+    "[CONTENT]The [B] point of slide {number}, with a few sentences of content, a [citation] and a "
+    "list [1] [2] [3] that goes on for a little while.[/CONTENT]\n"
+    "[IMAGE]A photo for slide {number}[/IMAGE]\n[SLIDEBREAK]\n"
+)
+
+
+def synthetic_outline(slides: int) -> str:
+    kinds = ["CS", "IS"]
+    return "".join(
+        SLIDE.format(kind=kinds[number % len(kinds)], number=number) for number in range(slides)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--slides", type=int, default=200, help="The number of slides of the outline.")
+    parser.add_argument(
+        "--chunk",
+        type=int,
+        action="append",
+        default=[],
+        help="The size of the streamed chunks, can be repeated.",
+    )
+    parser.add_argument("--runs", type=int, default=20, help="The number of times the outline is parsed.")
+    arguments = parser.parse_args()
+    chunk_sizes = arguments.chunk or [1, 4, 32, 256]
+
+    sys.path.insert(0, ROOT)
+    from helpers.slide_outline import OutlineParser, parse_outline
+
+    text = synthetic_outline(arguments.slides)
+    print(f"{arguments.slides} slides, {len(text) / 1024:.0f}KB of outline")
+
+    def stream(chunks: list) -> list:
+        outline_parser = OutlineParser()
+        slides = []
+        for chunk in chunks:
+            slides += outline_parser.feed(chunk)
+        return slides + outline_parser.close()
+
+    cases = {"whole": lambda: parse_outline(text)}
+    for size in chunk_sizes:
+        chunks = [text[position : position + size] for position in range(0, len(text), size)]
+        cases[f"chunk {size}"] = lambda chunks=chunks: stream(chunks)
+
+    print(f"{'input':<10} {'per outline':>12} {'per slide':>10} {'MB/s':>8}")
+    for name, parse in cases.items():
+        assert len(parse()) == arguments.slides
+        started_at = time.perf_counter()
+        for _ in range(arguments.runs):
+            parse()
+        elapsed = (time.perf_counter() - started_at) / arguments.runs
+        print(
+            f"{name:<10} {elapsed * 1000:>10.2f}ms {elapsed / arguments.slides * 1e6:>8.1f}µs {len(text) / elapsed / 1e6:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
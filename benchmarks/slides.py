@@ -0,0 +1,161 @@
+"""
+Compares assembling a slide deck through temporary files with assembling it in memory.
+
+Builds the same synthetic deck on the default theme both ways. The disk path is how the slide cog
+used to work: every image is written to a file that python-pptx reads back, and the deck is saved
+to a file that is read again to be uploaded. The memory path is ``SlideJob.build_presentation``,
+which adds the images from buffers and saves the deck into a ``BytesIO``.
+
+Usage: python -m benchmarks.slides [--slides 20] [--runs 10] [--directory /tmp]
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.startup import ROOT
+
+
+def synthetic_slides(count: int, image_size: tuple, rng: random.Random) -> list:
+    """
+    Returns a title slide, alternating content and image slides, and a thanks slide.
+
+    :param count: The number of slides, at least 2.
+    :param image_size: The size the theme fetches images at.
+    :param rng: The source of the image noise.
+    """
+    from PIL import Image
+
+    from cogs.slide import fit_image
+    from helpers.slide_outline import SlideRecord
+
+    width, height = image_size
+    slides = [SlideRecord("title", title="Synthetic deck", subtitle="A benchmark")]
+    for number in range(1, count - 1):
+        title = f"Slide {number}"
+        content = f"Point {number} of the synthetic deck, with a sentence of content. " * 3
+        if number % 2:
+            slides.append(SlideRecord("content", title=title, content=content))
+            continue
+        # Coarse noise, scaled up so that it compresses about as well as a photo
+        noise = Image.frombytes(
+            "RGB", (width // 8, height // 8), rng.randbytes(width // 8 * (height // 8) * 3)
+        )
+        downloaded = io.BytesIO()
+        noise.resize((width, height)).save(downloaded, "PNG")
+        slide = SlideRecord("image", title=title, content=content, image=title)
+        # The same recompression a downloaded image goes through
+        slide.image_data = fit_image(downloaded.getvalue(), width, height)
+        slides.append(slide)
+    slides.append(SlideRecord("thanks", title="Thank you"))
+    return slides
+
+
+def build_in_memory(themes, slides: list) -> int:
+    from cogs.slide import SlideJob
+
+    job = SlideJob(None, "Synthetic deck", len(slides), "default")
+    job.root = themes.clone("default")
+    try:
+        file_name, deck = job.build_presentation(slides)
+        # What discord.File uploads
+        return len(deck.read())
+    finally:
+        job.cleanup()
+
+
+def build_on_disk(themes, slides: list, directory: str) -> int:
+    from cogs.slide import IMAGE_LAYOUT, IMAGE_PLACEHOLDER, SlideJob
+
+    job = SlideJob(None, "Synthetic deck", len(slides), "default")
+    job.root = themes.clone("default")
+    job.layouts = {
+        "title": job.root.slide_layouts[0],
+        "content": job.root.slide_layouts[1],
+        "thanks": job.root.slide_layouts[2],
+    }
+    image_paths = []
+    try:
+        for number, slide in enumerate(slides):
+            if slide.kind == "title":
+                job.create_title_slide(slide.title, slide.subtitle)
+            elif slide.kind == "content":
+                job.create_title_and_content_slide(slide.title, slide.content)
+            elif slide.kind == "image":
+                layout = job.root.slide_layouts[IMAGE_LAYOUT]
+                page = job.root.slides.add_slide(layout)
+                page.shapes.title.text = slide.title
+                page.placeholders[2].text = slide.content
+                path = os.path.join(directory, f"p_{number}.jpg")
+                with open(path, "wb") as image_file:
+                    image_file.write(slide.image_data)
+                image_paths.append(path)
+                placeholder = page.placeholders[IMAGE_PLACEHOLDER]
+                page.shapes.add_picture(
+                    path, placeholder.left, placeholder.top, placeholder.width, placeholder.height
+                )
+            elif slide.kind == "thanks":
+                job.create_section_header_slide(slide.title)
+
+        deck_path = os.path.join(directory, f"{job.find_title()}.pptx")
+        job.root.save(deck_path)
+        with open(deck_path, "rb") as deck_file:
+            size = len(deck_file.read())
+        os.remove(deck_path)
+        return size
+    finally:
+        for path in image_paths:
+            os.remove(path)
+        job.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--slides", type=int, default=20, help="The number of slides of the deck.")
+    parser.add_argument("--runs", type=int, default=10, help="The number of decks built each way.")
+    parser.add_argument(
+        "--directory",
+        default=None,
+        help="Where the disk path writes its files, a temporary folder by default.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the image noise.")
+    arguments = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from cogs.slide import ThemeRegistry
+
+    themes = ThemeRegistry({"default": "theme0.pptx"})
+    themes.load()
+    slides = synthetic_slides(arguments.slides, themes.image_sizes["default"], random.Random(arguments.seed))
+    images = sum(len(slide.image_data) for slide in slides if slide.image_data)
+    print(
+        f"{len(slides)} slides, {sum(slide.kind == 'image' for slide in slides)} images of {images / 1024 / 1024:.1f}MB in total"
+    )
+
+    with tempfile.TemporaryDirectory(dir=arguments.directory) as directory:
+        paths = {
+            "disk": lambda: build_on_disk(themes, slides, directory),
+            "memory": lambda: build_in_memory(themes, slides),
+        }
+        # Both paths are warmed up once, the first deck pays for imports and caches
+        for build in paths.values():
+            build()
+        print(f"{'path':<8} {'median':>9} {'mean':>9} {'min':>9} {'deck':>8}")
+        for name, build in paths.items():
+            times = []
+            for _ in range(arguments.runs):
+                started_at = time.perf_counter()
+                size = build()
+                times.append(time.perf_counter() - started_at)
+            print(
+                f"{name:<8} {statistics.median(times) * 1000:>7.1f}ms {statistics.mean(times) * 1000:>7.1f}ms {min(times) * 1000:>7.1f}ms {size / 1024 / 1024:>6.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
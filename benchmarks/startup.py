@@ -0,0 +1,184 @@
+"""
+Measures how long the bot takes to start, without connecting to Discord.
+
+Every run is a fresh process that imports ``bot.py`` and logs in against a stubbed gateway: the
+token check and the application lookup return fake data, and the ready event is set by hand
+instead of by a websocket. The report breaks each run down into phases and records its peak RSS.
+
+Usage: python -m benchmarks.startup [--runs 5] [--database path/to/database.db] [--output startup.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+FAKE_USER = {
+    "id": "1",
+    "username": "benchmark",
+    "discriminator": "0",
+    "global_name": None,
+    "avatar": None,
+    "bot": True,
+    "mfa_enabled": False,
+    "verified": True,
+    "flags": 0,
+    "public_flags": 0,
+}
+
+
+def stub_login(bot) -> None:
+    """
+    Makes the bot log in without reaching Discord: the token check and the application lookup
+    answer with fake data.
+
+    :param bot: The bot that has not logged in yet.
+    """
+    import discord
+
+    async def static_login(token: str) -> dict:
+        return FAKE_USER
+
+    async def application_info() -> SimpleNamespace:
+        return SimpleNamespace(
+            id=1, flags=discord.ApplicationFlags(), team=None, owner=SimpleNamespace(id=0)
+        )
+
+    bot.http.static_login = static_login
+    bot.application_info = application_info
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def boot(database_path: str) -> dict:
+    """
+    Boots the bot once in this process and returns the timings of each phase.
+
+    :param database_path: The SQLite database the bot should use.
+    """
+    phases = {}
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import bot as bot_module
+
+    phases["import"] = time.perf_counter() - start
+
+    bot = bot_module.DiscordBot()
+    bot.database_path = database_path
+    stub_login(bot)
+
+    step = time.perf_counter()
+    await bot.login("benchmark")
+    phases["setup_hook"] = time.perf_counter() - step
+    # There is no gateway to change the presence on
+    bot.status_task.cancel()
+
+    step = time.perf_counter()
+    bot._ready.set()
+    await bot.on_demand_loaded.wait()
+    phases["on_demand_cogs"] = time.perf_counter() - step
+    await bot.on_demand_loading
+    phases["warm_up"] = time.perf_counter() - step - phases["on_demand_cogs"]
+    phases["total"] = time.perf_counter() - start
+
+    report = bot.startup.to_dict()
+    await bot.close()
+    return {
+        "phases": phases,
+        "setup_hook_phases": report["phases"],
+        "extensions": report["extensions"],
+        "lazy_imports": report["lazy_imports"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_child(database: str) -> dict:
+    """
+    Boots the bot in a fresh process, so that no import is already cached.
+
+    :param database: The database to copy for the run, or an empty string for a new one.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = os.path.join(directory, "database.db")
+        if database:
+            shutil.copy(database, database_path)
+        start = time.perf_counter()
+        # The bot writes its log file in the working directory, so the run gets its own
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", "--child", database_path],
+            cwd=directory,
+            env={**os.environ, "PYTHONPATH": ROOT},
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        wall = time.perf_counter() - start
+    run = json.loads(result.stdout)
+    run["phases"]["process"] = wall
+    return run
+
+
+def summarize(runs: list) -> dict:
+    summary = {}
+    for name in runs[0]["phases"]:
+        values = [run["phases"][name] for run in runs]
+        summary[name] = {
+            "min": min(values),
+            "median": statistics.median(values),
+            "max": max(values),
+        }
+    summary["peak_rss_mb"] = max(run["peak_rss_mb"] for run in runs)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="The number of boots to time.")
+    parser.add_argument(
+        "--database",
+        default="",
+        help="A database to copy for every run, a new empty one is used by default.",
+    )
+    parser.add_argument("--output", default="", help="The file the JSON report is written to.")
+    parser.add_argument("--child", default="", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.child:
+        print(json.dumps(asyncio.run(boot(arguments.child))))
+        return
+
+    runs = [run_child(arguments.database) for _ in range(arguments.runs)]
+    report = {
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "summary": summarize(runs),
+    }
+    output = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            file.write(output + "\n")
+    for name, values in report["summary"].items():
+        if name == "peak_rss_mb":
+            print(f"{'peak RSS':<16} {values:8.1f}MB")
+        else:
+            print(
+                f"{name:<16} {values['median'] * 1000:8.1f}ms (min {values['min'] * 1000:.1f}ms, max {values['max'] * 1000:.1f}ms)"
+            )
+
+
+if __name__ == "__main__":
+    main()
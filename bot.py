@@ -1,16 +1,31 @@
+import asyncio
 import json
 import logging
 import os
 import platform
 import random
 import sys
-import aiosqlite
+import time
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 from discord.ext.commands import Context
 from dotenv import load_dotenv
 
 from database import DatabaseManager
+from database.backend import Database
+from database.migrate import MigrationRunner
+from database.postgres import PostgresDatabase
+from database.sqlite import SQLiteDatabase
+from helpers.compaction import HistoryCompactor
+from helpers.conversations import ConversationStore
+from helpers.gemini import GeminiClient
+from helpers.http import HTTPClient
+from helpers.lazy_import import warm_up
+from helpers.loop_monitor import LoopMonitor
+from helpers.metrics import CommandMetrics, MetricsServer
+from helpers.response_cache import ResponseCache
+from helpers.startup import StartupReport
 
 if not os.path.isfile(f"{os.path.realpath(os.path.dirname(__file__))}/config.json"):
     sys.exit("'config.json' not found! Please add it and try again.")
@@ -102,12 +117,29 @@ logger.addHandler(console_handler)
 logger.addHandler(file_handler)
 
 
+class CommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Application commands run in a task of their own, which is named after the command
+        if interaction.command is not None and self.client.loop_monitor is not None:
+            self.client.loop_monitor.label(interaction.command.qualified_name)
+        self.client.metrics.start_interaction(interaction)
+        return True
+
+    async def on_error(
+        self, interaction: discord.Interaction, error: app_commands.AppCommandError
+    ) -> None:
+        self.client.metrics.count_error(interaction.command, error)
+        self.client.metrics.finish_interaction(interaction, failed=True)
+        await super().on_error(interaction, error)
+
+
 class DiscordBot(commands.Bot):
     def __init__(self) -> None:
         super().__init__(
             command_prefix=commands.when_mentioned_or(config["prefix"]),
             intents=intents,
             help_command=None,
+            tree_cls=CommandTree,
         )
         """
         This creates custom bot variables so that we can access these variables in cogs more easily.
@@ -120,32 +152,101 @@ class DiscordBot(commands.Bot):
         self.logger = logger
         self.config = config
         self.database = None
-
-    async def init_db(self) -> None:
-        async with aiosqlite.connect(
+        self.gemini = None
+        self.conversations = None
+        self.response_cache = None
+        self.http_client = None
+        self.loop_monitor = None
+        self.metrics = CommandMetrics()
+        self.metrics_server = None
+        self.startup = StartupReport()
+        self.database_path = (
             f"{os.path.realpath(os.path.dirname(__file__))}/database/database.db"
-        ) as db:
-            with open(
-                f"{os.path.realpath(os.path.dirname(__file__))}/database/schema.sql"
-            ) as file:
-                await db.executescript(file.read())
-            await db.commit()
+        )
+        self.on_demand_loading = None
+        self.on_demand_loaded = asyncio.Event()
+
+    async def init_db(self, database: Database) -> None:
+        for migration in await MigrationRunner(database).run():
+            self.logger.info(
+                f"Applied database migration {migration.version:04d} '{migration.name}'"
+            )
+
+    async def load_cog(self, extension: str, *, on_demand: bool = False) -> None:
+        """
+        Loads an extension and records how long its import and setup took.
+
+        :param extension: The name of the extension, without the ``cogs.`` prefix.
+        :param on_demand: Whether the extension is loaded after login.
+        """
+        start = time.perf_counter()
+        try:
+            await self.load_extension(f"cogs.{extension}")
+        except Exception as e:
+            exception = f"{type(e).__name__}: {e}"
+            self.startup.record_extension(
+                extension, time.perf_counter() - start, on_demand=on_demand, error=exception
+            )
+            self.logger.error(f"Failed to load extension {extension}\n{exception}")
+            return
+        entry = self.startup.record_extension(
+            extension, time.perf_counter() - start, on_demand=on_demand
+        )
+        self.logger.info(
+            f"Loaded extension '{extension}' in {entry['total'] * 1000:.1f}ms (import {entry['import'] * 1000:.1f}ms, setup {entry['setup'] * 1000:.1f}ms)"
+        )
 
     async def load_cogs(self) -> None:
         """
         The code in this function is executed whenever the bot will start.
+
+        Extensions listed in ``cogs.on_demand`` of the config are skipped here and loaded after login.
         """
-        for file in os.listdir(f"{os.path.realpath(os.path.dirname(__file__))}/cogs"):
+        on_demand = self.config["cogs"]["on_demand"]
+        for file in sorted(
+            os.listdir(f"{os.path.realpath(os.path.dirname(__file__))}/cogs")
+        ):
             if file.endswith(".py"):
                 extension = file[:-3]
-                try:
-                    await self.load_extension(f"cogs.{extension}")
-                    self.logger.info(f"Loaded extension '{extension}'")
-                except Exception as e:
-                    exception = f"{type(e).__name__}: {e}"
-                    self.logger.error(
-                        f"Failed to load extension {extension}\n{exception}"
-                    )
+                if extension not in on_demand:
+                    await self.load_cog(extension)
+
+    async def load_on_demand_cogs(self) -> None:
+        """
+        Loads the on-demand extensions once the bot is connected, then imports the heavy libraries
+        they use on a worker thread unless ``cogs.warm_up`` of the config is turned off, in which case
+        every library is imported by the first command needing it.
+        """
+        await self.wait_until_ready()
+        try:
+            for extension in self.config["cogs"]["on_demand"]:
+                if f"cogs.{extension}" not in self.extensions:
+                    await self.load_cog(extension, on_demand=True)
+        finally:
+            # Commands waiting for the extensions are released even if loading them failed or was
+            # cancelled, they are then reported as not found
+            self.on_demand_loaded.set()
+        if not self.config["cogs"]["warm_up"]:
+            return
+        await warm_up()
+        self.logger.info(
+            "Imported "
+            + ", ".join(
+                f"{name} in {seconds * 1000:.0f}ms"
+                for name, seconds in self.startup.to_dict()["lazy_imports"].items()
+            )
+            + " after login"
+        )
+
+    async def add_cog(self, cog: commands.Cog, /, **kwargs) -> None:
+        start = time.perf_counter()
+        try:
+            await super().add_cog(cog, **kwargs)
+        finally:
+            setup_times = self.startup.setup_times
+            setup_times[cog.__module__] = (
+                setup_times.get(cog.__module__, 0.0) + time.perf_counter() - start
+            )
 
     @tasks.loop(minutes=1.0)
     async def status_task(self) -> None:
@@ -173,13 +274,144 @@ class DiscordBot(commands.Bot):
             f"Running on: {platform.system()} {platform.release()} ({os.name})"
         )
         self.logger.info("-------------------")
-        await self.init_db()
-        await self.load_cogs()
+        with self.startup.phase("database"):
+            await self.setup_database()
+        with self.startup.phase("services"):
+            self.setup_services()
+        with self.startup.phase("cogs"):
+            await self.load_cogs()
+        self.logger.info(self.startup.summary())
+        # Started once the cogs are loaded, the startup has its own report
+        loop_config = self.config["loop_monitor"]
+        self.loop_monitor = LoopMonitor(
+            self.logger,
+            interval=loop_config["interval"],
+            threshold=loop_config["threshold"],
+            window=loop_config["window"],
+        )
+        self.loop_monitor.start()
+        await self.start_metrics_server()
+        self.on_demand_loading = asyncio.create_task(self.load_on_demand_cogs())
         self.status_task.start()
-        self.database = DatabaseManager(
-            connection=await aiosqlite.connect(
-                f"{os.path.realpath(os.path.dirname(__file__))}/database/database.db"
+
+    async def start_metrics_server(self) -> None:
+        """
+        Serves the command metrics on the configured local port, if enabled.
+        """
+        metrics_config = self.config["metrics"]
+        if not metrics_config["enabled"]:
+            return
+        self.metrics_server = MetricsServer(self.metrics)
+        try:
+            await self.metrics_server.start(metrics_config["host"], metrics_config["port"])
+        except OSError as e:
+            # The bot works without its metrics, a port already in use should not stop it
+            self.logger.error(f"Could not serve the metrics\n{type(e).__name__}: {e}")
+            await self.metrics_server.close()
+            self.metrics_server = None
+            return
+        self.logger.info(
+            f"Serving metrics on http://{metrics_config['host']}:{metrics_config['port']}/metrics"
+        )
+
+    async def setup_database(self) -> None:
+        """
+        Connects to the configured database and brings its schema up to date.
+        """
+        database_config = self.config["database"]
+        if database_config["backend"] == "postgres":
+            database = PostgresDatabase(
+                os.getenv("DATABASE_URL"), pool_size=database_config["pool_size"]
+            )
+        else:
+            database = SQLiteDatabase(
+                self.database_path, readers=database_config["readers"]
             )
+        await database.connect()
+        await self.init_db(database)
+        self.database = DatabaseManager(
+            database=database,
+            batch_size=database_config["batch_size"],
+            flush_interval=database_config["flush_interval"],
+            cache_size=database_config["cache_size"],
+        )
+
+    def setup_services(self) -> None:
+        """
+        Creates the services shared by the cogs.
+        """
+        http_config = self.config["http"]
+        self.http_client = HTTPClient(
+            limit=http_config["limit"],
+            limit_per_host=http_config["limit_per_host"],
+            dns_cache_ttl=http_config["dns_cache_ttl"],
+            timeout=http_config["timeout"],
+            retries=http_config["retries"],
+            backoff=http_config["backoff"],
+        )
+        self.gemini = GeminiClient(
+            api_key=os.getenv("GOOGLE_AI_KEY"),
+            max_concurrency=self.config["gemini"]["max_concurrency"],
+            timeout=self.config["gemini"]["timeout"],
+        )
+        conversations_config = self.config["conversations"]
+        self.conversations = ConversationStore(
+            max_conversations=conversations_config["max_conversations"],
+            max_turns=conversations_config["max_turns"],
+            max_tokens=conversations_config["max_tokens"],
+            idle_timeout=conversations_config["idle_timeout"],
+            database=(
+                self.database.database if conversations_config["persist"] else None
+            ),
+            compactor=HistoryCompactor(
+                self.gemini,
+                token_budget=conversations_config["compaction_budget"],
+                keep_turns=conversations_config["compaction_keep_turns"],
+                logger=self.logger,
+            ),
+        )
+        response_cache_config = self.config["response_cache"]
+        self.response_cache = ResponseCache(
+            max_entries=response_cache_config["max_entries"],
+            ttl=response_cache_config["ttl"],
+            database=(
+                self.database.database if response_cache_config["persist"] else None
+            ),
+        )
+
+    async def close(self) -> None:
+        """
+        Release the shared services before closing the connection to Discord.
+        """
+        if self.on_demand_loading is not None:
+            self.on_demand_loading.cancel()
+        if self.loop_monitor is not None:
+            self.loop_monitor.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        if self.conversations is not None:
+            await self.conversations.close()
+        if self.gemini is not None:
+            self.gemini.close()
+        if self.http_client is not None:
+            await self.http_client.close()
+        if self.database is not None:
+            await self.database.close()
+        await super().close()
+
+    async def invoke(self, context: Context) -> None:
+        if context.command is None:
+            await super().invoke(context)
+            return
+        if self.loop_monitor is not None:
+            self.loop_monitor.label(context.command.qualified_name)
+        started_at = time.perf_counter()
+        await super().invoke(context)
+        self.metrics.observe(
+            context.command,
+            context.guild.id if context.guild is not None else None,
+            time.perf_counter() - started_at,
+            failed=context.command_failed,
         )
 
     async def on_message(self, message: discord.Message) -> None:
@@ -210,6 +442,17 @@ class DiscordBot(commands.Bot):
                 f"Executed {executed_command} command by {context.author} (ID: {context.author.id}) in DMs"
             )
 
+    async def on_app_command_completion(
+        self, interaction: discord.Interaction, command: app_commands.Command
+    ) -> None:
+        """
+        The code in this event is executed every time a slash command, hybrid or not, has been successfully executed.
+
+        :param interaction: The interaction the command was invoked with.
+        :param command: The command that has been executed.
+        """
+        self.metrics.finish_interaction(interaction)
+
     async def on_command_error(self, context: Context, error) -> None:
         """
         The code in this event is executed every time a normal valid command catches an error.
@@ -217,6 +460,10 @@ class DiscordBot(commands.Bot):
         :param context: The context of the normal command that failed executing.
         :param error: The error that has been faced.
         """
+        self.metrics.count_error(context.command, error)
+        if context.interaction is not None:
+            # A hybrid command invoked as a slash command, its errors do not reach the command tree
+            self.metrics.finish_interaction(context.interaction, failed=True)
         if isinstance(error, commands.CommandOnCooldown):
             minutes, seconds = divmod(error.retry_after, 60)
             hours, minutes = divmod(minutes, 60)
@@ -255,6 +502,14 @@ class DiscordBot(commands.Bot):
                 color=0xE02B2B,
             )
             await context.send(embed=embed)
+        elif (
+            isinstance(error, commands.CommandNotFound)
+            and not self.on_demand_loaded.is_set()
+        ):
+            # The command may belong to an extension that is still being loaded, so wait for it and
+            # try the message again
+            await self.on_demand_loaded.wait()
+            await self.process_commands(context.message)
         elif isinstance(error, commands.MissingRequiredArgument):
             embed = discord.Embed(
                 title="Error!",
@@ -269,5 +524,6 @@ class DiscordBot(commands.Bot):
 
 load_dotenv()
 
-bot = DiscordBot()
-bot.run(os.getenv("TOKEN"))
+if __name__ == "__main__":
+    bot = DiscordBot()
+    bot.run(os.getenv("TOKEN"))
@@ -1,36 +1,18 @@
-import os
 import re
-import aiohttp
 import discord
-import google.generativeai as genai
 from discord.ext import commands
-from dotenv import load_dotenv
 from discord.ext.commands import Context
 
-load_dotenv()
+from helpers.conversations import ConversationStore
+from helpers.gemini import DEFAULT_GENERATION_CONFIG, GeminiError
+from helpers.response_cache import image_digest
+from helpers.streaming import stream_reply
 
-# Google AI Key
-GEMINI_API_KEY = os.getenv("GOOGLE_AI_KEY")
 system_prompt = "You are a helpful bot!"
-
-# AI Configuration
-genai.configure(api_key=GEMINI_API_KEY)
+DEFAULT_IMAGE_PROMPT = "What is this a picture of?"
 
 # Define the generation configuration
-generation_config = {
-    "temperature": 1,
-    "top_p": 0.95,
-    "top_k": 40,
-    "max_output_tokens": 8192,
-    "response_mime_type": "text/plain",
-}
-
-# Create the model and start a chat session
-model = genai.GenerativeModel(
-    model_name="gemini-1.5-flash",
-    generation_config=generation_config,
-)
-chat_session = model.start_chat(history=[])
+generation_config = DEFAULT_GENERATION_CONFIG
 
 # Define Cog for the bot
 class Template(commands.Cog, name="ask"):
@@ -42,8 +24,8 @@ class Template(commands.Cog, name="ask"):
         description="This command will reset the conversation history with the bot."
     )
     async def reset(self, context: Context) -> None:
-        # Clear the chat session history
-        chat_session.history = []
+        # Clear the conversation history of the user in this channel
+        await self.bot.conversations.reset(conversation_key(context))
         await context.send("🤖 Chat history has been reset.")
 
     @commands.hybrid_command(
@@ -53,41 +35,36 @@ class Template(commands.Cog, name="ask"):
     async def ask(self, context: Context, *, query: str = "") -> None:
         async with context.typing():
             cleaned_text = clean_discord_message(query)
+            key = conversation_key(context)
 
             if context.message.attachments:
                 for attachment in context.message.attachments:
                     if any(attachment.filename.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.gif', '.webp']):
-                        async with aiohttp.ClientSession() as session:
-                            async with session.get(attachment.url) as resp:
-                                if resp.status != 200:
-                                    await context.send('Unable to download the image.')
-                                    return
-                                image_data = await resp.read()
+                        response_text = await self.reply_image(context, attachment, cleaned_text)
+                        if response_text is None:
+                            await context.send('Unable to download the image.')
+                            return
 
                         # Append user's query with image information to history
-                        chat_session.history.append({"role": "user", "parts": [cleaned_text]})
-                        response_text = await generate_response_with_image_and_text(image_data, cleaned_text)
-
-                        chat_session.history.append({"role": "model", "parts": [response_text]})
-                        await split_and_send_messages(context, response_text, 1700)
+                        await self.bot.conversations.append(key, cleaned_text, response_text)
                         return
             else:
-                chat_session.history.append({"role": "user", "parts": [cleaned_text]})
-                response_text = await generate_response_with_text(cleaned_text)
-                chat_session.history.append({"role": "model", "parts": [response_text]})
-                await split_and_send_messages(context, response_text, 1700)
+                history = await self.bot.conversations.get_history(key)
+                response_text = await self.reply_text(context, history, cleaned_text)
+                await self.bot.conversations.append(key, cleaned_text, response_text)
 
     @commands.hybrid_command(
         name="history",
         description="This command will show your message history.",
     )
     async def history(self, context: Context) -> None:
-        if not chat_session.history:
+        chat_history = await self.bot.conversations.get_history(conversation_key(context))
+        if not chat_history:
             await context.send("No conversation history available.")
             return
 
         history_output = ""
-        for entry in chat_session.history:
+        for entry in chat_history:
             if isinstance(entry, dict) and "role" in entry and "parts" in entry:
                 role = entry["role"].capitalize()
                 content = ''.join(entry["parts"]).strip()
@@ -103,55 +80,151 @@ class Template(commands.Cog, name="ask"):
 
         if self.bot.user in message.mentions or isinstance(message.channel, discord.DMChannel):
             cleaned_text = clean_discord_message(message.content)
+            key = conversation_key(message)
 
             async with message.channel.typing():
-                chat_session.history.append({"role": "user", "parts": [cleaned_text]})
-
                 if message.attachments:
                     for attachment in message.attachments:
                         if any(attachment.filename.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.gif', '.webp']):
                             await message.add_reaction('🎨')
-                            async with aiohttp.ClientSession() as session:
-                                async with session.get(attachment.url) as resp:
-                                    if resp.status != 200:
-                                        await message.channel.send('Unable to download the image.')
-                                        return
-                                    image_data = await resp.read()
-                                    response_text = await generate_response_with_image_and_text(image_data, cleaned_text)
-
-                                    chat_session.history.append({"role": "model", "parts": [response_text]})
-                                    await split_and_send_messages(message, response_text, 1700)
-                                    return
+                            response_text = await self.reply_image(message, attachment, cleaned_text)
+                            if response_text is None:
+                                await message.channel.send('Unable to download the image.')
+                                return
+
+                            await self.bot.conversations.append(key, cleaned_text, response_text)
+                            return
                 else:
                     await message.add_reaction('💬')
-                    response_text = await generate_response_with_text(cleaned_text)
-
-                    chat_session.history.append({"role": "model", "parts": [response_text]})
-                    await split_and_send_messages(message, response_text, 1700)
+                    history = await self.bot.conversations.get_history(key)
+                    response_text = await self.reply_text(message, history, cleaned_text)
+
+                    await self.bot.conversations.append(key, cleaned_text, response_text)
+
+    async def reply_text(self, message_system, history, text):
+        # Only questions asked outside of a conversation are shared, other answers depend on the history
+        cache = self.bot.response_cache
+        cache_key = cache.make_key(text) if not history else None
+        if cache_key is not None:
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                await split_and_send_messages(message_system, cached, 1700)
+                return cached
+
+        # Only requests that reach the model count towards the compaction statistics
+        self.bot.conversations.record_request(conversation_key(message_system))
+        response_text, answered = await self.send_answer(
+            message_system,
+            lambda: generate_response_with_text(self.bot.gemini, history, text, self.bot.logger),
+            lambda: stream_response_with_text(self.bot.gemini, history, text, self.bot.logger),
+        )
+        if cache_key is not None and answered:
+            await cache.set(cache_key, response_text)
+        return response_text
+
+    async def reply_image(self, message_system, attachment, text):
+        cache = self.bot.response_cache
+        prompt = text if text else DEFAULT_IMAGE_PROMPT
+
+        # A known attachment can be answered without downloading it again
+        digest = cache.attachment_digest(attachment.id)
+        if digest is not None:
+            cached = await cache.get(cache.make_key(prompt, digest))
+            if cached is not None:
+                await split_and_send_messages(message_system, cached, 1700)
+                return cached
+
+        resp = await self.bot.http_client.get(attachment.url)
+        if resp.status != 200:
+            return None
+        image_data = resp.body
+
+        known_digest = digest
+        digest = image_digest(image_data)
+        cache.remember_attachment(attachment.id, digest)
+        cache_key = cache.make_key(prompt, digest)
+        if digest != known_digest:
+            # The same image may have been posted before as another attachment
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                await split_and_send_messages(message_system, cached, 1700)
+                return cached
+
+        response_text, answered = await self.send_answer(
+            message_system,
+            lambda: generate_response_with_image_and_text(self.bot.gemini, image_data, text, self.bot.logger),
+            lambda: stream_response_with_image_and_text(self.bot.gemini, image_data, text, self.bot.logger),
+        )
+        if answered:
+            await cache.set(cache_key, response_text)
+        return response_text
+
+    async def send_answer(self, message_system, generate, stream):
+        """
+        Sends the answer of Gemini, streamed if the config says so. If Gemini fails, the error is sent
+        instead of the answer, or as the last chunk of the streamed answer.
+
+        :param message_system: The message being answered.
+        :param generate: Returns the coroutine of the whole answer.
+        :param stream: Returns the chunks of the answer.
+        :return: The text sent, and whether Gemini answered without an error.
+        """
+        errors = []
+
+        async def chunks():
+            try:
+                async for chunk in stream():
+                    yield chunk
+            except GeminiError as e:
+                self.bot.logger.warning(f"Error in response: {e}")
+                errors.append(e)
+                yield "❌" + str(e)
+
+        if self.bot.config["gemini"]["stream"]:
+            response_text = await stream_reply(
+                message_system.channel,
+                chunks(),
+                edit_interval=self.bot.config["gemini"]["stream_edit_interval"],
+                logger=self.bot.logger,
+            )
+            return response_text, not errors
+
+        try:
+            response_text = await generate()
+        except GeminiError as e:
+            self.bot.logger.warning(f"Error in response: {e}")
+            errors.append(e)
+            response_text = "❌" + str(e)
+        await split_and_send_messages(message_system, response_text, 1700)
+        return response_text, not errors
+
+# Helper functions for AI responses and splitting messages, they raise GeminiError when Gemini fails
+async def generate_response_with_text(client, history, message_text, logger):
+    logger.debug("Got textPrompt: " + message_text)
+    return await client.chat(history, message_text, generation_config=generation_config)
+
+async def generate_response_with_image_and_text(client, image_data, text, logger):
+    logger.debug("Got imagePrompt: " + text)
+    image_parts = [{"mime_type": "image/jpeg", "data": image_data}]
+    prompt_parts = [image_parts[0], f"\n{text if text else DEFAULT_IMAGE_PROMPT}"]
 
-# Helper functions for AI responses and splitting messages
-async def generate_response_with_text(message_text):
-    print("Got textPrompt: " + message_text)
-    response = chat_session.send_message(message_text)
-    
-    if response._error:
-        return "❌" + str(response._error)
+    response_text = await client.generate(prompt_parts, generation_config=generation_config)
+    logger.debug(f"Response Text: {response_text}")
+    return response_text
 
-    return response.text
+# Streaming variants
+async def stream_response_with_text(client, history, message_text, logger):
+    logger.debug("Got textPrompt: " + message_text)
+    contents = list(history) + [{"role": "user", "parts": [message_text]}]
+    async for chunk in client.stream(contents, generation_config=generation_config):
+        yield chunk
 
-async def generate_response_with_image_and_text(image_data, text):
-    print("Got imagePrompt: " + text)
+async def stream_response_with_image_and_text(client, image_data, text, logger):
+    logger.debug("Got imagePrompt: " + text)
     image_parts = [{"mime_type": "image/jpeg", "data": image_data}]
-    prompt_parts = [image_parts[0], f"\n{text if text else 'What is this a picture of?'}"]
-    
-    response = model.generate_content(prompt_parts)
-    
-    if response._error:
-        print(f"Error in response: {response._error}")
-        return "❌" + str(response._error)
-    
-    print(f"Response Text: {response.text}")
-    return response.text
+    prompt_parts = [image_parts[0], f"\n{text if text else DEFAULT_IMAGE_PROMPT}"]
+    async for chunk in client.stream(prompt_parts, generation_config=generation_config):
+        yield chunk
 
 # Function to split and send long messages
 async def split_and_send_messages(message_system, text, max_length):
@@ -159,6 +232,11 @@ async def split_and_send_messages(message_system, text, max_length):
     for msg in messages:
         await message_system.channel.send(msg)
 
+# Conversations are scoped to a user in a channel of a guild
+def conversation_key(message_system):
+    guild_id = message_system.guild.id if message_system.guild else None
+    return ConversationStore.key(guild_id, message_system.channel.id, message_system.author.id)
+
 # Cleaning Discord messages by removing text inside brackets
 def clean_discord_message(input_string):
     return re.sub(r'<[^>]+>', '', input_string)
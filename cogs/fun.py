@@ -7,12 +7,16 @@ Version: 6.2.0
 """
 
 import random
+from typing import Optional
 
-import aiohttp
 import discord
 from discord.ext import commands
 from discord.ext.commands import Context
 
+from helpers.async_cache import PrefetchPool
+
+RANDOM_FACT_URL = "https://uselessfacts.jsph.pl/random.json?language=en"
+
 
 class Choice(discord.ui.View):
     def __init__(self) -> None:
@@ -96,6 +100,22 @@ class RockPaperScissorsView(discord.ui.View):
 class Fun(commands.Cog, name="fun"):
     def __init__(self, bot) -> None:
         self.bot = bot
+        # Facts are different on every call, so a few are fetched ahead of time instead of being cached
+        self.facts = PrefetchPool(self.fetch_fact, size=5)
+
+    async def cog_unload(self) -> None:
+        self.facts.close()
+
+    async def fetch_fact(self) -> Optional[str]:
+        """
+        Fetches a random fact.
+
+        :return: The fact, or None if the API could not be reached.
+        """
+        request = await self.bot.http_client.get(RANDOM_FACT_URL)
+        if request.status != 200:
+            return None
+        return request.json()["text"]
 
     @commands.hybrid_command(name="randomfact", description="Get a random fact.")
     async def randomfact(self, context: Context) -> None:
@@ -104,21 +124,16 @@ class Fun(commands.Cog, name="fun"):
 
         :param context: The hybrid command context.
         """
-        # This will prevent your bot from stopping everything when doing a web request - see: https://discordpy.readthedocs.io/en/stable/faq.html#how-do-i-make-a-web-request
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                "https://uselessfacts.jsph.pl/random.json?language=en"
-            ) as request:
-                if request.status == 200:
-                    data = await request.json()
-                    embed = discord.Embed(description=data["text"], color=0xD75BF4)
-                else:
-                    embed = discord.Embed(
-                        title="Error!",
-                        description="There is something wrong with the API, please try again later",
-                        color=0xE02B2B,
-                    )
-                await context.send(embed=embed)
+        fact = await self.facts.get()
+        if fact is not None:
+            embed = discord.Embed(description=fact, color=0xD75BF4)
+        else:
+            embed = discord.Embed(
+                title="Error!",
+                description="There is something wrong with the API, please try again later",
+                color=0xE02B2B,
+            )
+        await context.send(embed=embed)
 
     @commands.hybrid_command(
         name="coinflip", description="Make a coin flip, but give your bet before."
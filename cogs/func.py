@@ -2,14 +2,9 @@ import os
 import discord
 from discord.ext import commands
 from discord.ui import Button, View
-import google.generativeai as genai
 import asyncio
 
-# Google AI Key
-GEMINI_API_KEY = os.getenv("GOOGLE_AI_KEY")
-
-# AI Configuration
-genai.configure(api_key=GEMINI_API_KEY)
+from helpers.gemini import DEFAULT_GENERATION_CONFIG
 
 class FuncCommand(commands.Cog, name="func"):
     def __init__(self, bot) -> None:
@@ -20,20 +15,6 @@ class FuncCommand(commands.Cog, name="func"):
         description="Generates a Python file based on your request.",
     )
     async def func(self, context: commands.Context, cog_name: str, request: str) -> None:
-        # Create the generation config
-        generation_config = {
-            "temperature": 1,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 8192,
-            "response_mime_type": "text/plain",
-        }
-
-        model = genai.GenerativeModel(
-            model_name="gemini-1.5-pro",
-            generation_config=generation_config,
-        )
-
         # Define the template to be sent to Gemini
         template = f"""
 from discord.ext import commands 
@@ -54,20 +35,22 @@ async def setup(bot) -> None:
 """
 
         # Send the template to Gemini for further processing without the system role
-        chat_session = model.start_chat(
-            history=[
-                {
-                    "role": "user",
-                    "parts": [
-                        f"complete the template:\n{template}\n to fulfill in the function logic for '{request}'. Only respond with the full template code! don't change the name and async def name. remember to full import library for the code. ",
-                    ],
-                },
-            ]
+        history = [
+            {
+                "role": "user",
+                "parts": [
+                    f"complete the template:\n{template}\n to fulfill in the function logic for '{request}'. Only respond with the full template code! don't change the name and async def name. remember to full import library for the code. ",
+                ],
+            },
+        ]
+
+        code = await self.bot.gemini.chat(
+            history,
+            "Generate a function code.",
+            model_name="gemini-1.5-pro",
+            generation_config=DEFAULT_GENERATION_CONFIG,
         )
 
-        response = chat_session.send_message("Generate a function code.")
-        code = response.text
-
         # Create embed for the code
         embed = discord.Embed(title=f"Generated Code for {cog_name}", description="Here is the generated code:", color=discord.Color.blue())
 
@@ -8,13 +8,17 @@ Version: 6.2.0
 
 import platform
 import random
+from typing import Optional
 
-import aiohttp
 import discord
 from discord import app_commands
 from discord.ext import commands
 from discord.ext.commands import Context
 
+from helpers.async_cache import cached
+
+BITCOIN_PRICE_URL = "https://api.coindesk.com/v1/bpi/currentprice/BTC.json"
+
 
 class FeedbackForm(discord.ui.Modal, title="Feeedback"):
     feedback = discord.ui.TextInput(
@@ -273,25 +277,33 @@ class General(commands.Cog, name="general"):
 
         :param context: The hybrid command context.
         """
-        # This will prevent your bot from stopping everything when doing a web request - see: https://discordpy.readthedocs.io/en/stable/faq.html#how-do-i-make-a-web-request
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                "https://api.coindesk.com/v1/bpi/currentprice/BTC.json"
-            ) as request:
-                if request.status == 200:
-                    data = await request.json()
-                    embed = discord.Embed(
-                        title="Bitcoin price",
-                        description=f"The current price is {data['bpi']['USD']['rate']} :dollar:",
-                        color=0xBEBEFE,
-                    )
-                else:
-                    embed = discord.Embed(
-                        title="Error!",
-                        description="There is something wrong with the API, please try again later",
-                        color=0xE02B2B,
-                    )
-                await context.send(embed=embed)
+        price = await self.fetch_bitcoin_price()
+        if price is not None:
+            embed = discord.Embed(
+                title="Bitcoin price",
+                description=f"The current price is {price} :dollar:",
+                color=0xBEBEFE,
+            )
+        else:
+            embed = discord.Embed(
+                title="Error!",
+                description="There is something wrong with the API, please try again later",
+                color=0xE02B2B,
+            )
+        await context.send(embed=embed)
+
+    # Concurrent invocations share a single request, and the price is reused for a minute
+    @cached(ttl=60, stale_ttl=300)
+    async def fetch_bitcoin_price(self) -> Optional[str]:
+        """
+        Fetches the current price of bitcoin in USD.
+
+        :return: The formatted price, or None if the API could not be reached.
+        """
+        request = await self.bot.http_client.get(BITCOIN_PRICE_URL)
+        if request.status != 200:
+            return None
+        return request.json()["bpi"]["USD"]["rate"]
 
     @app_commands.command(
         name="feedback", description="Submit a feedback for the owners of the bot"
@@ -184,6 +184,132 @@ class Owner(commands.Cog, name="owner"):
         await context.send(embed=embed)
         await self.bot.close()
 
+    @commands.hybrid_command(
+        name="cachestats",
+        description="Shows the statistics of the Gemini response cache.",
+    )
+    @commands.is_owner()
+    async def cachestats(self, context: Context) -> None:
+        """
+        Shows the statistics of the Gemini response cache.
+
+        :param context: The hybrid command context.
+        """
+        stats = self.bot.response_cache.stats()
+        embed = discord.Embed(title="Response cache", color=0xBEBEFE)
+        embed.add_field(name="Hits", value=stats["hits"])
+        embed.add_field(name="Misses", value=stats["misses"])
+        embed.add_field(name="Hit rate", value=f"{stats['hit_rate']:.1%}")
+        embed.add_field(name="Hits from disk", value=stats["disk_hits"])
+        embed.add_field(name="Cached answers", value=stats["entries"])
+        embed.add_field(name="Known attachments", value=stats["attachments"])
+        await context.send(embed=embed)
+
+    @commands.hybrid_command(
+        name="convstats",
+        description="Shows the statistics of the Gemini conversations.",
+    )
+    @commands.is_owner()
+    async def convstats(self, context: Context) -> None:
+        """
+        Shows how many tokens the conversation summaries saved on the Gemini requests.
+
+        :param context: The hybrid command context.
+        """
+        conversations = self.bot.conversations
+        embed = discord.Embed(title="Conversations", color=0xBEBEFE)
+        embed.add_field(name="Conversations in memory", value=len(conversations.conversations))
+        if conversations.compactor is not None:
+            stats = conversations.compactor.stats()
+            embed.add_field(name="Compactions", value=stats["compactions"])
+            embed.add_field(name="Model requests", value=stats["requests"])
+            embed.add_field(name="Tokens saved", value=stats["tokens_saved"])
+            embed.add_field(
+                name="Tokens saved per request",
+                value=f"{stats['tokens_saved_per_request']:.0f}",
+            )
+        await context.send(embed=embed)
+
+    @commands.hybrid_command(
+        name="dbstats",
+        description="Shows the statistics of the moderation database.",
+    )
+    @commands.is_owner()
+    async def dbstats(self, context: Context) -> None:
+        """
+        Shows the statistics of the warning cache and of the batched database writes.
+
+        :param context: The hybrid command context.
+        """
+        cache = self.bot.database.cache.stats()
+        writes = self.bot.database.writes.stats()
+        embed = discord.Embed(title="Database", color=0xBEBEFE)
+        embed.add_field(name="Warning cache hits", value=cache["hits"])
+        embed.add_field(name="Warning cache misses", value=cache["misses"])
+        embed.add_field(name="Hit rate", value=f"{cache['hit_rate']:.1%}")
+        embed.add_field(name="Cached users", value=cache["entries"])
+        embed.add_field(name="Batched writes", value=writes["writes"])
+        embed.add_field(name="Commits", value=writes["flushes"])
+        embed.add_field(name="Writes per commit", value=f"{writes['average_batch']:.1f}")
+        embed.add_field(name="Queued writes", value=writes["pending"])
+        await context.send(embed=embed)
+
+    @commands.hybrid_command(
+        name="httpstats",
+        description="Shows the latency of the HTTP requests per host.",
+    )
+    @commands.is_owner()
+    async def httpstats(self, context: Context) -> None:
+        """
+        Shows the latency of the HTTP requests made by the bot, per host.
+
+        :param context: The hybrid command context.
+        """
+        embed = discord.Embed(title="HTTP latency", color=0xBEBEFE)
+        for host, stats in self.bot.http_client.latency_stats().items():
+            buckets = "\n".join(
+                f"{label}: {count}" for label, count in stats["buckets"].items() if count
+            )
+            embed.add_field(
+                name=host,
+                value=f"{stats['count']} requests, {stats['errors']} errors, {stats['average_ms']:.0f}ms on average\n{buckets}",
+                inline=False,
+            )
+        if not embed.fields:
+            embed.description = "No HTTP request has been made yet."
+        await context.send(embed=embed)
+
+    @commands.hybrid_command(
+        name="loopstats",
+        description="Shows how long the event loop has been blocked recently.",
+    )
+    @commands.is_owner()
+    async def loopstats(self, context: Context) -> None:
+        """
+        Shows the percentiles of the event loop lag and the last times it was blocked.
+
+        :param context: The hybrid command context.
+        """
+        monitor = self.bot.loop_monitor
+        stats = monitor.stats()
+        embed = discord.Embed(
+            title="Event loop",
+            description=f"Lag over the last {stats['samples']} samples, one every {monitor.interval * 1000:.0f}ms",
+            color=0xBEBEFE,
+        )
+        embed.add_field(name="p50", value=f"{stats['p50_ms']:.1f}ms")
+        embed.add_field(name="p95", value=f"{stats['p95_ms']:.1f}ms")
+        embed.add_field(name="p99", value=f"{stats['p99_ms']:.1f}ms")
+        embed.add_field(name="Max", value=f"{stats['max_ms']:.1f}ms")
+        embed.add_field(name="Stalls", value=stats["stalls"])
+        stalls = "\n".join(
+            f"<t:{int(stall['time'])}:R> {stall['lag_ms']:.0f}ms by `{stall['command']}` at `{stall['location']}`"
+            for stall in list(monitor.stalls)[-5:]
+        )
+        if stalls:
+            embed.add_field(name="Last stalls", value=stalls[:1024], inline=False)
+        await context.send(embed=embed)
+
     @commands.hybrid_command(
         name="say",
         description="The bot will say anything you want.",
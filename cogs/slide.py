@@ -1,96 +1,141 @@
+import asyncio
 import base64
 import glob
+import io
+import json
 import os
-import random
 import re
-import string
-import requests
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
-import google.generativeai as genai
 import discord
 from discord.ext import commands
-from pptx import Presentation
-from pexels_api import API
 from dotenv import load_dotenv
 
-load_dotenv()
+from helpers.disk_cache import DiskLRUCache
+from helpers.gemini import GeminiError
+from helpers.lazy_import import lazy_import
+from helpers.slide_outline import OUTLINE_SCHEMA, OutlineParser, parse_json_outline
 
-# Get the Gemini API Key from environment variable
-GEMINI_API_KEY = os.getenv("GOOGLE_AI_KEY")  # Fetch the key from environment
+load_dotenv()
 
-# Create the cog class for generating PPT
-class GeneratePPT(commands.Cog, name="generate_ppt"):
-    def __init__(self, bot) -> None:
-        self.bot = bot
-        self.unique_image_name = None
-        self.pexels_api_key = os.getenv("PEXELS_API_KEY")
+# python-pptx and Pillow are only imported once the themes are loaded, after login
+Image = lazy_import("PIL.Image")
+pptx = lazy_import("pptx")
+pptx_util = lazy_import("pptx.util")
 
-        # Initialize the Pexels API
-        self.pexels_client = API(self.pexels_api_key)
+PEXELS_SEARCH_URL = "https://api.pexels.com/v1/search"
+THEMES_FOLDER = os.path.realpath(os.path.dirname(__file__))
 
-    def refresh_unique_image_name(self):
-        self.unique_image_name = ''.join(random.choice(string.ascii_uppercase + string.ascii_lowercase + string.digits) for _ in range(16))
+# Images are fetched at twice the size of their placeholder so they stay sharp on large screens
+IMAGE_SCALE = 2
+IMAGE_LAYOUT = 8
+IMAGE_PLACEHOLDER = 1
 
 
-    async def generate_ppt(self, topic: str, slide_length: str):
-        # Initialize the PowerPoint presentation
-        slides_folder = r"C:\Users\nhail\Desktop\Discord_bot\Python-Discord-Bot-Template\cogs\Slides"
-        root = Presentation(r"C:\Users\nhail\Desktop\Discord_bot\Python-Discord-Bot-Template\cogs\theme0.pptx")
-        self.root = root  # Store the presentation in the instance attribute
-        
-        # Remove all existing slides before adding new ones
-        self.remove_all_slides(root)
+class ThemeRegistry:
+    """
+    Parses every theme once and keeps it in memory with its slides already removed, so a job only
+    has to clone the pristine template instead of reading and stripping the theme file again.
 
-        # Configure Gemini API
-        genai.configure(api_key=GEMINI_API_KEY)
-        
-        message = f"""Create an outline for a slideshow presentation on the topic of {topic} which is {slide_length}
-        slides long. Make sure it is {slide_length} long.
-
-        You are allowed to use the following slide types:
-        Title Slide - (Title, Subtitle)
-        Content Slide - (Title, Content)
-        Image Slide - (Title, Content, Image)
-        Thanks Slide - (Title)
-
-        Put this tag before the Title Slide: [L_TS]
-        Put this tag before the Content Slide: [L_CS]
-        Put this tag before the Image Slide: [L_IS]
-        Put this tag before the Thanks Slide: [L_THS]
-        
-        Put this tag before the Title: [TITLE]
-        Put this tag after the Title: [/TITLE]
-        Put this tag before the Subitle: [SUBTITLE]
-        Put this tag after the Subtitle: [/SUBTITLE]
-        Put this tag before the Content: [CONTENT]
-        Put this tag after the Content: [/CONTENT]
-        Put this tag before the Image: [IMAGE]
-        Put this tag after the Image: [/IMAGE]
-
-        Put "[SLIDEBREAK]" after each slide"""
-        
-        model = genai.GenerativeModel(model_name="gemini-1.5-pro")
-        chat_session = model.start_chat(history=[])
-        response = chat_session.send_message(message)
-
-        list_of_slides = response.text.split("[SLIDEBREAK]")
+    Themes must share the layout order of ``theme0.pptx``, the slide builders pick layouts by index.
+    """
 
+    def __init__(self, theme_files: dict) -> None:
+        """
+        :param theme_files: The file name of each theme, relative to the cogs folder, by theme name.
+        """
+        self.theme_files = theme_files
+        self.templates = {}
+        self.image_sizes = {}
+        self.load_times = {}
+
+    @property
+    def names(self):
+        return list(self.theme_files)
+
+    def load(self) -> None:
+        # Blocking, called from the worker pool when the cog is loaded
+        for name, file_name in self.theme_files.items():
+            started_at = time.perf_counter()
+            presentation = pptx.Presentation(os.path.join(THEMES_FOLDER, file_name))
+            remove_all_slides(presentation)
+            placeholder = presentation.slide_layouts[IMAGE_LAYOUT].placeholders[IMAGE_PLACEHOLDER]
+            self.image_sizes[name] = (
+                int(pptx_util.Emu(placeholder.width).pt * 96 / 72 * IMAGE_SCALE),
+                int(pptx_util.Emu(placeholder.height).pt * 96 / 72 * IMAGE_SCALE),
+            )
+            template = io.BytesIO()
+            presentation.save(template)
+            self.templates[name] = template.getvalue()
+            self.load_times[name] = time.perf_counter() - started_at
+
+    def clone(self, name: str):
+        return pptx.Presentation(io.BytesIO(self.templates[name]))
+
+
+def fit_image(image_data, width, height):
+    # Blocking, downscales and recompresses an image that is larger than the given size
+    image = Image.open(io.BytesIO(image_data))
+    if image.width <= width and image.height <= height and image.format == "JPEG":
+        return image_data
+    image.thumbnail((width, height))
+    output = io.BytesIO()
+    image.convert("RGB").save(output, "JPEG", quality=85, optimize=True)
+    return output.getvalue()
+
+
+def remove_all_slides(presentation):
+    # This function will remove all slides from the presentation
+    for i in range(len(presentation.slides)-1, -1, -1):
+        rId = presentation.slides._sldIdLst[i].rId
+        presentation.part.drop_rel(rId)
+        del presentation.slides._sldIdLst[i]
+
+
+class SlideJob:
+    """
+    A single /slide request. It owns its presentation and its image buffers, so concurrent jobs never
+    share state. Nothing is written to disk, the deck is uploaded straight from memory.
+    """
+
+    def __init__(self, ctx: commands.Context, topic: str, slide_length: int, theme: str) -> None:
+        self.ctx = ctx
+        self.topic = topic
+        self.slide_length = slide_length
+        self.theme = theme
+        self.working_message = None
+        self.root = None
+        self.layouts = {}
+        self.images = []
+
+    def cleanup(self) -> None:
+        for image in self.images:
+            image.close()
+        self.images.clear()
+        self.layouts = {}
+        self.root = None
+
+    def build_presentation(self, slides):
+        # Runs on the worker pool, everything in here is blocking. The presentation is the clone of
+        # a theme, already without any slide.
+        self.layouts = {
+            "title": self.root.slide_layouts[0],
+            "content": self.root.slide_layouts[1],
+            "thanks": self.root.slide_layouts[2],
+            "image": self.root.slide_layouts[IMAGE_LAYOUT],
+        }
         # Process each slide and create corresponding PowerPoint slide
-        for slide in list_of_slides:
-            slide_type = self.search_for_slide_type(slide)
-            if slide_type == "[L_TS]":
-                self.create_title_slide(self.find_text_in_between_tags(str(slide), "[TITLE]", "[/TITLE]"),
-                                        self.find_text_in_between_tags(str(slide), "[SUBTITLE]", "[/SUBTITLE]"))
-            elif slide_type == "[L_CS]":
-                self.create_title_and_content_slide(
-                    "".join(self.find_text_in_between_tags(str(slide), "[TITLE]", "[/TITLE]")),
-                    "".join(self.find_text_in_between_tags(str(slide), "[CONTENT]", "[/CONTENT]")))
-            elif slide_type == "[L_IS]":
-                self.create_title_and_content_and_image_slide("".join(self.find_text_in_between_tags(str(slide), "[TITLE]", "[/TITLE]")),
-                                                            "".join(self.find_text_in_between_tags(str(slide), "[CONTENT]", "[/CONTENT]")) ,
-                                                            "".join(self.find_text_in_between_tags(str(slide), "[IMAGE]", "[/IMAGE]")))
-            elif slide_type == "[L_THS]":
-                self.create_section_header_slide("".join(self.find_text_in_between_tags(str(slide), "[TITLE]", "[/TITLE]")))
+        for slide in slides:
+            if slide.kind == "title":
+                self.create_title_slide(slide.title, slide.subtitle)
+            elif slide.kind == "content":
+                self.create_title_and_content_slide(slide.title, slide.content)
+            elif slide.kind == "image":
+                self.create_title_and_content_and_image_slide(slide.title, slide.content, slide.image_data)
+            elif slide.kind == "thanks":
+                self.create_section_header_slide(slide.title)
 
         # Get a clean version of the title for the file name
         title = self.find_title()
@@ -100,115 +145,340 @@ class GeneratePPT(commands.Cog, name="generate_ppt"):
         if not title:  # Fallback if no title found
             title = "Generated_Presentation"
 
-        # Define the file path for saving the PPT
-        slide_path = os.path.join(slides_folder, f"{title}.pptx")
-        root.save(slide_path)
+        # Save the PPT into memory, it is uploaded from there
+        deck = io.BytesIO()
+        self.root.save(deck)
+        deck.seek(0)
 
-        return slide_path
-
-    def remove_all_slides(self, presentation):
-        # This function will remove all slides from the presentation
-        for i in range(len(presentation.slides)-1, -1, -1):
-            rId = presentation.slides._sldIdLst[i].rId
-            presentation.part.drop_rel(rId)
-            del presentation.slides._sldIdLst[i]
+        return f"{title}.pptx", deck
 
     def find_title(self):
-        return self.root.slides[0].shapes.title.text
-
-    def find_text_in_between_tags(self, text, start_tag, end_tag):
-        start_pos = text.find(start_tag)
-        end_pos = text.find(end_tag)
-        result = []
-        while start_pos > -1 and end_pos > -1:
-            text_between_tags = text[start_pos + len(start_tag):end_pos]
-            result.append(text_between_tags)
-            start_pos = text.find(start_tag, end_pos + len(end_tag))
-            end_pos = text.find(end_tag, start_pos)
-        res1 = "".join(result)
-        res2 = re.sub(r"\[IMAGE\].*?\[/IMAGE\]", '', res1)
-        if len(result) > 0:
-            return res2
-        else:
+        if len(self.root.slides) == 0 or self.root.slides[0].shapes.title is None:
             return ""
-
-    def search_for_slide_type(self, text):
-        tags = ["[L_TS]", "[L_CS]", "[L_IS]", "[L_THS]"]
-        found_text = next((s for s in tags if s in text), None)
-        return found_text
+        return self.root.slides[0].shapes.title.text
 
     def create_title_slide(self, title, subtitle):
-        layout = self.root.slide_layouts[0]
+        layout = self.layouts["title"]
         slide = self.root.slides.add_slide(layout)
         slide.shapes.title.text = title
         slide.placeholders[1].text = subtitle
 
     def create_section_header_slide(self, title):
-        layout = self.root.slide_layouts[2]
+        layout = self.layouts["thanks"]
         slide = self.root.slides.add_slide(layout)
         slide.shapes.title.text = title
 
     def create_title_and_content_slide(self, title, content):
-        layout = self.root.slide_layouts[1]
+        layout = self.layouts["content"]
         slide = self.root.slides.add_slide(layout)
         slide.shapes.title.text = title
         slide.placeholders[1].text = content
 
-    def create_title_and_content_and_image_slide(self, title, content, image_query):
-        layout = self.root.slide_layouts[8]
+    def create_title_and_content_and_image_slide(self, title, content, image_data):
+        layout = self.layouts["image"]
         slide = self.root.slides.add_slide(layout)
         slide.shapes.title.text = title
         slide.placeholders[2].text = content
-        self.refresh_unique_image_name()
-
-        # Fetch images from Pexels using the API
-        self.pexels_client.search(image_query, page=1, results_per_page=1)
-        photos = self.pexels_client.get_entries()
 
-        if photos:
-            image_url = photos[0].original
-            self.download_image(image_url)
+        if image_data:
+            image = io.BytesIO(image_data)
+            self.images.append(image)
 
             # Add the downloaded image to the slide
-            img_path = f"C:\\Users\\nhail\\Desktop\\Discord_bot\\Python-Discord-Bot-Template\\cogs\\Slides\\p_{self.unique_image_name}.jpg"
-            slide.shapes.add_picture(img_path, slide.placeholders[1].left, slide.placeholders[1].top,
+            slide.shapes.add_picture(image, slide.placeholders[1].left, slide.placeholders[1].top,
                                      slide.placeholders[1].width, slide.placeholders[1].height)
 
-    def download_image(self, image_url):
-        # Download the image from Pexels and save it locally
-        img_data = requests.get(image_url).content
-        with open(f"C:\\Users\\nhail\\Desktop\\Discord_bot\\Python-Discord-Bot-Template\\cogs\\Slides\\p_{self.unique_image_name}.jpg", 'wb') as img_file:
-            img_file.write(img_data)
+
+# Create the cog class for generating PPT
+class GeneratePPT(commands.Cog, name="generate_ppt"):
+    def __init__(self, bot) -> None:
+        self.bot = bot
+        self.pexels_api_key = os.getenv("PEXELS_API_KEY")
+        self.worker_count = self.bot.config["slides"]["workers"]
+
+        # python-pptx is blocking, decks are assembled and saved on this pool instead of the event loop
+        self.executor = ThreadPoolExecutor(max_workers=self.worker_count, thread_name_prefix="slides")
+        # Images are resized and cached on a pool of their own, so that they do not wait behind the
+        # decks being assembled, nor hold them up
+        self.image_executor = ThreadPoolExecutor(
+            max_workers=self.bot.config["slides"]["image_workers"], thread_name_prefix="slide-images"
+        )
+
+        # Jobs wait here until one of the workers is free
+        self.jobs = asyncio.Queue(maxsize=self.bot.config["slides"]["queue_size"])
+        self.waiting = []
+        self.workers = []
+        self.themes = ThemeRegistry(self.bot.config["slides"]["themes"])
+        self.image_cache = None
+
+    async def cog_load(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.themes.load)
+        for name, seconds in self.themes.load_times.items():
+            self.bot.logger.info(f"Loaded slide theme '{name}' in {seconds * 1000:.0f}ms")
+        image_cache_folder = self.bot.config["slides"]["image_cache_folder"]
+        if image_cache_folder:
+            self.image_cache = await loop.run_in_executor(
+                self.image_executor, self.open_image_cache, image_cache_folder
+            )
+        self.workers = [asyncio.create_task(self.worker()) for _ in range(self.worker_count)]
+
+    def open_image_cache(self, folder):
+        # Blocking, called from the image pool when the cog is loaded. The folder is relative to the
+        # bot, which may be installed read-only, so a temporary folder is used instead if needed and
+        # images are not cached at all as a last resort.
+        max_bytes = self.bot.config["slides"]["image_cache_size_mb"] * 1024 * 1024
+        for directory in (
+            os.path.join(os.path.realpath(os.path.dirname(os.path.dirname(__file__))), folder),
+            os.path.join(tempfile.gettempdir(), "discord-bot-slide-images"),
+        ):
+            try:
+                return DiskLRUCache(directory, max_bytes)
+            except OSError as e:
+                self.bot.logger.warning(f"Cannot cache slide images in '{directory}': {e}")
+        self.bot.logger.warning("Slide images are not cached")
+        return None
+
+    async def cog_unload(self) -> None:
+        for worker in self.workers:
+            worker.cancel()
+        self.executor.shutdown(wait=False)
+        self.image_executor.shutdown(wait=False)
+
+    async def worker(self) -> None:
+        while True:
+            job = await self.jobs.get()
+            self.waiting.remove(job)
+            await self.update_queue_positions()
+            try:
+                await self.run_job(job)
+            except Exception as e:
+                self.bot.logger.error(f"Slide job on '{job.topic}' failed: {type(e).__name__}: {e}")
+            finally:
+                job.cleanup()
+                self.jobs.task_done()
+
+    async def update_queue_positions(self) -> None:
+        for position, job in enumerate(self.waiting, start=1):
+            try:
+                await job.working_message.edit(content=queue_position_text(position))
+            except discord.HTTPException:
+                # The message may have been deleted, the job still runs
+                pass
+
+    async def run_job(self, job: SlideJob) -> None:
+        try:
+            await job.working_message.edit(content="The bot is working on generating the slides. Please wait...")
+
+            # Generate the PowerPoint
+            file_name, deck, timings = await self.generate_ppt(job)
+            timings_text = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in timings.items())
+            timings_text += f", {deck.getbuffer().nbytes / (1024 * 1024):.1f} MB"
+            self.bot.logger.info(f"Generated slides on '{job.topic}': {timings_text}")
+
+            # Update the message to indicate that the process is done
+            await job.working_message.edit(content=f"Done! The presentation is ready. You can download it now ({timings_text})")
+
+            # Send the slide file to Discord
+            await job.ctx.send(file=discord.File(deck, filename=file_name))
+
+        except Exception as e:
+            # If something goes wrong, send an error message
+            await job.working_message.edit(content=f"An error occurred while generating the slides: {e}")
+
+    async def generate_ppt(self, job: SlideJob):
+        timings = {}
+        topic = job.topic
+        slide_length = job.slide_length
+
+        message = f"""Create an outline for a slideshow presentation on the topic of {topic} which is {slide_length}
+        slides long. Make sure it is {slide_length} long.
+
+        You are allowed to use the following slide types:
+        Title Slide - (Title, Subtitle)
+        Content Slide - (Title, Content)
+        Image Slide - (Title, Content, Image)
+        Thanks Slide - (Title)
+
+        Put this tag before the Title Slide: [L_TS]
+        Put this tag before the Content Slide: [L_CS]
+        Put this tag before the Image Slide: [L_IS]
+        Put this tag before the Thanks Slide: [L_THS]
+        
+        Put this tag before the Title: [TITLE]
+        Put this tag after the Title: [/TITLE]
+        Put this tag before the Subitle: [SUBTITLE]
+        Put this tag after the Subtitle: [/SUBTITLE]
+        Put this tag before the Content: [CONTENT]
+        Put this tag after the Content: [/CONTENT]
+        Put this tag before the Image: [IMAGE]
+        Put this tag after the Image: [/IMAGE]
+
+        Put "[SLIDEBREAK]" after each slide"""
+        
+        # The outline is parsed while it is streamed, and the image of every image slide is
+        # fetched as soon as the slide is complete
+        stage_started_at = time.perf_counter()
+        parser = OutlineParser()
+        slides = []
+        image_tasks = []
+        image_size = self.themes.image_sizes[job.theme]
+
+        def add_slides(records):
+            for record in records:
+                slides.append(record)
+                if record.kind == "image":
+                    image_tasks.append(asyncio.create_task(self.attach_image(record, image_size)))
+
+        try:
+            records = None
+            if self.bot.config["slides"]["outline_mode"] == "json":
+                records = await self.generate_json_outline(topic, slide_length)
+            if records is not None:
+                add_slides(records)
+            else:
+                async for chunk in self.bot.gemini.stream(message, model_name="gemini-1.5-pro"):
+                    add_slides(parser.feed(chunk))
+                add_slides(parser.close())
+            if not slides:
+                raise ValueError("Gemini did not write any slide for this topic")
+            timings["outline"] = time.perf_counter() - stage_started_at
+
+            # Only the images that are not there yet are waited for
+            stage_started_at = time.perf_counter()
+            await asyncio.gather(*image_tasks)
+            timings["images"] = time.perf_counter() - stage_started_at
+        except BaseException:
+            for task in image_tasks:
+                task.cancel()
+            raise
+
+        stage_started_at = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        job.root = await loop.run_in_executor(self.executor, self.themes.clone, job.theme)
+        timings["theme"] = time.perf_counter() - stage_started_at
+
+        stage_started_at = time.perf_counter()
+        file_name, deck = await loop.run_in_executor(self.executor, job.build_presentation, slides)
+        timings["assembly"] = time.perf_counter() - stage_started_at
+
+        return file_name, deck, timings
+
+    async def generate_json_outline(self, topic, slide_length):
+        # Asks for a schema-constrained JSON outline, None if Gemini did not produce a valid one
+        message = f"""Create an outline for a slideshow presentation on the topic of {topic} which is {slide_length}
+        slides long. Make sure it is {slide_length} long.
+
+        Every slide has a type:
+        title - a Title Slide, with a title and a subtitle
+        content - a Content Slide, with a title and a content
+        image - an Image Slide, with a title, a content and an image_query to search a photo for
+        thanks - a Thanks Slide, with a title"""
+
+        try:
+            response_text = await self.bot.gemini.generate(
+                message,
+                model_name="gemini-1.5-pro",
+                generation_config={"response_mime_type": "application/json", "response_schema": OUTLINE_SCHEMA},
+            )
+            return parse_json_outline(response_text)
+        except (GeminiError, ValueError) as e:
+            self.bot.logger.warning(f"Invalid JSON slide outline, falling back to the tag outline: {e}")
+            return None
+
+    async def attach_image(self, slide, size):
+        slide.image_data = await self.fetch_image(slide.image, size)
+
+    async def fetch_image(self, image_query, size):
+        # Search Pexels for the query and download the first photo at the given size, None if there is none
+        width, height = size
+        query_key = f"query:{' '.join(image_query.lower().split())}"
+        photo = await self.cache_get(query_key)
+        if photo is not None:
+            photo = json.loads(photo)
+        else:
+            response = await self.bot.http_client.get(
+                PEXELS_SEARCH_URL,
+                params={"query": image_query, "per_page": 1, "page": 1},
+                headers={"Authorization": self.pexels_api_key or ""},
+            )
+            if response.status != 200:
+                return None
+            photos = response.json().get("photos")
+            if not photos:
+                return None
+            photo = {"id": photos[0]["id"], "url": photos[0]["src"]["original"]}
+            await self.cache_set(query_key, json.dumps(photo).encode("utf-8"))
+
+        image_key = f"photo:{photo['id']}:{width}x{height}"
+        image_data = await self.cache_get(image_key)
+        if image_data is not None:
+            return image_data
+
+        # Pexels resizes on its side, the original is often a 5-20 MB picture
+        response = await self.bot.http_client.get(
+            photo["url"],
+            params={"auto": "compress", "cs": "tinysrgb", "fit": "crop", "w": width, "h": height},
+        )
+        if response.status != 200:
+            return None
+        loop = asyncio.get_running_loop()
+        image_data = await loop.run_in_executor(self.image_executor, fit_image, response.body, width, height)
+        await self.cache_set(image_key, image_data)
+        return image_data
+
+    async def cache_get(self, key):
+        if self.image_cache is None:
+            return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.image_executor, self.image_cache.get, key)
+
+    async def cache_set(self, key, data):
+        if self.image_cache is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.image_executor, self.image_cache.set, key, data)
+        except OSError as e:
+            # A full disk only costs the next job a download
+            self.bot.logger.warning(f"Could not cache a slide image: {e}")
 
     @commands.hybrid_command(
         name="slide",
         description="Generates a PPT based on the topic and slide length using Gemini API",
     )
-    async def slide_command(self, ctx: commands.Context, topic: str, slide_length: int):
+    async def slide_command(self, ctx: commands.Context, topic: str, slide_length: int, theme: str = "default"):
         """
         Generates a PowerPoint presentation based on the provided topic and slide length using the Gemini API.
         
         :param ctx: The application command context.
         :param topic: The topic for the PPT.
         :param slide_length: Number of slides for the PPT.
+        :param theme: The name of the theme of the PPT.
         """
-        # Send an initial "working" message
-        working_message = await ctx.send("The bot is working on generating the slides. Please wait...")
+        if theme not in self.themes.templates:
+            await ctx.send(f"Unknown theme `{theme}`. Available themes: {', '.join(f'`{name}`' for name in self.themes.names)}")
+            return
 
-        try:
-            # Generate the PowerPoint
-            result = await self.generate_ppt(topic, str(slide_length))
-            
-            # Update the message to indicate that the process is done
-            await working_message.edit(content=f"Done! The presentation is ready. You can download it now")
-            
-            # Send the slide file to Discord
-            await ctx.send(file=discord.File(result))
-            
-        except Exception as e:
-            # If something goes wrong, send an error message
-            await working_message.edit(content=f"An error occurred while generating the slides: {e}")
+        if self.jobs.full():
+            await ctx.send("Too many presentations are being generated right now, please try again later.")
+            return
+
+        working_message = await ctx.send(queue_position_text(len(self.waiting) + 1))
+        # The queue may have filled up while the message was being sent
+        if self.jobs.full():
+            await working_message.edit(content="Too many presentations are being generated right now, please try again later.")
+            return
+
+        job = SlideJob(ctx, topic, slide_length, theme)
+        job.working_message = working_message
+        self.waiting.append(job)
+        self.jobs.put_nowait(job)
+
+
+def queue_position_text(position):
+    return f"Your presentation is #{position} in the queue, it will start as soon as a worker is free."
 
 # The setup function to add the cog to the bot
 async def setup(bot) -> None:
-    await bot.add_cog(GeneratePPT(bot))
\ No newline at end of file
+    await bot.add_cog(GeneratePPT(bot))
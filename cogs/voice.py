@@ -1,9 +1,13 @@
 import discord
 from discord.ext import commands
 from discord.ext.commands import Context
-import speech_recognition as sr
 import asyncio
 
+from helpers.lazy_import import lazy_import
+
+# SpeechRecognition is only imported when someone first listens
+sr = lazy_import("speech_recognition")
+
 class LanguageSelectionView(discord.ui.View):
     def __init__(self, message: discord.Message):
         super().__init__()
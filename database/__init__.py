@@ -6,12 +6,39 @@ Description:
 Version: 6.2.0
 """
 
-import aiosqlite
+from typing import Optional
+
+from database.backend import Connection, Database
+from database.batch import WriteBatcher
+from database.cache import WarningCache
+
+WARNINGS_QUERY = "SELECT user_id, server_id, moderator_id, reason, created_at, id FROM warns WHERE server_id=? AND user_id=? ORDER BY id"
 
 
 class DatabaseManager:
-    def __init__(self, *, connection: aiosqlite.Connection) -> None:
-        self.connection = connection
+    def __init__(
+        self,
+        *,
+        database: Database,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        cache_size: int = 1024,
+    ) -> None:
+        self.database = database
+        # Other processes sharing a PostgreSQL database change warns without this one knowing, so
+        # the warnings are always read from the server instead of cached
+        if database.dialect == "postgres":
+            cache_size = 0
+        self.cache = WarningCache(cache_size)
+        # Moderation writes go through a write-behind queue, so a burst of warns shares one commit
+        self.writes = WriteBatcher(database, batch_size=batch_size, interval=flush_interval)
+
+    async def close(self) -> None:
+        """
+        Flushes the queued writes and closes the database.
+        """
+        await self.writes.close()
+        await self.database.close()
 
     async def add_warn(
         self, user_id: int, server_id: int, moderator_id: int, reason: str
@@ -22,28 +49,31 @@ class DatabaseManager:
         :param user_id: The ID of the user that should be warned.
         :param reason: The reason why the user should be warned.
         """
-        rows = await self.connection.execute(
-            "SELECT id FROM warns WHERE user_id=? AND server_id=? ORDER BY id DESC LIMIT 1",
-            (
-                user_id,
-                server_id,
-            ),
-        )
-        async with rows as cursor:
-            result = await cursor.fetchone()
-            warn_id = result[0] + 1 if result is not None else 1
-            await self.connection.execute(
-                "INSERT INTO warns(id, user_id, server_id, moderator_id, reason) VALUES (?, ?, ?, ?, ?)",
+
+        # The next ID is computed inside the insert itself, so concurrent warns can never share one.
+        # The casts let PostgreSQL type the parameters of the SELECT
+        async def insert(connection: Connection) -> tuple:
+            return await connection.fetchone(
+                "INSERT INTO warns(server_id, user_id, id, moderator_id, reason) "
+                "SELECT CAST(? AS bigint), CAST(? AS bigint), COALESCE(MAX(id), 0) + 1, CAST(? AS bigint), ? "
+                "FROM warns WHERE server_id=? AND user_id=? "
+                "RETURNING id, created_at",
                 (
-                    warn_id,
-                    user_id,
                     server_id,
+                    user_id,
                     moderator_id,
                     reason,
+                    server_id,
+                    user_id,
                 ),
             )
-            await self.connection.commit()
-            return warn_id
+
+        warn_id, created_at = await self.writes.submit(insert)
+        self.cache.add(
+            (server_id, user_id),
+            (user_id, server_id, moderator_id, reason, created_at, warn_id),
+        )
+        return warn_id
 
     async def remove_warn(self, warn_id: int, user_id: int, server_id: int) -> int:
         """
@@ -53,25 +83,31 @@ class DatabaseManager:
         :param user_id: The ID of the user that was warned.
         :param server_id: The ID of the server where the user has been warned
         """
-        await self.connection.execute(
-            "DELETE FROM warns WHERE id=? AND user_id=? AND server_id=?",
-            (
-                warn_id,
-                user_id,
-                server_id,
-            ),
-        )
-        await self.connection.commit()
-        rows = await self.connection.execute(
-            "SELECT COUNT(*) FROM warns WHERE user_id=? AND server_id=?",
-            (
-                user_id,
-                server_id,
-            ),
-        )
-        async with rows as cursor:
-            result = await cursor.fetchone()
-            return result[0] if result is not None else 0
+        key = (server_id, user_id)
+
+        async def delete(connection: Connection) -> Optional[list]:
+            await connection.execute(
+                "DELETE FROM warns WHERE server_id=? AND user_id=? AND id=?",
+                (
+                    server_id,
+                    user_id,
+                    warn_id,
+                ),
+            )
+            if self.cache.contains(key):
+                return None
+            # Without cached warnings, the ones left are read in the same transaction
+            return await connection.fetchall(WARNINGS_QUERY, key)
+
+        warnings = await self.writes.submit(delete)
+        total = self.cache.remove(key, warn_id)
+        if total is None:
+            if warnings is None:
+                # The warnings were evicted from the cache while the removal was queued
+                return len(await self.get_warnings(user_id, server_id))
+            self.cache.set(key, warnings)
+            total = len(warnings)
+        return total
 
     async def get_warnings(self, user_id: int, server_id: int) -> list:
         """
@@ -81,16 +117,10 @@ class DatabaseManager:
         :param server_id: The ID of the server that should be checked.
         :return: A list of all the warnings of the user.
         """
-        rows = await self.connection.execute(
-            "SELECT user_id, server_id, moderator_id, reason, strftime('%s', created_at), id FROM warns WHERE user_id=? AND server_id=?",
-            (
-                user_id,
-                server_id,
-            ),
-        )
-        async with rows as cursor:
-            result = await cursor.fetchall()
-            result_list = []
-            for row in result:
-                result_list.append(row)
-            return result_list
+        key = (server_id, user_id)
+        warnings = self.cache.get(key)
+        if warnings is None:
+            generation = self.cache.generation
+            warnings = await self.database.fetchall(WARNINGS_QUERY, key)
+            self.cache.set(key, warnings, generation)
+        return warnings
@@ -0,0 +1,96 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class Connection(ABC):
+    """
+    The query API shared by every storage backend.
+
+    Queries use ``?`` placeholders whatever the backend, and rows are returned as plain tuples.
+    """
+
+    @abstractmethod
+    async def execute(self, query: str, parameters: tuple = ()) -> int:
+        """
+        Runs a statement.
+
+        :param query: The SQL statement.
+        :param parameters: The parameters of the statement.
+        :return: The number of rows that were changed.
+        """
+
+    @abstractmethod
+    async def fetchone(self, query: str, parameters: tuple = ()) -> Optional[tuple]:
+        ...
+
+    @abstractmethod
+    async def fetchall(self, query: str, parameters: tuple = ()) -> list:
+        ...
+
+
+class Database(ABC):
+    """
+    A pool of connections to a storage backend.
+
+    Writes run in ``transaction()`` blocks, which every backend runs one at a time, and reads borrow
+    a pooled connection from ``reader()``.
+    """
+
+    # The name of the folder of ``database/migrations`` holding the migrations of the backend
+    dialect = ""
+
+    @abstractmethod
+    async def connect(self) -> None:
+        ...
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+    @abstractmethod
+    def reader(self):
+        """
+        Borrows a connection to read with for the duration of the block.
+        """
+
+    @abstractmethod
+    def transaction(self):
+        """
+        Runs the block in a write transaction, committed when the block exits normally and rolled
+        back when it raises.
+        """
+
+    @abstractmethod
+    async def schema_version(self) -> int:
+        """
+        Returns the version of the last migration applied to the database.
+        """
+
+    @abstractmethod
+    async def apply_migration(self, version: int, name: str, script: str) -> None:
+        """
+        Runs a migration script and records it, in a single transaction.
+
+        :param version: The version of the migration.
+        :param name: The name of the migration.
+        :param script: The SQL script of the migration.
+        """
+
+    async def execute(self, query: str, parameters: tuple = ()) -> int:
+        """
+        Runs a single write statement in its own transaction.
+
+        :param query: The SQL statement.
+        :param parameters: The parameters of the statement.
+        :return: The number of rows that were changed.
+        """
+        async with self.transaction() as connection:
+            return await connection.execute(query, parameters)
+
+    async def fetchone(self, query: str, parameters: tuple = ()) -> Optional[tuple]:
+        async with self.reader() as connection:
+            return await connection.fetchone(query, parameters)
+
+    async def fetchall(self, query: str, parameters: tuple = ()) -> list:
+        async with self.reader() as connection:
+            return await connection.fetchall(query, parameters)
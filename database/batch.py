@@ -0,0 +1,116 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+from database.backend import Connection, Database
+
+WriteOperation = Callable[[Connection], Awaitable[Any]]
+
+
+class WriteBatcher:
+    """
+    Write-behind queue that commits many writes in one transaction.
+
+    Writes are queued and flushed together once the batch is full or the flush interval has passed
+    since the first queued write, so a burst of writes costs one commit instead of one each. Every
+    write runs inside its own savepoint, so a failing write is rolled back alone and the others of
+    its batch are still committed. Callers get the result of their write once it is committed.
+    """
+
+    def __init__(
+        self, database: Database, *, batch_size: int = 100, interval: float = 0.05
+    ) -> None:
+        """
+        :param database: The database the writes are committed to.
+        :param batch_size: The maximum number of writes committed together.
+        :param interval: The number of seconds a write may wait for others to join its batch.
+        """
+        self.database = database
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pending = []
+        self.wakeup = asyncio.Event()
+        self.full = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.flushes = 0
+        self.writes = 0
+
+    async def submit(self, operation: WriteOperation) -> Any:
+        """
+        Queues a write and waits until it is committed.
+
+        :param operation: A coroutine function that performs the write on the given connection.
+        :return: What the operation returned.
+        """
+        if self.closed:
+            raise RuntimeError("The write queue is closed")
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((operation, future))
+        if len(self.pending) >= self.batch_size:
+            self.full.set()
+        self.wakeup.set()
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        return await future
+
+    async def run(self) -> None:
+        while self.pending or not self.closed:
+            if not self.pending:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            if len(self.pending) < self.batch_size and not self.closed:
+                self.full.clear()
+                try:
+                    await asyncio.wait_for(self.full.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self.pending[: self.batch_size]
+            del self.pending[: self.batch_size]
+            await self.flush(batch)
+
+    async def flush(self, batch: list) -> None:
+        outcomes = []
+        try:
+            async with self.database.transaction() as connection:
+                for operation, _ in batch:
+                    await connection.execute("SAVEPOINT batched_write")
+                    try:
+                        outcomes.append((await operation(connection), None))
+                    except Exception as e:
+                        await connection.execute("ROLLBACK TO batched_write")
+                        outcomes.append((None, e))
+                    await connection.execute("RELEASE batched_write")
+        except Exception as e:
+            # The commit itself failed, so none of the writes happened
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.flushes += 1
+        self.writes += len(batch)
+        for (_, future), (result, error) in zip(batch, outcomes):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """
+        Flushes the queued writes and stops accepting new ones.
+        """
+        self.closed = True
+        self.wakeup.set()
+        self.full.set()
+        if self.task is not None:
+            await self.task
+
+    def stats(self) -> dict:
+        return {
+            "flushes": self.flushes,
+            "writes": self.writes,
+            "pending": len(self.pending),
+            "average_batch": self.writes / self.flushes if self.flushes else 0.0,
+        }
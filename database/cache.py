@@ -0,0 +1,87 @@
+from typing import Optional, Tuple
+
+from cachetools import LRUCache
+
+WarningKey = Tuple[int, int]
+
+
+class WarningCache:
+    """
+    Size-bounded cache of the warnings of a user, keyed by (server_id, user_id).
+
+    The data layer keeps it in sync itself: once a write is committed, the cached list of that user
+    gets the added warn appended or the removed warn dropped, instead of being thrown away. Applying
+    a change twice is harmless, and every change bumps a generation counter, so a list that was
+    read from the database while a write was being committed is never stored over a newer one.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        """
+        :param max_entries: The number of users whose warnings are kept, 0 to keep none.
+        """
+        self.entries = LRUCache(maxsize=max_entries)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: WarningKey) -> Optional[list]:
+        warnings = self.entries.get(key)
+        if warnings is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return list(warnings)
+
+    def set(self, key: WarningKey, warnings: list, generation: Optional[int] = None) -> None:
+        """
+        Stores the warnings of a user.
+
+        :param key: The (server_id, user_id) key.
+        :param warnings: The warnings, ordered by ID.
+        :param generation: The generation the warnings were read at, they are only stored if no
+            change was applied since.
+        """
+        if self.entries.maxsize == 0:
+            return
+        if generation is None or generation == self.generation:
+            self.entries[key] = list(warnings)
+
+    def contains(self, key: WarningKey) -> bool:
+        return key in self.entries
+
+    def add(self, key: WarningKey, warning: tuple) -> None:
+        """
+        Applies a committed warn to the cached warnings of the user, if they are cached.
+
+        :param key: The (server_id, user_id) key.
+        :param warning: The warn row, its ID being the last column.
+        """
+        self.generation += 1
+        warnings = self.entries.get(key)
+        if warnings is not None and all(row[-1] != warning[-1] for row in warnings):
+            warnings.append(warning)
+            warnings.sort(key=lambda row: row[-1])
+
+    def remove(self, key: WarningKey, warn_id: int) -> Optional[int]:
+        """
+        Applies a committed removal to the cached warnings of the user, if they are cached.
+
+        :param key: The (server_id, user_id) key.
+        :param warn_id: The ID of the removed warn.
+        :return: The number of warnings left, or ``None`` when they are not cached.
+        """
+        self.generation += 1
+        warnings = self.entries.get(key)
+        if warnings is None:
+            return None
+        warnings[:] = [row for row in warnings if row[-1] != warn_id]
+        return len(warnings)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+        }
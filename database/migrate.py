@@ -0,0 +1,67 @@
+import os
+import re
+from typing import List, NamedTuple
+
+from database.backend import Database
+
+MIGRATIONS_FOLDER = os.path.join(os.path.dirname(os.path.realpath(__file__)), "migrations")
+MIGRATION_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+
+
+def discover_migrations(folder: str) -> List[Migration]:
+    """
+    Lists the migration files of a folder, ordered by version.
+
+    :param folder: The folder that contains the ``<version>_<name>.sql`` files.
+    """
+    migrations = []
+    for file in os.listdir(folder):
+        match = MIGRATION_PATTERN.match(file)
+        if match is not None:
+            migrations.append(
+                Migration(int(match.group(1)), match.group(2), os.path.join(folder, file))
+            )
+    migrations.sort()
+    return migrations
+
+
+class MigrationRunner:
+    """
+    Brings a database up to the latest schema version.
+
+    Every backend has its own folder of migrations. Applied migrations are recorded in the
+    ``schema_migrations`` table, and each one runs in a single transaction together with its
+    bookkeeping, so a failing migration leaves the database at the previous version. A database
+    that is already up to date costs a single version lookup.
+    """
+
+    def __init__(self, database: Database, *, folder: str = MIGRATIONS_FOLDER) -> None:
+        """
+        :param database: The database to migrate.
+        :param folder: The folder that contains a folder of migration files per backend.
+        """
+        self.database = database
+        self.migrations = discover_migrations(os.path.join(folder, database.dialect))
+
+    async def current_version(self) -> int:
+        return await self.database.schema_version()
+
+    async def run(self) -> List[Migration]:
+        """
+        Applies the migrations that are newer than the database.
+
+        :return: The migrations that were applied.
+        """
+        version = await self.current_version()
+        pending = [migration for migration in self.migrations if migration.version > version]
+        for migration in pending:
+            with open(migration.path) as file:
+                script = file.read()
+            await self.database.apply_migration(migration.version, migration.name, script)
+        return pending
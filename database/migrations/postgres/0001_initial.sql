@@ -0,0 +1,28 @@
+CREATE TABLE IF NOT EXISTS warns (
+  server_id bigint NOT NULL,
+  user_id bigint NOT NULL,
+  id integer NOT NULL,
+  moderator_id bigint NOT NULL,
+  reason varchar(255) NOT NULL,
+  created_at bigint NOT NULL DEFAULT EXTRACT(EPOCH FROM now())::bigint,
+  PRIMARY KEY (server_id, user_id, id)
+);
+
+CREATE TABLE IF NOT EXISTS conversations (
+  guild_id bigint NOT NULL,
+  channel_id bigint NOT NULL,
+  user_id bigint NOT NULL,
+  turns text NOT NULL,
+  updated_at double precision NOT NULL,
+  summary text NOT NULL DEFAULT '',
+  folded_tokens integer NOT NULL DEFAULT 0,
+  PRIMARY KEY (guild_id, channel_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS response_cache (
+  key varchar(64) NOT NULL PRIMARY KEY,
+  response text NOT NULL,
+  created_at double precision NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS response_cache_created_at ON response_cache (created_at);
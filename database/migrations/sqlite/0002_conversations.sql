@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS `conversations` (
+  `guild_id` integer NOT NULL,
+  `channel_id` integer NOT NULL,
+  `user_id` integer NOT NULL,
+  `turns` text NOT NULL,
+  `updated_at` real NOT NULL,
+  `summary` text NOT NULL DEFAULT '',
+  `folded_tokens` integer NOT NULL DEFAULT 0,
+  PRIMARY KEY (`guild_id`, `channel_id`, `user_id`)
+);
@@ -0,0 +1,7 @@
+CREATE TABLE IF NOT EXISTS `response_cache` (
+  `key` varchar(64) NOT NULL PRIMARY KEY,
+  `response` text NOT NULL,
+  `created_at` real NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS `response_cache_created_at` ON `response_cache` (`created_at`);
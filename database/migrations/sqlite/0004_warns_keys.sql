@@ -0,0 +1,38 @@
+-- Rebuilds `warns` with a (server_id, user_id, id) primary key. Snowflakes become integers and
+-- timestamps become unix seconds. Warns that raced to the same ID keep their data and get new IDs
+-- after the last one of the user. Running it on a table that is already keyed changes nothing.
+ALTER TABLE `warns` RENAME TO `warns_old`;
+
+CREATE TABLE `warns` (
+  `server_id` integer NOT NULL,
+  `user_id` integer NOT NULL,
+  `id` integer NOT NULL,
+  `moderator_id` integer NOT NULL,
+  `reason` varchar(255) NOT NULL,
+  `created_at` integer NOT NULL DEFAULT (strftime('%s', 'now')),
+  PRIMARY KEY (`server_id`, `user_id`, `id`)
+) WITHOUT ROWID;
+
+WITH `numbered` AS (
+  SELECT
+    CAST(`server_id` AS integer) AS `server_id`,
+    CAST(`user_id` AS integer) AS `user_id`,
+    `id`,
+    CAST(`moderator_id` AS integer) AS `moderator_id`,
+    `reason`,
+    CASE
+      WHEN typeof(`created_at`) = 'integer' THEN `created_at`
+      ELSE CAST(strftime('%s', `created_at`) AS integer)
+    END AS `created_at`,
+    ROW_NUMBER() OVER (PARTITION BY `server_id`, `user_id`, `id` ORDER BY `created_at`) AS `copy`,
+    MAX(`id`) OVER (PARTITION BY `server_id`, `user_id`) AS `last_id`
+  FROM `warns_old`
+), `renumbered` AS (
+  SELECT *, ROW_NUMBER() OVER (PARTITION BY `server_id`, `user_id`, `copy` > 1 ORDER BY `id`, `created_at`) AS `extra`
+  FROM `numbered`
+)
+INSERT INTO `warns`(`server_id`, `user_id`, `id`, `moderator_id`, `reason`, `created_at`)
+SELECT `server_id`, `user_id`, CASE WHEN `copy` = 1 THEN `id` ELSE `last_id` + `extra` END, `moderator_id`, `reason`, `created_at`
+FROM `renumbered`;
+
+DROP TABLE `warns_old`;
@@ -0,0 +1,128 @@
+import functools
+import re
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from database.backend import Connection, Database
+
+# Key of the advisory lock taken by write transactions. Every process sharing the database takes
+# the same one, so writes are serialized like with SQLite and warn IDs are still allocated safely
+WRITE_LOCK = 0x7761726E
+
+
+@functools.lru_cache(maxsize=512)
+def convert_placeholders(query: str) -> str:
+    """
+    Turns the ``?`` placeholders of a query into the numbered ``$n`` ones of PostgreSQL.
+
+    :param query: The query written with ``?`` placeholders.
+    """
+    counter = iter(range(1, query.count("?") + 1))
+    return re.sub(r"\?", lambda _: f"${next(counter)}", query)
+
+
+def rows_changed(status: str) -> int:
+    # asyncpg returns the command tag, such as "DELETE 2" or "INSERT 0 1"
+    count = status.rsplit(" ", 1)[-1]
+    return int(count) if count.isdigit() else 0
+
+
+class PostgresConnection(Connection):
+    def __init__(self, connection) -> None:
+        self.connection = connection
+
+    async def execute(self, query: str, parameters: tuple = ()) -> int:
+        return rows_changed(
+            await self.connection.execute(convert_placeholders(query), *parameters)
+        )
+
+    async def fetchone(self, query: str, parameters: tuple = ()) -> Optional[tuple]:
+        row = await self.connection.fetchrow(convert_placeholders(query), *parameters)
+        return tuple(row) if row is not None else None
+
+    async def fetchall(self, query: str, parameters: tuple = ()) -> list:
+        rows = await self.connection.fetch(convert_placeholders(query), *parameters)
+        return [tuple(row) for row in rows]
+
+
+class PostgresDatabase(Database):
+    """
+    A pool of asyncpg connections to a PostgreSQL server, for several bot processes sharing data.
+
+    Reads use any pooled connection. Write transactions take a transaction-level advisory lock, so
+    they run one at a time across every process, which is what the warn ID allocation relies on.
+    asyncpg keeps a cache of prepared statements per connection.
+    """
+
+    dialect = "postgres"
+
+    def __init__(self, dsn: str, *, pool_size: int = 10, statement_cache: int = 256) -> None:
+        """
+        :param dsn: The connection string of the server.
+        :param pool_size: The maximum number of pooled connections.
+        :param statement_cache: The number of prepared statements each connection keeps.
+        """
+        self.dsn = dsn
+        self.pool_size = pool_size
+        self.statement_cache = statement_cache
+        self.pool = None
+
+    async def connect(self) -> None:
+        try:
+            import asyncpg
+        except ImportError:
+            raise RuntimeError(
+                "The postgres database backend needs asyncpg, install it with 'pip install asyncpg'"
+            )
+        self.pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=1,
+            max_size=self.pool_size,
+            statement_cache_size=self.statement_cache,
+        )
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[PostgresConnection]:
+        async with self.pool.acquire() as connection:
+            yield PostgresConnection(connection)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[PostgresConnection]:
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.execute("SELECT pg_advisory_xact_lock($1)", WRITE_LOCK)
+                yield PostgresConnection(connection)
+
+    async def schema_version(self) -> int:
+        async with self.pool.acquire() as connection:
+            exists = await connection.fetchval(
+                "SELECT to_regclass('schema_migrations') IS NOT NULL"
+            )
+            if not exists:
+                return 0
+            return await connection.fetchval(
+                "SELECT COALESCE(MAX(version), 0) FROM schema_migrations"
+            )
+
+    async def apply_migration(self, version: int, name: str, script: str) -> None:
+        async with self.transaction() as transaction:
+            connection = transaction.connection
+            await connection.execute(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version integer NOT NULL PRIMARY KEY, name varchar(255) NOT NULL, "
+                "applied_at bigint NOT NULL DEFAULT EXTRACT(EPOCH FROM now())::bigint)"
+            )
+            # Another process may have applied it while this one waited for the lock
+            if await connection.fetchval(
+                "SELECT 1 FROM schema_migrations WHERE version=$1", version
+            ):
+                return
+            await connection.execute(script)
+            await connection.execute(
+                "INSERT INTO schema_migrations(version, name) VALUES ($1, $2)", version, name
+            )
@@ -0,0 +1,155 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import aiosqlite
+
+from database.backend import Connection, Database
+
+# Applied to every connection. WAL lets the readers run while the writer commits, and with WAL a
+# synchronous level of NORMAL is still safe against corruption while skipping an fsync per commit
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA mmap_size=67108864",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+class SQLiteConnection(Connection):
+    def __init__(self, connection: aiosqlite.Connection) -> None:
+        self.connection = connection
+
+    async def execute(self, query: str, parameters: tuple = ()) -> int:
+        async with self.connection.execute(query, parameters) as cursor:
+            return cursor.rowcount
+
+    async def fetchone(self, query: str, parameters: tuple = ()) -> Optional[tuple]:
+        async with self.connection.execute(query, parameters) as cursor:
+            return await cursor.fetchone()
+
+    async def fetchall(self, query: str, parameters: tuple = ()) -> list:
+        async with self.connection.execute(query, parameters) as cursor:
+            return list(await cursor.fetchall())
+
+
+class SQLiteDatabase(Database):
+    """
+    A small pool of aiosqlite connections to one database file.
+
+    SQLite allows a single writer at a time, so there is exactly one writer connection, guarded by a
+    lock, and a few read-only connections that queries are spread across. Every connection keeps a
+    cache of prepared statements, so the same queries are not compiled again on every call.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(
+        self, path: str, *, readers: int = 4, statement_cache: int = 256
+    ) -> None:
+        """
+        :param path: The path to the database file.
+        :param readers: The number of read-only connections.
+        :param statement_cache: The number of prepared statements each connection keeps.
+        """
+        self.path = path
+        self.reader_count = readers
+        self.statement_cache = statement_cache
+        self.writer: Optional[aiosqlite.Connection] = None
+        self.write_lock = asyncio.Lock()
+        self.readers: asyncio.Queue = asyncio.Queue()
+        self.opened_readers = 0
+        self.connections: list = []
+
+    async def open_connection(self, *, read_only: bool) -> aiosqlite.Connection:
+        # Transactions are started explicitly, so the sqlite3 module must not open them on its own
+        connection = await aiosqlite.connect(
+            self.path, isolation_level=None, cached_statements=self.statement_cache
+        )
+        for pragma in PRAGMAS:
+            await connection.execute(pragma)
+        if read_only:
+            await connection.execute("PRAGMA query_only=ON")
+        self.connections.append(connection)
+        return connection
+
+    async def connect(self) -> None:
+        """
+        Opens the writer connection.
+
+        Readers are opened on first use, so they are only created once the startup schema changes
+        are done and the writer has switched the file to WAL.
+        """
+        self.writer = await self.open_connection(read_only=False)
+
+    async def close(self) -> None:
+        """
+        Closes every connection of the pool.
+        """
+        async with self.write_lock:
+            for connection in self.connections:
+                await connection.close()
+            self.connections.clear()
+            self.writer = None
+            self.readers = asyncio.Queue()
+            self.opened_readers = 0
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[SQLiteConnection]:
+        if self.readers.empty() and self.opened_readers < self.reader_count:
+            self.opened_readers += 1
+            connection = await self.open_connection(read_only=True)
+        else:
+            connection = await self.readers.get()
+        try:
+            yield SQLiteConnection(connection)
+        finally:
+            self.readers.put_nowait(connection)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[SQLiteConnection]:
+        async with self.write_lock:
+            await self.writer.execute("BEGIN IMMEDIATE")
+            try:
+                yield SQLiteConnection(self.writer)
+            except BaseException:
+                await self.writer.rollback()
+                raise
+            await self.writer.commit()
+
+    async def executescript(self, script: str) -> None:
+        """
+        Runs a script of statements on the writer connection.
+
+        :param script: The SQL script.
+        """
+        async with self.write_lock:
+            try:
+                await self.writer.executescript(script)
+            except BaseException:
+                # A script that opened its own transaction must not leave it open on failure
+                if self.writer.in_transaction:
+                    await self.writer.rollback()
+                raise
+
+    async def schema_version(self) -> int:
+        # The version is mirrored in the header of the file, so reading it needs no table lookup
+        async with self.write_lock:
+            async with self.writer.execute("PRAGMA user_version") as cursor:
+                result = await cursor.fetchone()
+        return result[0]
+
+    async def apply_migration(self, version: int, name: str, script: str) -> None:
+        # executescript commits any open transaction first, so the script opens its own
+        await self.executescript(
+            "CREATE TABLE IF NOT EXISTS `schema_migrations` ("
+            "`version` integer NOT NULL PRIMARY KEY, `name` varchar(255) NOT NULL, "
+            "`applied_at` integer NOT NULL DEFAULT (strftime('%s', 'now')));\n"
+            f"BEGIN IMMEDIATE;\n{script}\n"
+            f"INSERT INTO `schema_migrations`(`version`, `name`) VALUES ({version}, '{name}');\n"
+            f"PRAGMA user_version = {version};\n"
+            "COMMIT;"
+        )
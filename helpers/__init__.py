@@ -0,0 +1,3 @@
+"""
+Shared services used by the bot and its cogs.
+"""
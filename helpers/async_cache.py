@@ -0,0 +1,147 @@
+import asyncio
+import functools
+import time
+import types
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+
+class CacheEntry:
+    def __init__(self, value: Any) -> None:
+        self.value = value
+        self.fetched_at = time.monotonic()
+
+
+def cached(ttl: float, stale_ttl: float = 0.0) -> Callable:
+    """
+    Caches the result of a coroutine function per set of arguments.
+
+    Concurrent callers of a missing or expired entry share a single in-flight call. An entry older
+    than ``ttl`` but younger than ``ttl + stale_ttl`` is still returned right away while it is
+    refreshed in the background. ``None`` results and exceptions are never cached.
+
+    On a method, every instance gets a cache of its own, stored on the instance, so a reloaded cog
+    does not keep the previous one alive.
+
+    :param ttl: The number of seconds a result is fresh.
+    :param stale_ttl: The number of seconds a result may still be served while it is refreshed.
+    """
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> "CachedFunction":
+        return CachedFunction(func, ttl, stale_ttl)
+
+    return decorator
+
+
+class CachedFunction:
+    """
+    A coroutine function wrapped by ``cached``, with the results of its calls.
+    """
+
+    def __init__(self, func: Callable[..., Awaitable[Any]], ttl: float, stale_ttl: float) -> None:
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = getattr(func, "__name__", None)
+        self.entries = {}
+        self.inflight = {}
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> "CachedFunction":
+        if instance is None:
+            return self
+        # The bound function replaces this one in the dictionary of the instance, so its cache is
+        # found there on the next lookups and goes away with the instance
+        bound = CachedFunction(types.MethodType(self.func, instance), self.ttl, self.stale_ttl)
+        instance.__dict__[self.name] = bound
+        return bound
+
+    async def fetch(self, key, args, kwargs) -> Any:
+        try:
+            value = await self.func(*args, **kwargs)
+            if value is not None:
+                self.entries[key] = CacheEntry(value)
+            return value
+        finally:
+            self.inflight.pop(key, None)
+
+    def start(self, key, args, kwargs) -> asyncio.Task:
+        task = self.inflight.get(key)
+        if task is None:
+            task = self.inflight[key] = asyncio.create_task(self.fetch(key, args, kwargs))
+            # Background refreshes have no caller, retrieve their exception so it is not reported
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def __call__(self, *args, **kwargs) -> Any:
+        key = (args, tuple(sorted(kwargs.items())))
+        entry = self.entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self.start(key, args, kwargs)
+                return entry.value
+        # Shielded so that a cancelled caller does not cancel the call the others wait for
+        return await asyncio.shield(self.start(key, args, kwargs))
+
+    def invalidate(self) -> None:
+        self.entries.clear()
+
+
+class PrefetchPool:
+    """
+    Keeps a few results of a coroutine function ready, for endpoints that return a different value
+    on every call and therefore cannot be cached.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[Any]], *, size: int = 5) -> None:
+        """
+        :param fetch: The coroutine function producing a value, or ``None`` or an exception on failure.
+        :param size: The number of values kept ready.
+        """
+        self.fetch = fetch
+        self.size = size
+        self.values = deque()
+        self.refill_task: Optional[asyncio.Task] = None
+
+    async def get(self) -> Any:
+        """
+        Returns a prefetched value, or fetches one if the pool is empty, and refills the pool in
+        the background.
+
+        :return: The value, or ``None`` if the pool was empty and the fetch failed or raised.
+        """
+        if self.values:
+            value = self.values.popleft()
+        else:
+            try:
+                value = await self.fetch()
+            except Exception:
+                # The caller gets None, as for a fetch that failed without raising
+                value = None
+        self.refill()
+        return value
+
+    def refill(self) -> None:
+        if self.refill_task is None or self.refill_task.done():
+            self.refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        missing = self.size - len(self.values)
+        if missing <= 0:
+            return
+        results = await asyncio.gather(
+            *(self.fetch() for _ in range(missing)), return_exceptions=True
+        )
+        for result in results:
+            if result is not None and not isinstance(result, BaseException):
+                self.values.append(result)
+
+    def close(self) -> None:
+        if self.refill_task is not None:
+            self.refill_task.cancel()
@@ -0,0 +1,124 @@
+import logging
+from typing import Optional
+
+from helpers.conversations import estimate_tokens, turn_text
+from helpers.gemini import DEFAULT_MODEL, GeminiClient, GeminiError
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an assistant.
+
+Current summary:
+{summary}
+
+New turns to fold into the summary:
+{turns}
+
+Rewrite the summary so it also covers the new turns. Keep names, facts, decisions and open questions, drop small talk, and answer with the summary only, in at most {max_words} words."""
+
+
+class HistoryCompactor:
+    """
+    Folds the oldest turns of a conversation into a rolling summary once it passes a token budget.
+
+    The summary is extended incrementally: only the turns being folded are sent together with the
+    previous summary, never the whole conversation again.
+    """
+
+    def __init__(
+        self,
+        client: GeminiClient,
+        *,
+        token_budget: int = 4000,
+        keep_turns: int = 6,
+        max_summary_words: int = 250,
+        model_name: str = DEFAULT_MODEL,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """
+        :param client: The Gemini client used to write the summaries.
+        :param token_budget: The estimated number of tokens after which a conversation is compacted.
+        :param keep_turns: The number of most recent turns that are never folded.
+        :param max_summary_words: The length the summary is asked to stay under.
+        :param model_name: The Gemini model used to write the summaries.
+        :param logger: The logger compactions are reported to.
+        """
+        self.client = client
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.max_summary_words = max_summary_words
+        self.model_name = model_name
+        self.logger = logger or logging.getLogger("discord_bot")
+        self.requests = 0
+        self.tokens_saved = 0
+        self.compactions = 0
+
+    def needs_compaction(self, conversation) -> bool:
+        return (
+            conversation.tokens > self.token_budget
+            and len(conversation.turns) > self.keep_turns
+        )
+
+    def record_request(self, conversation) -> int:
+        """
+        Records the number of tokens a request did not have to send thanks to the summary.
+
+        :param conversation: The conversation used by the request.
+        :return: The number of tokens saved by this request.
+        """
+        saved = max(conversation.folded_tokens - conversation.summary_tokens, 0)
+        self.requests += 1
+        self.tokens_saved += saved
+        return saved
+
+    def stats(self) -> dict:
+        return {
+            "compactions": self.compactions,
+            "requests": self.requests,
+            "tokens_saved": self.tokens_saved,
+            "tokens_saved_per_request": (
+                self.tokens_saved / self.requests if self.requests else 0.0
+            ),
+        }
+
+    async def compact(self, conversation) -> None:
+        """
+        Folds every turn but the most recent ones into the summary of the conversation.
+
+        :param conversation: The conversation to compact.
+        """
+        # Fold whole user/model pairs so the remaining history still starts with a user turn
+        fold_count = len(conversation.turns) - self.keep_turns
+        fold_count -= fold_count % 2
+        if fold_count <= 0:
+            return
+        folded = conversation.turns[:fold_count]
+        transcript = "\n".join(
+            f"{turn['role'].capitalize()}: {turn_text(turn)}" for turn in folded
+        )
+        prompt = SUMMARY_PROMPT.format(
+            summary=conversation.summary or "(empty)",
+            turns=transcript,
+            max_words=self.max_summary_words,
+        )
+        try:
+            summary = await self.client.generate(prompt, model_name=self.model_name)
+        except GeminiError as e:
+            self.logger.warning(f"Could not compact a conversation: {e}")
+            return
+
+        # New turns may have been added, or old ones trimmed, while the summary was being written
+        folded_ids = {id(turn) for turn in folded}
+        remaining = []
+        folded_tokens = 0
+        for turn in conversation.turns:
+            if id(turn) in folded_ids:
+                folded_tokens += estimate_tokens(turn_text(turn))
+            else:
+                remaining.append(turn)
+        conversation.turns = remaining
+        conversation.tokens -= folded_tokens
+        conversation.folded_tokens += folded_tokens
+        conversation.set_summary(summary.strip())
+        self.compactions += 1
+        self.logger.info(
+            f"Compacted a conversation: folded {len(folded)} turns ({folded_tokens} tokens) into a {conversation.summary_tokens} tokens summary"
+        )
@@ -0,0 +1,242 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    from database.backend import Database
+    from helpers.compaction import HistoryCompactor
+
+ConversationKey = Tuple[int, int, int]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimates the number of tokens of a text, Gemini averages about four characters per token.
+
+    :param text: The text to estimate.
+    """
+    return len(text) // 4 + 1
+
+
+def turn_text(turn: dict) -> str:
+    return "".join(part for part in turn["parts"] if isinstance(part, str))
+
+
+class Conversation:
+    def __init__(
+        self,
+        turns: Optional[list] = None,
+        updated_at: Optional[float] = None,
+        summary: str = "",
+        folded_tokens: int = 0,
+    ) -> None:
+        self.turns = turns or []
+        self.tokens = sum(estimate_tokens(turn_text(turn)) for turn in self.turns)
+        self.updated_at = updated_at or time.time()
+        self.folded_tokens = folded_tokens
+        self.set_summary(summary)
+
+    def set_summary(self, summary: str) -> None:
+        self.summary = summary
+        self.summary_tokens = estimate_tokens(summary) if summary else 0
+
+    def prompt_history(self) -> list:
+        """
+        Returns the turns to send to the model, preceded by the summary of the folded turns if there is one.
+        """
+        if not self.summary:
+            return list(self.turns)
+        return [
+            {"role": "user", "parts": [f"Summary of our earlier conversation:\n{self.summary}"]},
+            {"role": "model", "parts": ["Got it, I will keep that in mind."]},
+        ] + self.turns
+
+
+class ConversationStore:
+    """
+    Keeps one Gemini conversation per (guild, channel, user).
+
+    Conversations live in an in-memory LRU and are trimmed to a number of turns and tokens. Idle
+    conversations expire, and when a database is given every change is also written to
+    the ``conversations`` table so they survive restarts. With a compactor, conversations over its
+    token budget get their oldest turns folded into a summary in the background.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_conversations: int = 1000,
+        max_turns: int = 40,
+        max_tokens: int = 8000,
+        idle_timeout: float = 3600.0,
+        database: Optional["Database"] = None,
+        compactor: Optional["HistoryCompactor"] = None,
+    ) -> None:
+        """
+        :param max_conversations: The number of conversations kept in memory.
+        :param max_turns: The number of turns kept per conversation.
+        :param max_tokens: The estimated number of tokens kept per conversation.
+        :param idle_timeout: The number of seconds after which an unused conversation is dropped.
+        :param database: The database used to persist conversations, if any.
+        :param compactor: The compactor that summarizes long conversations, if any.
+        """
+        self.max_conversations = max_conversations
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.idle_timeout = idle_timeout
+        self.database = database
+        self.compactor = compactor
+        self.compacting = {}
+        self.conversations: "OrderedDict[ConversationKey, Conversation]" = OrderedDict()
+
+    @staticmethod
+    def key(guild_id: Optional[int], channel_id: int, user_id: int) -> ConversationKey:
+        """
+        Builds the key of a conversation. Direct messages have no guild and use ``0``.
+        """
+        return (guild_id or 0, channel_id, user_id)
+
+    def is_expired(self, conversation: Conversation, now: float) -> bool:
+        return now - conversation.updated_at > self.idle_timeout
+
+    def prune(self, now: float) -> None:
+        """
+        Drops expired conversations and the least recently used ones above the size limit.
+        The dictionary is kept in usage order and ``get`` stamps every conversation it returns with
+        the time of use, so the expired entries are always at the front.
+        """
+        while self.conversations:
+            key, conversation = next(iter(self.conversations.items()))
+            if not self.is_expired(conversation, now) and len(self.conversations) <= self.max_conversations:
+                break
+            del self.conversations[key]
+
+    async def get(self, key: ConversationKey) -> Conversation:
+        """
+        Returns the conversation for the given key, loading it from the database if needed.
+
+        :param key: The key of the conversation.
+        """
+        now = time.time()
+        conversation = self.conversations.get(key)
+        if conversation is not None and self.is_expired(conversation, now):
+            conversation = None
+            await self.reset(key)
+        if conversation is None:
+            conversation = await self.load(key, now) or Conversation(updated_at=now)
+            self.conversations[key] = conversation
+        # Reading a conversation counts as using it, its idle time starts over
+        conversation.updated_at = now
+        self.conversations.move_to_end(key)
+        self.prune(now)
+        return conversation
+
+    async def get_history(self, key: ConversationKey) -> list:
+        """
+        Returns the history to send to the model for a conversation.
+
+        :param key: The key of the conversation.
+        """
+        conversation = await self.get(key)
+        return conversation.prompt_history()
+
+    def record_request(self, key: ConversationKey) -> None:
+        """
+        Counts a model request sent with the history of a conversation, for the compaction statistics.
+
+        :param key: The key of the conversation.
+        """
+        conversation = self.conversations.get(key)
+        if self.compactor is not None and conversation is not None:
+            self.compactor.record_request(conversation)
+
+    async def append(self, key: ConversationKey, user_text: str, model_text: str) -> None:
+        """
+        Adds an exchange to a conversation, trimming the oldest turns when it grows past its limits.
+
+        :param key: The key of the conversation.
+        :param user_text: The message of the user.
+        :param model_text: The answer of the model.
+        """
+        conversation = await self.get(key)
+        for role, text in (("user", user_text), ("model", model_text)):
+            conversation.turns.append({"role": role, "parts": [text]})
+            conversation.tokens += estimate_tokens(text)
+        # Turns are dropped in user/model pairs so the history always starts with a user turn
+        while len(conversation.turns) > 2 and (
+            len(conversation.turns) > self.max_turns or conversation.tokens > self.max_tokens
+        ):
+            for removed in conversation.turns[:2]:
+                conversation.tokens -= estimate_tokens(turn_text(removed))
+            del conversation.turns[:2]
+        conversation.updated_at = time.time()
+        await self.save(key, conversation)
+        if (
+            self.compactor is not None
+            and key not in self.compacting
+            and self.compactor.needs_compaction(conversation)
+        ):
+            task = asyncio.create_task(self.compact(key, conversation))
+            self.compacting[key] = task
+            task.add_done_callback(lambda _: self.compacting.pop(key, None))
+
+    async def compact(self, key: ConversationKey, conversation: Conversation) -> None:
+        await self.compactor.compact(conversation)
+        # The conversation may have been reset while its summary was being written
+        if self.conversations.get(key) is conversation:
+            await self.save(key, conversation)
+
+    async def reset(self, key: ConversationKey) -> None:
+        """
+        Forgets a conversation.
+
+        :param key: The key of the conversation.
+        """
+        self.conversations.pop(key, None)
+        if self.database is not None:
+            await self.database.execute(
+                "DELETE FROM conversations WHERE guild_id=? AND channel_id=? AND user_id=?",
+                key,
+            )
+
+    async def close(self) -> None:
+        """
+        Cancels the compactions that are still running.
+        """
+        tasks = list(self.compacting.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def load(self, key: ConversationKey, now: float) -> Optional[Conversation]:
+        if self.database is None:
+            return None
+        result = await self.database.fetchone(
+            "SELECT turns, updated_at, summary, folded_tokens FROM conversations WHERE guild_id=? AND channel_id=? AND user_id=?",
+            key,
+        )
+        if result is None:
+            return None
+        conversation = Conversation(json.loads(result[0]), result[1], result[2], result[3])
+        if self.is_expired(conversation, now):
+            await self.reset(key)
+            return None
+        return conversation
+
+    async def save(self, key: ConversationKey, conversation: Conversation) -> None:
+        if self.database is None:
+            return
+        await self.database.execute(
+            "INSERT INTO conversations(guild_id, channel_id, user_id, turns, updated_at, summary, folded_tokens) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(guild_id, channel_id, user_id) DO UPDATE SET turns=excluded.turns, updated_at=excluded.updated_at, "
+            "summary=excluded.summary, folded_tokens=excluded.folded_tokens",
+            (
+                *key,
+                json.dumps(conversation.turns),
+                conversation.updated_at,
+                conversation.summary,
+                conversation.folded_tokens,
+            ),
+        )
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class DiskLRUCache:
+    """
+    A size-bounded cache of byte strings stored as files in a directory.
+
+    Recency is tracked in memory and mirrored in the modification time of the files, so the LRU
+    order survives restarts. Every method is blocking and thread safe, call them from a worker pool.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        """
+        :param directory: The directory the entries are stored in, created if needed.
+        :param max_bytes: The total size the entries may use.
+        :raises OSError: If the directory cannot be created or written to.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.sizes: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        if not os.access(directory, os.R_OK | os.W_OK | os.X_OK):
+            raise PermissionError(f"'{directory}' is not writable")
+        entries = []
+        for file_name in os.listdir(directory):
+            stat = os.stat(os.path.join(directory, file_name))
+            entries.append((stat.st_mtime, file_name, stat.st_size))
+        for _, file_name, size in sorted(entries):
+            self.sizes[file_name] = size
+            self.total_bytes += size
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path(key)
+        file_name = os.path.basename(path)
+        with self.lock:
+            if file_name not in self.sizes:
+                return None
+            self.sizes.move_to_end(file_name)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self.lock:
+                self.total_bytes -= self.sizes.pop(file_name, 0)
+            return None
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        path = self.path(key)
+        file_name = os.path.basename(path)
+        # Written under another name first so a reader never sees a partial file
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+        with self.lock:
+            self.total_bytes -= self.sizes.pop(file_name, 0)
+            self.sizes[file_name] = len(data)
+            self.total_bytes += len(data)
+            evicted = []
+            while self.total_bytes > self.max_bytes and len(self.sizes) > 1:
+                old_file_name, size = self.sizes.popitem(last=False)
+                self.total_bytes -= size
+                evicted.append(old_file_name)
+        for old_file_name in evicted:
+            try:
+                os.remove(os.path.join(self.directory, old_file_name))
+            except FileNotFoundError:
+                pass
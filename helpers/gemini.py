@@ -0,0 +1,224 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Optional
+
+from helpers.lazy_import import lazy_import
+
+# The SDK takes over a second to import, so it is imported after login or by the first model built
+genai = lazy_import("google.generativeai")
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+DEFAULT_GENERATION_CONFIG = {
+    "temperature": 1,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+    "response_mime_type": "text/plain",
+}
+
+
+class GeminiError(Exception):
+    """
+    Raised when the Gemini API could not produce a response.
+    """
+
+
+class GeminiTimeoutError(GeminiError):
+    """
+    Raised when a Gemini call did not finish within the configured timeout.
+    """
+
+
+class GeminiClient:
+    """
+    Non-blocking access to the Gemini API shared by every cog.
+
+    The SDK is synchronous, so each call runs on a bounded thread pool. A semaphore caps how many
+    calls are in flight at once and every call is given a timeout, so a slow model never freezes
+    the event loop.
+    """
+
+    def __init__(
+        self,
+        *,
+        api_key: Optional[str],
+        max_concurrency: int = 8,
+        timeout: float = 60.0,
+        model_factory: Optional[Callable[..., Any]] = None,
+    ) -> None:
+        """
+        :param api_key: The Google AI key used to configure the SDK.
+        :param max_concurrency: The maximum number of calls running at the same time.
+        :param timeout: The number of seconds a single call may take.
+        :param model_factory: Builds a model from a model name and a generation config. Defaults to ``genai.GenerativeModel``.
+        """
+        self.api_key = api_key
+        self.model_factory = model_factory
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="gemini"
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.models = {}
+
+    def get_model(
+        self, model_name: str = DEFAULT_MODEL, generation_config: Optional[dict] = None
+    ) -> Any:
+        """
+        Returns a model for the given name and configuration, building it only once.
+
+        :param model_name: The name of the Gemini model.
+        :param generation_config: The generation configuration of the model.
+        """
+        key = (model_name, json.dumps(generation_config, sort_keys=True))
+        model = self.models.get(key)
+        if model is None:
+            if self.model_factory is None:
+                genai.configure(api_key=self.api_key)
+                self.model_factory = genai.GenerativeModel
+            model = self.model_factory(
+                model_name=model_name, generation_config=generation_config
+            )
+            self.models[key] = model
+        return model
+
+    async def submit(self, func: Callable[..., Any], *args) -> asyncio.Future:
+        """
+        Starts a blocking function on the Gemini thread pool once a concurrency slot is free.
+
+        The slot is held until the worker thread is done, even when the caller gave up because of
+        the timeout, so the cap is respected by abandoned calls too.
+
+        :param func: The blocking function to run.
+        :return: The future of the call.
+        """
+        await self.semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self.executor, func, *args)
+        except BaseException:
+            self.semaphore.release()
+            raise
+        future.add_done_callback(lambda _: self.semaphore.release())
+        return future
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """
+        Runs a blocking function on the Gemini thread pool.
+
+        :param func: The blocking function to run.
+        :return: The value returned by the function.
+        """
+        future = await self.submit(func, *args)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise GeminiTimeoutError(
+                f"Gemini did not answer within {self.timeout} seconds"
+            ) from None
+
+    async def generate(
+        self,
+        contents: Any,
+        *,
+        model_name: str = DEFAULT_MODEL,
+        generation_config: Optional[dict] = None,
+    ) -> str:
+        """
+        Generates a response for the given contents.
+
+        :param contents: A prompt, a list of prompt parts or a list of conversation turns.
+        :param model_name: The name of the Gemini model.
+        :param generation_config: The generation configuration of the model.
+        :return: The text of the response.
+        """
+        model = self.get_model(model_name, generation_config)
+
+        def call() -> str:
+            try:
+                return model.generate_content(contents).text
+            except Exception as e:
+                raise GeminiError(str(e)) from e
+
+        return await self.run(call)
+
+    async def stream(
+        self,
+        contents: Any,
+        *,
+        model_name: str = DEFAULT_MODEL,
+        generation_config: Optional[dict] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Generates a response for the given contents and yields its text as it arrives.
+
+        :param contents: A prompt, a list of prompt parts or a list of conversation turns.
+        :param model_name: The name of the Gemini model.
+        :param generation_config: The generation configuration of the model.
+        """
+        model = self.get_model(model_name, generation_config)
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        finished = object()
+        stopped = threading.Event()
+
+        def produce() -> None:
+            try:
+                for chunk in model.generate_content(contents, stream=True):
+                    if stopped.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, GeminiError(str(e)))
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+        await self.submit(produce)
+        deadline = loop.time() + self.timeout
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    raise GeminiTimeoutError(
+                        f"Gemini did not answer within {self.timeout} seconds"
+                    ) from None
+                if item is finished:
+                    return
+                if isinstance(item, GeminiError):
+                    raise item
+                yield item
+        finally:
+            # Tell the worker thread to stop reading chunks nobody is waiting for
+            stopped.set()
+
+    async def chat(
+        self,
+        history: list,
+        message: Any,
+        *,
+        model_name: str = DEFAULT_MODEL,
+        generation_config: Optional[dict] = None,
+    ) -> str:
+        """
+        Sends a message on top of a conversation history. The history is not modified.
+
+        :param history: The previous turns, as ``{"role": ..., "parts": [...]}`` dictionaries.
+        :param message: The new user message.
+        :param model_name: The name of the Gemini model.
+        :param generation_config: The generation configuration of the model.
+        :return: The text of the response.
+        """
+        contents = list(history) + [{"role": "user", "parts": [message]}]
+        return await self.generate(
+            contents, model_name=model_name, generation_config=generation_config
+        )
+
+    def close(self) -> None:
+        """
+        Shuts the thread pool down without waiting for abandoned calls.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
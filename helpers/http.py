@@ -0,0 +1,131 @@
+import asyncio
+import bisect
+import json
+import time
+from typing import Any
+from urllib.parse import urlparse
+
+import aiohttp
+
+# Upper bounds, in milliseconds, of the latency histogram buckets
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HTTPResponse:
+    def __init__(self, status: int, headers: dict, body: bytes) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class LatencyHistogram:
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS) -> None:
+        """
+        :param bounds: The upper bounds of the buckets, in milliseconds and in increasing order.
+        """
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+    def observe(self, milliseconds: float) -> None:
+        self.buckets[bisect.bisect_left(self.bounds, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+
+    def to_dict(self) -> dict:
+        labels = [f"<={bound}ms" for bound in self.bounds] + [f">{self.bounds[-1]}ms"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "average_ms": self.total / self.count if self.count else 0.0,
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class HTTPClient:
+    """
+    The HTTP client shared by every cog.
+
+    It owns a single aiohttp session whose connector pools connections, caches DNS lookups and
+    limits the connections per host. Idempotent requests are retried with exponential backoff, and
+    the latency of every request is recorded in a histogram per host.
+    """
+
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        dns_cache_ttl: int = 300,
+        timeout: float = 15.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+    ) -> None:
+        """
+        :param limit: The maximum number of open connections.
+        :param limit_per_host: The maximum number of open connections to a single host.
+        :param dns_cache_ttl: The number of seconds DNS lookups are cached.
+        :param timeout: The total number of seconds a single attempt may take.
+        :param retries: The number of times a failed idempotent request is retried.
+        :param backoff: The delay before the first retry, doubled after every attempt.
+        """
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=limit,
+                limit_per_host=limit_per_host,
+                ttl_dns_cache=dns_cache_ttl,
+            ),
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        )
+        self.retries = retries
+        self.backoff = backoff
+        self.latencies = {}
+
+    def histogram(self, host: str) -> LatencyHistogram:
+        histogram = self.latencies.get(host)
+        if histogram is None:
+            histogram = self.latencies[host] = LatencyHistogram()
+        return histogram
+
+    async def request(self, method: str, url: str, **kwargs) -> HTTPResponse:
+        """
+        Sends a request and reads the whole response.
+
+        :param method: The HTTP method.
+        :param url: The URL to request.
+        :param kwargs: Passed to ``aiohttp.ClientSession.request``.
+        :return: The response, with its body already read.
+        """
+        histogram = self.histogram(urlparse(url).hostname or "")
+        retries = self.retries if method.upper() in ("GET", "HEAD", "OPTIONS") else 0
+        for attempt in range(retries + 1):
+            started_at = time.perf_counter()
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    body = await response.read()
+                    result = HTTPResponse(response.status, dict(response.headers), body)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                histogram.errors += 1
+                if attempt == retries:
+                    raise
+            else:
+                histogram.observe((time.perf_counter() - started_at) * 1000)
+                if result.status not in RETRY_STATUSES or attempt == retries:
+                    return result
+            await asyncio.sleep(self.backoff * 2**attempt)
+
+    async def get(self, url: str, **kwargs) -> HTTPResponse:
+        return await self.request("GET", url, **kwargs)
+
+    def latency_stats(self) -> dict:
+        return {host: histogram.to_dict() for host, histogram in self.latencies.items()}
+
+    async def close(self) -> None:
+        await self.session.close()
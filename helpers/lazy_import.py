@@ -0,0 +1,63 @@
+import asyncio
+import importlib
+import time
+from types import ModuleType
+
+# The time the first import of each lazy module took, in seconds
+IMPORT_TIMES = {}
+LAZY_MODULES = []
+
+
+class LazyModule:
+    """
+    Stands in for a module that is only imported when one of its attributes is first used.
+
+    Heavy libraries used by a handful of commands can then be imported after login, or the first
+    time such a command runs, instead of while the bot starts.
+    """
+
+    def __init__(self, name: str) -> None:
+        # Own attributes shadow the ones of the module, so they get names no module uses
+        self.lazy_name = name
+        self.lazy_module = None
+
+    def __getattr__(self, attribute: str):
+        return getattr(import_now(self), attribute)
+
+    def __repr__(self) -> str:
+        state = "imported" if self.lazy_module is not None else "not imported"
+        return f"<lazy module '{self.lazy_name}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Returns a proxy of a module that imports it on first use.
+
+    :param name: The full name of the module.
+    """
+    module = LazyModule(name)
+    LAZY_MODULES.append(module)
+    return module
+
+
+def import_now(lazy: LazyModule) -> ModuleType:
+    """
+    Imports the module behind a proxy, if it is not imported yet, and returns it.
+
+    :param lazy: The proxy of the module.
+    """
+    if lazy.lazy_module is None:
+        start = time.perf_counter()
+        module = importlib.import_module(lazy.lazy_name)
+        IMPORT_TIMES.setdefault(lazy.lazy_name, time.perf_counter() - start)
+        lazy.lazy_module = module
+    return lazy.lazy_module
+
+
+async def warm_up() -> None:
+    """
+    Imports every lazy module that is not imported yet on a worker thread, so that neither the
+    event loop nor the first command using them pays for the import.
+    """
+    for lazy in list(LAZY_MODULES):
+        await asyncio.to_thread(import_now, lazy)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from typing import Optional
+
+# Stack frames from files under this folder are the code of the bot, the others are libraries
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class LoopMonitor:
+    """
+    Watches the event loop for callbacks that block it.
+
+    A task sleeps for a short interval and records how late it wakes up, which is the lag every
+    other callback suffered at that moment. A watchdog thread checks that the task keeps waking up:
+    once it is late by more than the threshold, the loop is stuck in a callback, so the thread
+    captures the stack of the loop and the command the running task belongs to. The stall is logged
+    with its duration once the loop is free again.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        *,
+        interval: float = 0.25,
+        threshold: float = 0.25,
+        window: int = 2400,
+        stalls: int = 20,
+    ) -> None:
+        """
+        :param logger: The logger stalls are reported to.
+        :param interval: The number of seconds between two lag samples.
+        :param threshold: The lag, in seconds, from which the loop is considered blocked.
+        :param window: The number of samples the percentiles are computed over.
+        :param stalls: The number of recent stalls that are kept.
+        """
+        self.logger = logger
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = deque(maxlen=window)
+        self.stalls = deque(maxlen=stalls)
+        self.stall_count = 0
+        self.commands = weakref.WeakKeyDictionary()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread: Optional[int] = None
+        self.heartbeat = 0.0
+        self.capture = None
+        self.task: Optional[asyncio.Task] = None
+        self.stopped = threading.Event()
+
+    def start(self) -> None:
+        """
+        Starts sampling the running loop and watching it from another thread.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.task = asyncio.create_task(self.sample())
+        threading.Thread(target=self.watch, name="loop-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+
+    def label(self, command: str) -> None:
+        """
+        Names the command the current task runs, so that the stalls it causes can be traced to it.
+
+        :param command: The qualified name of the command.
+        """
+        task = asyncio.current_task()
+        if task is not None:
+            self.commands[task] = command
+
+    async def sample(self) -> None:
+        loop = self.loop
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.heartbeat = time.monotonic()
+            self.samples.append(lag)
+            capture, self.capture = self.capture, None
+            if lag >= self.threshold:
+                self.report(lag, capture)
+
+    def watch(self) -> None:
+        # Runs on the watchdog thread, while the loop thread may be stuck
+        captured_for = None
+        while not self.stopped.wait(self.threshold / 2):
+            heartbeat = self.heartbeat
+            if heartbeat == captured_for:
+                continue
+            if time.monotonic() - heartbeat < self.interval + self.threshold:
+                continue
+            captured_for = heartbeat
+            frame = sys._current_frames().get(self.loop_thread)
+            if frame is None:
+                continue
+            task = asyncio.current_task(self.loop)
+            if task is None:
+                command = "a callback outside of any task"
+            else:
+                command = self.commands.get(task) or task.get_name()
+            self.capture = (command, traceback.extract_stack(frame, limit=20))
+            del frame
+
+    def report(self, lag: float, capture: Optional[tuple]) -> None:
+        if capture is None:
+            # The stall was over before the watchdog looked at the loop
+            command, stack = "an unknown callback", traceback.StackSummary()
+        else:
+            command, stack = capture
+        own = [
+            frame
+            for frame in stack
+            if frame.filename.startswith(ROOT) and "site-packages" not in frame.filename
+        ]
+        if own:
+            frame = own[-1]
+            location = f"{os.path.relpath(frame.filename, ROOT)}:{frame.lineno} in {frame.name}"
+        elif stack:
+            frame = stack[-1]
+            location = f"{frame.filename}:{frame.lineno} in {frame.name}"
+        else:
+            location = "an unknown location"
+        formatted = "".join(stack.format())
+        self.stall_count += 1
+        self.stalls.append(
+            {
+                "time": time.time(),
+                "lag_ms": lag * 1000,
+                "command": command,
+                "location": location,
+                "stack": formatted,
+            }
+        )
+        self.logger.warning(
+            f"Event loop blocked for at least {lag * 1000:.0f}ms by {command} at {location}\n{formatted}".rstrip()
+        )
+
+    def stats(self) -> dict:
+        ordered = sorted(self.samples)
+        return {
+            "samples": len(ordered),
+            "p50_ms": percentile(ordered, 0.50) * 1000,
+            "p95_ms": percentile(ordered, 0.95) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+            "max_ms": (ordered[-1] if ordered else 0.0) * 1000,
+            "stalls": self.stall_count,
+        }
@@ -0,0 +1,213 @@
+import time
+from typing import Optional
+
+from aiohttp import web
+from discord.ext import commands
+
+from helpers.http import LatencyHistogram
+
+# Upper bounds, in milliseconds, of the command latency histogram buckets
+COMMAND_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+# Key of the start time of an application command in the extras of its interaction
+STARTED_AT = "metrics_started_at"
+
+
+def command_labels(command) -> tuple:
+    """
+    Returns the name, cog and type of a command, as used in its metrics.
+
+    :param command: A prefix, hybrid or application command.
+    """
+    # Hybrid commands invoked as slash commands run through an application command wrapping them
+    command = getattr(command, "wrapped", command)
+    if isinstance(command, (commands.HybridCommand, commands.HybridGroup)):
+        kind = "hybrid"
+    elif isinstance(command, commands.Command):
+        kind = "prefix"
+    else:
+        kind = "app"
+    if kind == "app":
+        cog = getattr(getattr(command, "binding", None), "qualified_name", None)
+    else:
+        cog = command.cog_name
+    return command.qualified_name, cog or "none", kind
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class CommandMetrics:
+    """
+    In-process registry of the invocations of every command.
+
+    Each invocation costs a couple of dictionary lookups and histogram updates, and nothing is
+    formatted until the metrics are scraped. Latencies are kept per command and per guild, errors
+    are counted per command and type.
+    """
+
+    def __init__(self) -> None:
+        self.commands = {}
+        self.guilds = {}
+        self.errors = {}
+        # The labels of a command never change, so they are only worked out once
+        self.labels = {}
+
+    def command_labels(self, command) -> tuple:
+        labels = self.labels.get(command)
+        if labels is None:
+            labels = self.labels[command] = command_labels(command)
+        return labels
+
+    def observe(
+        self, command, guild_id: Optional[int], seconds: float, *, failed: bool = False
+    ) -> None:
+        """
+        Records a finished invocation.
+
+        :param command: The command that was invoked.
+        :param guild_id: The ID of the guild it was invoked in, None in private messages.
+        :param seconds: How long the invocation took.
+        :param failed: Whether the invocation ended with an error.
+        """
+        milliseconds = seconds * 1000
+        labels = self.command_labels(command)
+        histogram = self.commands.get(labels)
+        if histogram is None:
+            histogram = self.commands[labels] = LatencyHistogram(COMMAND_BUCKETS)
+        histogram.observe(milliseconds)
+        if failed:
+            histogram.errors += 1
+        histogram = self.guilds.get(guild_id)
+        if histogram is None:
+            histogram = self.guilds[guild_id] = LatencyHistogram(COMMAND_BUCKETS)
+        histogram.observe(milliseconds)
+
+    def count_error(self, command, error: Exception) -> None:
+        """
+        Counts an error raised by a command, by type.
+
+        :param command: The command that failed, None if no command matched.
+        :param error: The error, with the one raised by the command itself when it is wrapped.
+        """
+        name = self.command_labels(command)[0] if command is not None else "none"
+        key = (name, type(getattr(error, "original", error)).__name__)
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    def start_interaction(self, interaction) -> None:
+        interaction.extras[STARTED_AT] = time.perf_counter()
+
+    def finish_interaction(self, interaction, *, failed: bool = False) -> None:
+        """
+        Records the application command of an interaction, once, when it finished.
+
+        :param interaction: The interaction the command was invoked with.
+        :param failed: Whether the command ended with an error.
+        """
+        started_at = interaction.extras.pop(STARTED_AT, None)
+        if started_at is None or interaction.command is None:
+            return
+        self.observe(
+            interaction.command,
+            interaction.guild_id,
+            time.perf_counter() - started_at,
+            failed=failed,
+        )
+
+    def render(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP discord_bot_command_invocations_total Commands invoked.",
+            "# TYPE discord_bot_command_invocations_total counter",
+        ]
+        labels = {
+            key: f'command="{escape(key[0])}",cog="{escape(key[1])}",type="{key[2]}"'
+            for key in self.commands
+        }
+        for key, histogram in self.commands.items():
+            lines.append(
+                f"discord_bot_command_invocations_total{{{labels[key]}}} {histogram.count}"
+            )
+        lines += [
+            "# HELP discord_bot_command_failures_total Command invocations that ended with an error.",
+            "# TYPE discord_bot_command_failures_total counter",
+        ]
+        for key, histogram in self.commands.items():
+            lines.append(
+                f"discord_bot_command_failures_total{{{labels[key]}}} {histogram.errors}"
+            )
+        lines += [
+            "# HELP discord_bot_command_errors_total Command errors by type.",
+            "# TYPE discord_bot_command_errors_total counter",
+        ]
+        for (command, error), count in self.errors.items():
+            lines.append(
+                f'discord_bot_command_errors_total{{command="{escape(command)}",error="{escape(error)}"}} {count}'
+            )
+        lines += [
+            "# HELP discord_bot_command_latency_seconds Latency of the command invocations.",
+            "# TYPE discord_bot_command_latency_seconds histogram",
+        ]
+        for key, histogram in self.commands.items():
+            lines += self.render_histogram(
+                "discord_bot_command_latency_seconds", labels[key], histogram
+            )
+        lines += [
+            "# HELP discord_bot_guild_command_latency_seconds Latency of the command invocations per guild.",
+            "# TYPE discord_bot_guild_command_latency_seconds histogram",
+        ]
+        for guild_id, histogram in self.guilds.items():
+            guild = str(guild_id) if guild_id is not None else "dm"
+            lines += self.render_histogram(
+                "discord_bot_guild_command_latency_seconds", f'guild="{guild}"', histogram
+            )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def render_histogram(name: str, labels: str, histogram: LatencyHistogram) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, histogram.buckets):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.total / 1000}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return lines
+
+
+class MetricsServer:
+    """
+    Serves the command metrics on ``/metrics`` for a Prometheus scraper.
+    """
+
+    def __init__(self, metrics: CommandMetrics) -> None:
+        self.metrics = metrics
+        self.runner: Optional[web.AppRunner] = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.metrics.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    async def start(self, host: str, port: int) -> None:
+        """
+        Starts listening for scrapes.
+
+        :param host: The address to listen on, keep it local unless the port is firewalled.
+        :param port: The port to listen on.
+        """
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+    async def close(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
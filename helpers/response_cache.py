@@ -0,0 +1,123 @@
+import hashlib
+import re
+import time
+from typing import TYPE_CHECKING, Optional
+
+from cachetools import LRUCache, TTLCache
+
+if TYPE_CHECKING:
+    from database.backend import Database
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalizes a prompt so that trivial differences in case and spacing share a cache entry.
+
+    :param prompt: The prompt to normalize.
+    """
+    return re.sub(r"\s+", " ", prompt).strip().lower()
+
+
+def image_digest(image_data: bytes) -> str:
+    return hashlib.sha256(image_data).hexdigest()
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of Gemini answers.
+
+    Entries are keyed by a hash of the normalized prompt and of the image, if any. They live in a
+    size-bounded LRU that expires them after a TTL and, when a database is given, in the
+    ``response_cache`` table so they survive restarts. Attachment IDs are mapped to the digest of
+    their image so a known attachment can be answered without downloading it again.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 1024,
+        ttl: float = 86400.0,
+        database: Optional["Database"] = None,
+    ) -> None:
+        """
+        :param max_entries: The number of answers kept in memory.
+        :param ttl: The number of seconds an answer stays valid.
+        :param database: The database used to persist answers, if any.
+        """
+        self.ttl = ttl
+        self.database = database
+        self.entries = TTLCache(maxsize=max_entries, ttl=ttl)
+        self.attachments = LRUCache(maxsize=max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    @staticmethod
+    def make_key(prompt: str, digest: Optional[str] = None) -> str:
+        """
+        Builds the cache key of a prompt.
+
+        :param prompt: The text of the prompt.
+        :param digest: The digest of the image sent with the prompt, if any.
+        """
+        content = f"{normalize_prompt(prompt)}\0{digest or ''}"
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def remember_attachment(self, attachment_id: int, digest: str) -> None:
+        self.attachments[attachment_id] = digest
+
+    def attachment_digest(self, attachment_id: int) -> Optional[str]:
+        return self.attachments.get(attachment_id)
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Returns the cached answer for a key, if there is a valid one.
+
+        :param key: The cache key.
+        """
+        response = self.entries.get(key)
+        if response is None and self.database is not None:
+            result = await self.database.fetchone(
+                "SELECT response FROM response_cache WHERE key=? AND created_at>?",
+                (key, time.time() - self.ttl),
+            )
+            if result is not None:
+                response = result[0]
+                self.entries[key] = response
+                self.disk_hits += 1
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    async def set(self, key: str, response: str) -> None:
+        """
+        Stores an answer.
+
+        :param key: The cache key.
+        :param response: The answer of the model.
+        """
+        self.entries[key] = response
+        if self.database is not None:
+            now = time.time()
+            async with self.database.transaction() as connection:
+                await connection.execute(
+                    "INSERT INTO response_cache(key, response, created_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET response=excluded.response, created_at=excluded.created_at",
+                    (key, response, now),
+                )
+                await connection.execute(
+                    "DELETE FROM response_cache WHERE created_at<=?", (now - self.ttl,)
+                )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "attachments": len(self.attachments),
+        }
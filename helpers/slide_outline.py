@@ -0,0 +1,197 @@
+import re
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+# Slide type tags of the outline, and the kind of slide they stand for
+SLIDE_TAGS = {
+    "L_TS": "title",
+    "L_CS": "content",
+    "L_IS": "image",
+    "L_THS": "thanks",
+}
+FIELD_TAGS = {"TITLE", "SUBTITLE", "CONTENT", "IMAGE"}
+BREAK_TAG = "SLIDEBREAK"
+
+# Only these names are tags, any other bracketed text is part of the outline
+TAG_NAMES = sorted([*SLIDE_TAGS, *FIELD_TAGS, BREAK_TAG])
+TAG_PREFIXES = sorted({name[:length] for name in TAG_NAMES for length in range(1, len(name) + 1)})
+
+TAG_PATTERN = re.compile(r"\[(/?)(" + "|".join(TAG_NAMES) + r")\]")
+# The beginning of a tag at the end of a chunk, completed by the next one
+PARTIAL_TAG_PATTERN = re.compile(r"\[/?(?:" + "|".join(TAG_PREFIXES) + r")?$")
+
+
+class SlideRecord:
+    def __init__(
+        self,
+        kind: str,
+        title: str = "",
+        subtitle: str = "",
+        content: str = "",
+        image: str = "",
+    ) -> None:
+        self.kind = kind
+        self.title = title
+        self.subtitle = subtitle
+        self.content = content
+        self.image = image
+        self.image_data: Optional[bytes] = None
+
+    def __repr__(self) -> str:
+        return f"<SlideRecord kind={self.kind!r} title={self.title!r}>"
+
+
+class OutlineParser:
+    """
+    Single-pass parser for the tag language the slide prompt asks Gemini to use.
+
+    Text can be fed in chunks as it is streamed, and every slide is returned as soon as its
+    ``[SLIDEBREAK]`` arrives. The parser is lenient: a field that is never closed ends when another
+    field opens or the slide ends, an ``[IMAGE]`` nested in a ``[CONTENT]`` is moved to the image of
+    the slide, and stray tags are ignored. Bracketed text that is not one of the tags, like ``[AI]``,
+    is kept as it is.
+    """
+
+    def __init__(self) -> None:
+        self.pending = ""
+        self.reset_slide()
+
+    def reset_slide(self) -> None:
+        self.kind: Optional[str] = None
+        self.fields = {name: [] for name in FIELD_TAGS}
+        self.stack: List[str] = []
+
+    def feed(self, text: str) -> List[SlideRecord]:
+        """
+        Parses a chunk of the outline.
+
+        :param text: The new text.
+        :return: The slides completed by this chunk.
+        """
+        text = self.pending + text
+        self.pending = ""
+        partial = PARTIAL_TAG_PATTERN.search(text, max(len(text) - 16, 0))
+        if partial is not None:
+            self.pending = text[partial.start():]
+            text = text[: partial.start()]
+
+        slides = []
+        position = 0
+        for match in TAG_PATTERN.finditer(text):
+            self.add_text(text[position : match.start()])
+            position = match.end()
+            closing, name = match.groups()
+            if name == BREAK_TAG:
+                slide = self.finish_slide()
+                if slide is not None:
+                    slides.append(slide)
+            elif name in SLIDE_TAGS:
+                if self.kind is None:
+                    self.kind = SLIDE_TAGS[name]
+            elif name in FIELD_TAGS:
+                if closing:
+                    self.close_field(name)
+                else:
+                    self.open_field(name)
+        self.add_text(text[position:])
+        return slides
+
+    def close(self) -> List[SlideRecord]:
+        """
+        Ends the outline, returning the last slide if it was not followed by a ``[SLIDEBREAK]``.
+        """
+        self.add_text(self.pending)
+        self.pending = ""
+        slide = self.finish_slide()
+        return [slide] if slide is not None else []
+
+    def add_text(self, text: str) -> None:
+        if text and self.stack:
+            self.fields[self.stack[-1]].append(text)
+
+    def open_field(self, name: str) -> None:
+        # Only an image may be nested, in the content, any other field ends the open ones
+        if not (name == "IMAGE" and self.stack == ["CONTENT"]):
+            self.stack.clear()
+        self.stack.append(name)
+
+    def close_field(self, name: str) -> None:
+        if name in self.stack:
+            del self.stack[self.stack.index(name):]
+
+    def finish_slide(self) -> Optional[SlideRecord]:
+        kind = self.kind
+        fields = {name.lower(): "".join(parts).strip() for name, parts in self.fields.items()}
+        self.reset_slide()
+        if kind is None:
+            return None
+        return SlideRecord(kind, **fields)
+
+
+def parse_outline(text: str) -> List[SlideRecord]:
+    """
+    Parses a whole outline at once.
+
+    :param text: The outline written by Gemini.
+    """
+    parser = OutlineParser()
+    return parser.feed(text) + parser.close()
+
+
+class OutlineSlide(BaseModel):
+    type: Literal["title", "content", "image", "thanks"]
+    title: str
+    subtitle: str = ""
+    content: str = ""
+    image_query: str = ""
+
+
+class Outline(BaseModel):
+    # A deck needs at least one slide, its title is the title of the first one
+    slides: List[OutlineSlide] = Field(min_length=1)
+
+
+# The same shape as ``Outline``, in the schema dialect Gemini accepts for constrained JSON output
+OUTLINE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "slides": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string", "enum": ["title", "content", "image", "thanks"]},
+                    "title": {"type": "string"},
+                    "subtitle": {"type": "string"},
+                    "content": {"type": "string"},
+                    "image_query": {"type": "string"},
+                },
+                "required": ["type", "title"],
+            },
+            "min_items": 1,
+        },
+    },
+    "required": ["slides"],
+}
+
+
+def parse_json_outline(text: str) -> List[SlideRecord]:
+    """
+    Validates a JSON outline and turns it into slide records.
+
+    :param text: The JSON outline written by Gemini.
+    :raises pydantic.ValidationError: If the outline is not valid JSON, does not match the schema or has
+        no slide.
+    """
+    outline = Outline.model_validate_json(text)
+    return [
+        SlideRecord(
+            slide.type,
+            title=slide.title.strip(),
+            subtitle=slide.subtitle.strip(),
+            content=slide.content.strip(),
+            image=slide.image_query.strip(),
+        )
+        for slide in outline.slides
+    ]
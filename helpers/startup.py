@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from helpers.lazy_import import IMPORT_TIMES
+
+
+class StartupReport:
+    """
+    Breaks down where the startup time of the bot went.
+
+    Phases of ``setup_hook`` are timed as a whole, and every extension records how long its module
+    took to import, including the construction of its cogs, and how long adding its cogs took.
+    """
+
+    def __init__(self) -> None:
+        self.phases = {}
+        self.extensions = {}
+        self.setup_times = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Times the block as a startup phase.
+
+        :param name: The name of the phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def record_extension(
+        self,
+        name: str,
+        total: float,
+        *,
+        on_demand: bool = False,
+        error: Optional[str] = None,
+    ) -> dict:
+        """
+        Records the loading of an extension.
+
+        :param name: The name of the extension.
+        :param total: The number of seconds ``load_extension`` took.
+        :param on_demand: Whether the extension was loaded after login rather than during startup.
+        :param error: The error that made the loading fail, if any.
+        """
+        setup = self.setup_times.pop(f"cogs.{name}", 0.0)
+        entry = {
+            "total": total,
+            "import": max(total - setup, 0.0),
+            "setup": setup,
+            "on_demand": on_demand,
+            "error": error,
+        }
+        self.extensions[name] = entry
+        return entry
+
+    def to_dict(self) -> dict:
+        return {
+            "phases": dict(self.phases),
+            "extensions": dict(self.extensions),
+            "lazy_imports": dict(IMPORT_TIMES),
+        }
+
+    def summary(self) -> str:
+        total = sum(self.phases.values())
+        phases = ", ".join(
+            f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items()
+        )
+        slowest = sorted(
+            (item for item in self.extensions.items() if not item[1]["on_demand"]),
+            key=lambda item: item[1]["total"],
+            reverse=True,
+        )[:3]
+        extensions = ", ".join(
+            f"{name} {entry['total'] * 1000:.0f}ms" for name, entry in slowest
+        )
+        return f"Startup took {total * 1000:.0f}ms ({phases}), slowest extensions: {extensions or 'none'}"
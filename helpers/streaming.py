@@ -0,0 +1,99 @@
+import logging
+import time
+from typing import AsyncIterator, Optional
+
+import discord
+
+
+class StreamingReply:
+    """
+    Shows an answer that is still being generated by editing a message as the text arrives.
+
+    Edits are coalesced to at most one every ``edit_interval`` seconds to stay within Discord's rate
+    limits, and once a message reaches ``max_length`` characters the rest continues in a new one.
+    """
+
+    def __init__(
+        self,
+        channel: discord.abc.Messageable,
+        *,
+        max_length: int = 2000,
+        edit_interval: float = 1.0,
+    ) -> None:
+        """
+        :param channel: The channel the answer is sent to.
+        :param max_length: The number of characters after which a new message is started.
+        :param edit_interval: The minimum number of seconds between two edits of a message.
+        """
+        self.channel = channel
+        self.max_length = max_length
+        self.edit_interval = edit_interval
+        self.message: Optional[discord.Message] = None
+        self.content = ""
+        self.shown = ""
+        self.last_edit = 0.0
+        self.first_visible_at: Optional[float] = None
+        self.text = ""
+
+    async def feed(self, chunk: str) -> None:
+        """
+        Adds a chunk of the answer, updating the message when enough time has passed.
+
+        :param chunk: The new text.
+        """
+        self.text += chunk
+        self.content += chunk
+        while len(self.content) > self.max_length:
+            await self.show(self.content[: self.max_length])
+            self.content = self.content[self.max_length :]
+            self.message = None
+            self.shown = ""
+        if self.message is None or time.monotonic() - self.last_edit >= self.edit_interval:
+            await self.show(self.content)
+
+    async def finish(self) -> None:
+        """
+        Makes sure the whole answer is visible.
+        """
+        await self.show(self.content)
+
+    async def show(self, content: str) -> None:
+        # Discord refuses empty messages, and editing to the same content is a wasted request
+        if not content.strip() or content == self.shown:
+            return
+        if self.message is None:
+            self.message = await self.channel.send(content)
+            if self.first_visible_at is None:
+                self.first_visible_at = time.monotonic()
+        else:
+            await self.message.edit(content=content)
+        self.shown = content
+        self.last_edit = time.monotonic()
+
+
+async def stream_reply(
+    channel: discord.abc.Messageable,
+    chunks: AsyncIterator[str],
+    *,
+    edit_interval: float = 1.0,
+    logger: Optional[logging.Logger] = None,
+) -> str:
+    """
+    Sends a streamed answer to a channel and logs how long it took for its first token to be visible.
+
+    :param channel: The channel the answer is sent to.
+    :param chunks: The text of the answer, as it is generated.
+    :param edit_interval: The minimum number of seconds between two edits of a message.
+    :param logger: The logger the timings are reported to.
+    :return: The whole answer.
+    """
+    started_at = time.monotonic()
+    reply = StreamingReply(channel, edit_interval=edit_interval)
+    async for chunk in chunks:
+        await reply.feed(chunk)
+    await reply.finish()
+    if logger is not None and reply.first_visible_at is not None:
+        logger.info(
+            f"Streamed an answer of {len(reply.text)} characters: first token visible after {reply.first_visible_at - started_at:.2f}s, done after {time.monotonic() - started_at:.2f}s"
+        )
+    return reply.text
@@ -0,0 +1,107 @@
+import asyncio
+import glob
+import inspect
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--no-postgres",
+        action="store_true",
+        help="Skip the PostgreSQL cases instead of failing when there is no server to run them on.",
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem: pytest.Function):
+    # Coroutine tests get an event loop of their own, without needing a plugin
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    arguments = {
+        name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames
+    }
+    asyncio.run(pyfuncitem.obj(**arguments))
+    return True
+
+
+def postgres_bin_folder():
+    """
+    Returns the folder of the PostgreSQL server programs, or None if there are none.
+
+    ``PG_BIN`` is looked at first, then the ``PATH``, the usual Debian folders and the server bundled
+    with the ``pgserver`` package.
+    """
+    folders = [os.getenv("PG_BIN")]
+    initdb = shutil.which("initdb")
+    if initdb is not None:
+        folders.append(os.path.dirname(initdb))
+    folders += sorted(glob.glob("/usr/lib/postgresql/*/bin"), reverse=True)
+    try:
+        import pgserver
+
+        folders.append(os.path.join(os.path.dirname(pgserver.__file__), "pginstall", "bin"))
+    except ImportError:
+        pass
+    for folder in folders:
+        if folder and all(
+            os.path.isfile(os.path.join(folder, program)) for program in ("initdb", "pg_ctl")
+        ):
+            return folder
+    return None
+
+
+@pytest.fixture(scope="session")
+def postgres_dsn(request: pytest.FixtureRequest):
+    """
+    The connection string of a PostgreSQL server for the tests.
+
+    ``DATABASE_URL`` is used when it is set. Otherwise a throwaway server is started from the local
+    PostgreSQL programs, listening on a Unix socket only, and removed after the session.
+    """
+    if request.config.getoption("--no-postgres"):
+        pytest.skip("The PostgreSQL cases are turned off with --no-postgres")
+    dsn = os.getenv("DATABASE_URL")
+    if dsn:
+        yield dsn
+        return
+    folder = postgres_bin_folder()
+    if folder is None:
+        pytest.fail(
+            "No PostgreSQL server to run the tests on: set DATABASE_URL, install PostgreSQL or set "
+            "PG_BIN to the folder of initdb and pg_ctl, or run pytest with --no-postgres",
+            pytrace=False,
+        )
+
+    directory = tempfile.mkdtemp(prefix="discord-bot-postgres-")
+    command = []
+    if hasattr(os, "geteuid") and os.geteuid() == 0:
+        # PostgreSQL refuses to run as root
+        shutil.chown(directory, "nobody")
+        command = ["runuser", "-u", "nobody", "--"]
+    data = os.path.join(directory, "data")
+    pg_ctl = command + [os.path.join(folder, "pg_ctl"), "-D", data]
+    subprocess.run(
+        command + [os.path.join(folder, "initdb"), "-D", data, "-U", "postgres", "--auth=trust", "-E", "UTF8"],
+        check=True,
+        capture_output=True,
+    )
+    subprocess.run(
+        pg_ctl
+        + ["-o", f"-k {directory} -c listen_addresses= -F", "-w", "-l", os.path.join(directory, "log"), "start"],
+        check=True,
+        capture_output=True,
+    )
+    try:
+        yield f"postgresql://postgres@/postgres?host={directory}"
+    finally:
+        subprocess.run(pg_ctl + ["-m", "immediate", "stop"], capture_output=True)
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,206 @@
+import asyncio
+import contextlib
+import gc
+import json
+import weakref
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import web
+
+import cogs.fun
+import cogs.general
+import helpers.async_cache
+from helpers.http import HTTPClient
+
+
+class FakeAPI:
+    """
+    Serves the bitcoin price and random fact endpoints on a local port, counting the hits.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        # Responses served before the default one, as (status, body) pairs
+        self.responses = deque()
+        # While set, requests wait for it to be released before being answered
+        self.gate: asyncio.Event = None
+        self.runner: web.AppRunner = None
+
+    async def answer(self, default: dict) -> web.Response:
+        self.hits += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.responses:
+            status, body = self.responses.popleft()
+        else:
+            status, body = 200, json.dumps(default)
+        return web.Response(status=status, text=body, content_type="application/json")
+
+    async def bitcoin(self, request: web.Request) -> web.Response:
+        return await self.answer({"bpi": {"USD": {"rate": str(self.hits + 1)}}})
+
+    async def fact(self, request: web.Request) -> web.Response:
+        return await self.answer({"text": f"Fact {self.hits + 1}"})
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/bitcoin", self.bitcoin)
+        app.router.add_get("/fact", self.fact)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+
+@contextlib.asynccontextmanager
+async def running_api(monkeypatch: pytest.MonkeyPatch):
+    api = FakeAPI()
+    url = await api.start()
+    monkeypatch.setattr(cogs.general, "BITCOIN_PRICE_URL", f"{url}/bitcoin")
+    monkeypatch.setattr(cogs.fun, "RANDOM_FACT_URL", f"{url}/fact")
+    # Failed responses are not retried, so that every call is a single hit
+    client = HTTPClient(retries=0)
+    bot = SimpleNamespace(
+        http_client=client, tree=SimpleNamespace(add_command=lambda command: None)
+    )
+    try:
+        yield api, bot
+    finally:
+        await client.close()
+        await api.runner.cleanup()
+
+
+async def until(predicate, timeout: float = 5.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "Timed out"
+        await asyncio.sleep(0.005)
+
+
+async def test_concurrent_calls_share_one_request(monkeypatch):
+    async with running_api(monkeypatch) as (api, bot):
+        general = cogs.general.General(bot)
+        api.gate = asyncio.Event()
+        calls = asyncio.gather(*(general.fetch_bitcoin_price() for _ in range(50)))
+        await until(lambda: api.hits == 1)
+        api.gate.set()
+        assert await calls == ["1"] * 50
+        assert await general.fetch_bitcoin_price() == "1"
+        assert api.hits == 1
+
+
+async def test_stale_value_is_served_during_refresh(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(helpers.async_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    async with running_api(monkeypatch) as (api, bot):
+        general = cogs.general.General(bot)
+        assert await general.fetch_bitcoin_price() == "1"
+
+        # Past the minute the price is fresh for, but within the stale period
+        now[0] += 61
+        api.gate = asyncio.Event()
+        assert await general.fetch_bitcoin_price() == "1"
+        await until(lambda: api.hits == 2)
+        # The refresh is still waiting for its answer and is not started twice
+        assert await general.fetch_bitcoin_price() == "1"
+        assert api.hits == 2
+        api.gate.set()
+
+        # Once the refresh is answered, the new price is fresh
+        for _ in range(500):
+            price = await general.fetch_bitcoin_price()
+            if price == "2":
+                break
+            await asyncio.sleep(0.01)
+        assert price == "2"
+        assert api.hits == 2
+
+
+async def test_none_and_exceptions_are_not_cached(monkeypatch):
+    async with running_api(monkeypatch) as (api, bot):
+        general = cogs.general.General(bot)
+        api.responses.append((500, "{}"))
+        api.responses.append((200, "not json"))
+        assert await general.fetch_bitcoin_price() is None
+        with pytest.raises(ValueError):
+            await general.fetch_bitcoin_price()
+        assert await general.fetch_bitcoin_price() == "3"
+        assert await general.fetch_bitcoin_price() == "3"
+        assert api.hits == 3
+
+
+async def test_cancelled_caller_does_not_cancel_shared_call(monkeypatch):
+    async with running_api(monkeypatch) as (api, bot):
+        general = cogs.general.General(bot)
+        api.gate = asyncio.Event()
+        cancelled = asyncio.create_task(general.fetch_bitcoin_price())
+        waiting = asyncio.create_task(general.fetch_bitcoin_price())
+        await until(lambda: api.hits == 1)
+        cancelled.cancel()
+        await asyncio.sleep(0.01)
+        api.gate.set()
+        assert await waiting == "1"
+        assert cancelled.cancelled()
+        assert await general.fetch_bitcoin_price() == "1"
+        assert api.hits == 1
+
+
+async def test_every_instance_has_its_own_cache(monkeypatch):
+    async with running_api(monkeypatch) as (api, bot):
+        general = cogs.general.General(bot)
+        assert await general.fetch_bitcoin_price() == "1"
+        # A reloaded cog starts with an empty cache, and the previous one can be collected
+        reloaded = cogs.general.General(bot)
+        assert await reloaded.fetch_bitcoin_price() == "2"
+        assert await general.fetch_bitcoin_price() == "1"
+        previous = weakref.ref(general)
+        del general
+        gc.collect()
+        assert previous() is None
+        assert await reloaded.fetch_bitcoin_price() == "2"
+        assert api.hits == 2
+
+
+async def test_prefetch_pool_refills_in_background(monkeypatch):
+    async with running_api(monkeypatch) as (api, bot):
+        fun = cogs.fun.Fun(bot)
+        pool = fun.facts
+        try:
+            # An empty pool fetches the value itself, then fills up behind the caller
+            assert await pool.get() == "Fact 1"
+            assert api.hits == 1
+            await until(lambda: len(pool.values) == pool.size)
+            assert api.hits == 1 + pool.size
+
+            # A prefetched value is returned without waiting for a request
+            assert await pool.get() in {f"Fact {number}" for number in range(2, 2 + pool.size)}
+            assert api.hits == 1 + pool.size
+            assert len(pool.values) == pool.size - 1
+            await until(lambda: len(pool.values) == pool.size)
+            assert api.hits == 2 + pool.size
+
+            # Failed fetches leave the pool short instead of filling it with errors
+            api.responses.append((500, "{}"))
+            await pool.get()
+            await pool.refill_task
+            assert len(pool.values) == pool.size - 1
+        finally:
+            await fun.cog_unload()
+
+
+async def test_prefetch_pool_returns_none_when_the_fetch_raises(monkeypatch):
+    async with running_api(monkeypatch) as (api, bot):
+        fun = cogs.fun.Fun(bot)
+        try:
+            api.responses.append((200, "not json"))
+            assert await fun.facts.get() is None
+            # The pool is refilled behind the failed call
+            await until(lambda: len(fun.facts.values) == fun.facts.size)
+            assert await fun.facts.get() is not None
+        finally:
+            await fun.cog_unload()
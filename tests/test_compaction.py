@@ -0,0 +1,72 @@
+import asyncio
+
+from helpers.compaction import HistoryCompactor
+from helpers.conversations import ConversationStore, estimate_tokens
+
+KEY = ConversationStore.key(1, 2, 3)
+SUMMARY = "The user and the assistant talked about many numbered questions. " * 10
+
+
+class FakeClient:
+    """
+    Stands in for the Gemini client, answering every summary request with the same summary.
+    """
+
+    def __init__(self) -> None:
+        self.prompts = []
+
+    async def generate(self, prompt, **kwargs) -> str:
+        self.prompts.append(prompt)
+        await asyncio.sleep(0)
+        return SUMMARY
+
+
+def prompt_tokens(history: list) -> int:
+    return sum(
+        estimate_tokens(part) for turn in history for part in turn["parts"] if isinstance(part, str)
+    )
+
+
+async def test_prompt_size_stays_bounded_over_10k_turns():
+    client = FakeClient()
+    compactor = HistoryCompactor(client, token_budget=2000, keep_turns=6)
+    # Without compaction the history would only be limited by these
+    store = ConversationStore(max_turns=100000, max_tokens=10**9, compactor=compactor)
+    exchange_tokens = 0
+    largest = 0
+    for number in range(5000):
+        user_text = f"Question number {number}, what do you think about it? " * 3
+        model_text = f"Answer number {number}, here is what I think about it. " * 6
+        exchange_tokens = max(exchange_tokens, estimate_tokens(user_text) + estimate_tokens(model_text))
+        history = await store.get_history(KEY)
+        store.record_request(KEY)
+        largest = max(largest, prompt_tokens(history))
+        await store.append(KEY, user_text, model_text)
+        await asyncio.gather(*store.compacting.values())
+
+    conversation = store.conversations[KEY]
+    assert len(conversation.turns) <= compactor.keep_turns + 2 * (
+        compactor.token_budget // exchange_tokens + 1
+    )
+    # The summary and its acknowledgement, the budget, and the exchange that went over it
+    bound = estimate_tokens(SUMMARY) + 20 + compactor.token_budget + exchange_tokens
+    assert largest <= bound
+    stats = compactor.stats()
+    assert stats["requests"] == 5000
+    assert stats["compactions"] == len(client.prompts) > 100
+    assert stats["tokens_saved"] > 0
+    # Every summary request only sends the folded turns and the previous summary
+    assert max(estimate_tokens(prompt) for prompt in client.prompts) <= bound + 200
+    await store.close()
+
+
+async def test_reading_the_history_is_not_a_model_request():
+    compactor = HistoryCompactor(FakeClient(), token_budget=100, keep_turns=2)
+    store = ConversationStore(compactor=compactor)
+    await store.append(KEY, "Hello", "Hi")
+    await store.get_history(KEY)
+    await store.get_history(KEY)
+    assert compactor.stats()["requests"] == 0
+    store.record_request(KEY)
+    assert compactor.stats()["requests"] == 1
+    await store.close()
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+import helpers.conversations
+from database.migrate import MigrationRunner
+from database.sqlite import SQLiteDatabase
+from helpers.conversations import ConversationStore
+
+A = ConversationStore.key(1, 2, 3)
+B = ConversationStore.key(1, 2, 4)
+C = ConversationStore.key(None, 5, 3)
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch):
+    """
+    The time seen by the conversation store, moved forward by the tests.
+    """
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(helpers.conversations, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+async def test_least_recently_used_conversation_is_evicted(clock):
+    store = ConversationStore(max_conversations=2)
+    await store.append(A, "Hello", "Hi")
+    await store.append(B, "Hello", "Hi")
+    # Reading A makes B the least recently used
+    assert len(await store.get_history(A)) == 2
+    await store.get(C)
+    assert list(store.conversations) == [A, C]
+    # An evicted conversation without a database starts over
+    assert await store.get_history(B) == []
+    assert list(store.conversations) == [C, B]
+
+
+async def test_idle_conversations_expire(clock):
+    store = ConversationStore(idle_timeout=100)
+    await store.append(A, "Hello", "Hi")
+    clock.now += 10
+    await store.append(B, "Hello", "Hi")
+    clock.now += 10
+    # Reading a conversation restarts its idle time, it moves behind B
+    await store.get(A)
+    assert list(store.conversations) == [B, A]
+
+    clock.now += 95
+    await store.get(C)
+    assert list(store.conversations) == [A, C]
+    clock.now += 10
+    assert await store.get_history(A) == []
+    assert list(store.conversations) == [C, A]
+
+
+async def test_reset_forgets_the_conversation(clock, tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "database.db"))
+    await database.connect()
+    try:
+        await MigrationRunner(database).run()
+        store = ConversationStore(database=database)
+        await store.append(A, "Hello", "Hi")
+        await store.append(B, "Hello", "Hi")
+        await store.reset(A)
+        assert list(store.conversations) == [B]
+        assert await database.fetchall("SELECT user_id FROM conversations") == [(4,)]
+        # Neither the memory nor a new store has the conversation anymore
+        assert await store.get_history(A) == []
+        assert await ConversationStore(database=database).get_history(A) == []
+        assert len(await ConversationStore(database=database).get_history(B)) == 2
+    finally:
+        await database.close()
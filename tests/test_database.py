@@ -0,0 +1,299 @@
+import asyncio
+import os
+
+import pytest
+
+from benchmarks import database as database_benchmark
+from database import DatabaseManager
+from database.backend import Database
+from database.batch import WriteBatcher
+from database.migrate import MIGRATIONS_FOLDER, MigrationRunner, discover_migrations
+from database.postgres import PostgresDatabase
+from database.sqlite import SQLiteDatabase
+from helpers.conversations import ConversationStore
+from helpers.response_cache import ResponseCache
+
+TABLES = ("warns", "conversations", "response_cache", "schema_migrations")
+
+GUILD_ID = 100000000000000000
+MODERATOR_ID = 200000000000000000
+MEMBER_IDS = 300000000000000000
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def open_database(request, tmp_path):
+    """
+    Returns a coroutine function opening an empty database of the backend, without its migrations.
+
+    The PostgreSQL cases run on the server of the ``postgres_dsn`` fixture, whose tables are dropped
+    first.
+    """
+    backend = request.param
+    dsn = request.getfixturevalue("postgres_dsn") if backend == "postgres" else None
+
+    async def open_database():
+        if backend == "postgres":
+            database = PostgresDatabase(dsn)
+            await database.connect()
+            for table in TABLES:
+                await database.execute(f"DROP TABLE IF EXISTS {table}")
+        else:
+            database = SQLiteDatabase(str(tmp_path / "database.db"))
+            await database.connect()
+        return database
+
+    return open_database
+
+
+async def open_migrated(open_database):
+    database = await open_database()
+    await MigrationRunner(database).run()
+    return database
+
+
+async def test_migrations_run_once(open_database):
+    database = await open_database()
+    try:
+        migrations = discover_migrations(os.path.join(MIGRATIONS_FOLDER, database.dialect))
+        assert await database.schema_version() == 0
+        applied = await MigrationRunner(database).run()
+        assert applied == migrations
+        assert await database.schema_version() == migrations[-1].version
+        assert await MigrationRunner(database).run() == []
+        rows = await database.fetchall("SELECT version, name FROM schema_migrations ORDER BY version")
+        assert rows == [(migration.version, migration.name) for migration in migrations]
+        for table in ("warns", "conversations", "response_cache"):
+            assert await database.fetchall(f"SELECT * FROM {table}") == []
+    finally:
+        await database.close()
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 100])
+async def test_concurrent_add_warn_allocates_consecutive_ids(open_database, batch_size):
+    database = await open_migrated(open_database)
+    manager = DatabaseManager(database=database, batch_size=batch_size)
+    try:
+        targets = [(GUILD_ID + number % 2, MEMBER_IDS + number % 3) for number in range(120)]
+        warn_ids = await asyncio.gather(
+            *(manager.add_warn(user_id, server_id, MODERATOR_ID, "Spam") for server_id, user_id in targets)
+        )
+        for target in set(targets):
+            ids = sorted(warn_id for other, warn_id in zip(targets, warn_ids) if other == target)
+            assert ids == list(range(1, targets.count(target) + 1))
+            # A manager with nothing cached reads the same warns from the database
+            server_id, user_id = target
+            rows = await DatabaseManager(database=database).get_warnings(user_id, server_id)
+            assert [row[5] for row in rows] == ids
+            assert rows == await manager.get_warnings(user_id, server_id)
+    finally:
+        await manager.close()
+
+
+async def test_remove_warn_counts_the_warns_left(open_database):
+    database = await open_migrated(open_database)
+    manager = DatabaseManager(database=database)
+    try:
+        for _ in range(4):
+            await manager.add_warn(MEMBER_IDS, GUILD_ID, MODERATOR_ID, "Spam")
+        # Cached warnings are updated in memory
+        assert await manager.remove_warn(2, MEMBER_IDS, GUILD_ID) == 3
+        # Without cached warnings, the ones left are read in the removal transaction
+        cold = DatabaseManager(database=database)
+        assert await cold.remove_warn(4, MEMBER_IDS, GUILD_ID) == 2
+        assert await cold.remove_warn(4, MEMBER_IDS, GUILD_ID) == 2
+        await cold.writes.close()
+        rows = await database.fetchall(
+            "SELECT id FROM warns WHERE server_id=? AND user_id=? ORDER BY id", (GUILD_ID, MEMBER_IDS)
+        )
+        assert rows == [(1,), (3,)]
+        # The next ID follows the last one left
+        assert await manager.add_warn(MEMBER_IDS, GUILD_ID, MODERATOR_ID, "Spam") == 4
+    finally:
+        await manager.close()
+
+
+async def test_warnings_written_by_another_process(open_database):
+    database = await open_migrated(open_database)
+    # Two managers on the same database, like two bot processes
+    manager = DatabaseManager(database=database)
+    other = DatabaseManager(database=database)
+    try:
+        await manager.add_warn(MEMBER_IDS, GUILD_ID, MODERATOR_ID, "Spam")
+        assert len(await manager.get_warnings(MEMBER_IDS, GUILD_ID)) == 1
+        await other.add_warn(MEMBER_IDS, GUILD_ID, MODERATOR_ID, "Spam")
+        warnings = await manager.get_warnings(MEMBER_IDS, GUILD_ID)
+        if database.dialect == "postgres":
+            # Nothing is cached, so the warn of the other process is seen right away
+            assert len(warnings) == 2
+            assert manager.cache.stats()["entries"] == 0
+        else:
+            # A SQLite file belongs to a single process, its warnings are cached
+            assert len(warnings) == 1
+            assert manager.cache.stats()["entries"] == 1
+    finally:
+        await other.writes.close()
+        await manager.close()
+
+
+async def test_failed_write_is_rolled_back_alone(open_database):
+    database = await open_migrated(open_database)
+    writes = WriteBatcher(database, batch_size=4, interval=1.0)
+
+    def insert(warn_id: int, *, fail: bool = False):
+        async def operation(connection) -> int:
+            await connection.execute(
+                "INSERT INTO warns(server_id, user_id, id, moderator_id, reason) VALUES (?, ?, ?, ?, ?)",
+                (GUILD_ID, MEMBER_IDS, warn_id, MODERATOR_ID, "Spam"),
+            )
+            if fail:
+                raise ValueError("Failed write")
+            return warn_id
+
+        return operation
+
+    try:
+        results = await asyncio.gather(
+            writes.submit(insert(1)),
+            writes.submit(insert(2, fail=True)),
+            # A constraint violation is rolled back by the database itself
+            writes.submit(insert(1)),
+            writes.submit(insert(3)),
+            return_exceptions=True,
+        )
+        assert results[0] == 1 and results[3] == 3
+        assert isinstance(results[1], ValueError)
+        assert isinstance(results[2], Exception)
+        assert writes.stats()["flushes"] == 1
+        rows = await database.fetchall("SELECT id FROM warns ORDER BY id")
+        assert rows == [(1,), (3,)]
+    finally:
+        await writes.close()
+        await database.close()
+
+
+def insert_warn(warn_id: int):
+    async def operation(connection) -> int:
+        await connection.execute(
+            "INSERT INTO warns(server_id, user_id, id, moderator_id, reason) VALUES (?, ?, ?, ?, ?)",
+            (GUILD_ID, MEMBER_IDS, warn_id, MODERATOR_ID, "Spam"),
+        )
+        return warn_id
+
+    return operation
+
+
+@pytest.mark.parametrize("batch_size, commits", [(1, 250), (100, 3), (250, 1)])
+async def test_burst_is_committed_in_batches(open_database, batch_size, commits):
+    database = await open_migrated(open_database)
+    writes = WriteBatcher(database, batch_size=batch_size, interval=1.0)
+    try:
+        results = await asyncio.gather(*(writes.submit(insert_warn(number)) for number in range(250)))
+        assert results == list(range(250))
+        assert writes.stats()["flushes"] == commits
+        assert writes.stats()["writes"] == 250
+        assert await database.fetchone("SELECT COUNT(*) FROM warns") == (250,)
+    finally:
+        await writes.close()
+        await database.close()
+
+
+async def test_partial_batch_waits_for_the_interval(open_database):
+    database = await open_migrated(open_database)
+    writes = WriteBatcher(database, batch_size=100, interval=0.05)
+    try:
+        first = asyncio.create_task(writes.submit(insert_warn(1)))
+        await asyncio.sleep(0.01)
+        # Joins the batch of the first write, which is still waiting for others
+        second = asyncio.create_task(writes.submit(insert_warn(2)))
+        assert await asyncio.gather(first, second) == [1, 2]
+        assert writes.stats()["flushes"] == 1
+    finally:
+        await writes.close()
+        await database.close()
+
+
+async def test_close_flushes_the_queued_writes(open_database):
+    database = await open_migrated(open_database)
+    writes = WriteBatcher(database, batch_size=100, interval=60.0)
+    try:
+        pending = [asyncio.create_task(writes.submit(insert_warn(number))) for number in range(3)]
+        await asyncio.sleep(0)
+        await asyncio.wait_for(writes.close(), 5.0)
+        assert await asyncio.gather(*pending) == [0, 1, 2]
+        assert writes.stats()["flushes"] == 1
+        with pytest.raises(RuntimeError):
+            await writes.submit(insert_warn(3))
+    finally:
+        await database.close()
+
+
+async def test_conversation_save_updates_the_row(open_database):
+    database = await open_migrated(open_database)
+    try:
+        key = ConversationStore.key(GUILD_ID, 2, MEMBER_IDS)
+        store = ConversationStore(database=database)
+        await store.append(key, "Hello", "Hi")
+        conversation = await store.get(key)
+        conversation.summary = "A greeting"
+        conversation.folded_tokens = 12
+        await store.append(key, "How are you?", "Fine")
+
+        rows = await database.fetchall("SELECT summary, folded_tokens FROM conversations")
+        assert rows == [("A greeting", 12)]
+        reloaded = await ConversationStore(database=database).get(key)
+        assert reloaded.turns == conversation.turns
+        assert len(reloaded.turns) == 4
+    finally:
+        await database.close()
+
+
+async def test_response_cache_set_updates_the_row(open_database):
+    database = await open_migrated(open_database)
+    try:
+        cache = ResponseCache(database=database, ttl=60)
+        key = cache.make_key("What is the capital of France?")
+        await cache.set(key, "Paris")
+        await cache.set(key, "Paris, of course")
+        assert await database.fetchall("SELECT key, response FROM response_cache") == [
+            (key, "Paris, of course")
+        ]
+        assert await ResponseCache(database=database, ttl=60).get(key) == "Paris, of course"
+
+        # Storing an answer drops the expired ones
+        await database.execute(
+            "INSERT INTO response_cache(key, response, created_at) VALUES (?, ?, ?)",
+            ("expired", "Old", 0.0),
+        )
+        await cache.set(cache.make_key("Another question"), "Another answer")
+        assert await database.fetchone("SELECT 1 FROM response_cache WHERE key=?", ("expired",)) is None
+    finally:
+        await database.close()
+
+
+async def test_burst_throughput(open_database, record_property):
+    # The same burst as the database benchmark, smaller. The warns per second of each backend are
+    # recorded in the report, only the number of commits is checked
+    commits = {}
+    for batch_size in (1, 100):
+        result = await database_benchmark.burst(
+            await open_database(), warns=300, members=10, batch_size=batch_size
+        )
+        record_property(f"warns_per_second_batch_{batch_size}", round(result["warns_per_second"]))
+        commits[batch_size] = result["commits"]
+    assert commits[1] == 300
+    assert commits[100] <= 300 // 100 + 1
+
+
+def test_backend_must_implement_the_whole_api():
+    class ReadOnlyDatabase(Database):
+        async def connect(self) -> None:
+            pass
+
+        async def close(self) -> None:
+            pass
+
+    with pytest.raises(TypeError, match="transaction"):
+        ReadOnlyDatabase()
+    # Both backends implement all of it
+    SQLiteDatabase(":memory:")
+    PostgresDatabase("postgresql://localhost/bot")
@@ -0,0 +1,91 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from cogs.Gemini import Template
+from helpers.conversations import ConversationStore
+from helpers.gemini import GeminiError
+from helpers.response_cache import ResponseCache
+
+
+class FakeMessage:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+    async def edit(self, *, content: str) -> None:
+        self.content = content
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.id = 2
+        self.messages = []
+
+    async def send(self, content: str) -> FakeMessage:
+        message = FakeMessage(content)
+        self.messages.append(message)
+        return message
+
+
+class FakeGemini:
+    """
+    Answers with ``chunks``, then fails with ``error`` if there is one.
+    """
+
+    def __init__(self, chunks: list, error: GeminiError = None) -> None:
+        self.chunks = chunks
+        self.error = error
+
+    async def chat(self, history, message, *, generation_config=None) -> str:
+        if self.error is not None:
+            raise self.error
+        return "".join(self.chunks)
+
+    async def stream(self, contents, *, generation_config=None):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+
+def make_cog(gemini: FakeGemini, *, stream: bool) -> Template:
+    bot = SimpleNamespace(
+        gemini=gemini,
+        logger=logging.getLogger("tests"),
+        response_cache=ResponseCache(),
+        conversations=ConversationStore(),
+        config={"gemini": {"stream": stream, "stream_edit_interval": 0.0}},
+    )
+    return Template(bot)
+
+
+def question(channel: FakeChannel) -> SimpleNamespace:
+    return SimpleNamespace(channel=channel, guild=None, author=SimpleNamespace(id=3))
+
+
+@pytest.mark.parametrize("stream", [False, True])
+# An answer may contain the error mark and still be an answer
+@pytest.mark.parametrize("chunks", [["Paris", " is the capital."], ["❌ means", " no."]])
+async def test_answer_is_cached(stream, chunks):
+    cog = make_cog(FakeGemini(chunks), stream=stream)
+    channel = FakeChannel()
+    answer = "".join(chunks)
+    assert await cog.reply_text(question(channel), [], "Capital of France?") == answer
+    cache = cog.bot.response_cache
+    assert await cache.get(cache.make_key("Capital of France?")) == answer
+    assert [message.content for message in channel.messages] == [answer]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("chunks", [[], ["Paris", " is"]])
+async def test_failed_answer_is_not_cached(stream, chunks):
+    cog = make_cog(FakeGemini(chunks, GeminiError("Quota exceeded")), stream=stream)
+    channel = FakeChannel()
+    response_text = await cog.reply_text(question(channel), [], "Capital of France?")
+    # The error is shown, after the part of the answer already streamed
+    expected = ("".join(chunks) if stream else "") + "❌Quota exceeded"
+    assert response_text == expected
+    assert [message.content for message in channel.messages] == [expected]
+    cache = cog.bot.response_cache
+    assert await cache.get(cache.make_key("Capital of France?")) is None
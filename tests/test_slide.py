@@ -0,0 +1,143 @@
+import logging
+import tempfile
+from types import SimpleNamespace
+
+import pptx
+import pytest
+
+from cogs.slide import GeneratePPT, SlideJob
+from helpers.gemini import GeminiError
+from helpers.slide_outline import OUTLINE_SCHEMA
+
+TAG_OUTLINE = (
+    "[L_TS][TITLE]Cats[/TITLE][SUBTITLE]A short deck[/SUBTITLE][SLIDEBREAK]"
+    "[L_CS][TITLE]Naps[/TITLE][CONTENT]Cats sleep all day.[/CONTENT][SLIDEBREAK]"
+    "[L_THS][TITLE]Thank you[/TITLE][SLIDEBREAK]"
+)
+
+
+class FakeGemini:
+    """
+    Answers the JSON outline request with ``answer``, raised if it is an exception, and streams the
+    tag outline in chunks.
+    """
+
+    def __init__(self, answer, tag_outline: str = TAG_OUTLINE) -> None:
+        self.answer = answer
+        self.tag_outline = tag_outline
+        self.requests = []
+
+    async def generate(self, contents, *, model_name: str, generation_config: dict = None) -> str:
+        self.requests.append(("generate", generation_config))
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+    async def stream(self, contents, *, model_name: str, generation_config: dict = None):
+        self.requests.append(("stream", generation_config))
+        for position in range(0, len(self.tag_outline), 7):
+            yield self.tag_outline[position : position + 7]
+
+
+@pytest.fixture
+def make_cog():
+    cogs = []
+
+    def make_cog(gemini: FakeGemini) -> GeneratePPT:
+        bot = SimpleNamespace(
+            gemini=gemini,
+            logger=logging.getLogger("tests"),
+            config={
+                "slides": {
+                    "workers": 1,
+                    "image_workers": 1,
+                    "queue_size": 1,
+                    "themes": {"default": "theme0.pptx"},
+                    "outline_mode": "json",
+                    "image_cache_folder": "",
+                    "image_cache_size_mb": 1,
+                }
+            },
+        )
+        cog = GeneratePPT(bot)
+        cog.themes.load()
+        cogs.append(cog)
+        return cog
+
+    yield make_cog
+    for cog in cogs:
+        cog.executor.shutdown()
+        cog.image_executor.shutdown()
+
+
+async def generate(cog: GeneratePPT) -> list:
+    job = SlideJob(None, "Cats", 3, "default")
+    try:
+        file_name, deck, timings = await cog.generate_ppt(job)
+    finally:
+        job.cleanup()
+    assert file_name == "Cats.pptx"
+    return [slide.shapes.title.text for slide in pptx.Presentation(deck).slides]
+
+
+async def test_json_outline_is_used_when_valid(make_cog):
+    gemini = FakeGemini(
+        '{"slides": [{"type": "title", "title": "Cats", "subtitle": "A short deck"},'
+        ' {"type": "thanks", "title": "Thank you"}]}'
+    )
+    assert await generate(make_cog(gemini)) == ["Cats", "Thank you"]
+    assert gemini.requests == [
+        ("generate", {"response_mime_type": "application/json", "response_schema": OUTLINE_SCHEMA})
+    ]
+
+
+@pytest.mark.parametrize(
+    "answer",
+    [
+        GeminiError("The model is overloaded"),
+        "Sure! Here is the outline you asked for.",
+        '{"slides": [{"type": "chart", "title": "Cats"}]}',
+        '{"slides": []}',
+    ],
+)
+async def test_tag_outline_is_streamed_when_the_json_outline_fails(make_cog, answer):
+    gemini = FakeGemini(answer)
+    assert await generate(make_cog(gemini)) == ["Cats", "Naps", "Thank you"]
+    assert [request for request, _ in gemini.requests] == ["generate", "stream"]
+
+
+async def test_outline_without_slides_is_an_error(make_cog):
+    cog = make_cog(FakeGemini('{"slides": []}', tag_outline="I cannot write this presentation."))
+    with pytest.raises(ValueError, match="did not write any slide"):
+        await cog.generate_ppt(SlideJob(None, "Cats", 3, "default"))
+
+
+async def test_image_cache_falls_back_to_a_temporary_folder(make_cog, tmp_path, monkeypatch):
+    # A file where the folder should be fails like a read-only install
+    blocked = tmp_path / "blocked"
+    blocked.write_bytes(b"")
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    cog = make_cog(FakeGemini(None))
+    cog.bot.config["slides"]["image_cache_folder"] = str(blocked / "slide_images")
+    await cog.cog_load()
+    try:
+        assert cog.image_cache.directory == str(tmp_path / "discord-bot-slide-images")
+        await cog.cache_set("photo:1:10x10", b"image")
+        assert await cog.cache_get("photo:1:10x10") == b"image"
+    finally:
+        await cog.cog_unload()
+
+
+async def test_images_are_not_cached_without_a_usable_folder(make_cog, tmp_path, monkeypatch):
+    blocked = tmp_path / "blocked"
+    blocked.write_bytes(b"")
+    monkeypatch.setattr(tempfile, "tempdir", str(blocked))
+    cog = make_cog(FakeGemini(None))
+    cog.bot.config["slides"]["image_cache_folder"] = str(blocked / "slide_images")
+    await cog.cog_load()
+    try:
+        assert cog.image_cache is None
+        await cog.cache_set("photo:1:10x10", b"image")
+        assert await cog.cache_get("photo:1:10x10") is None
+    finally:
+        await cog.cog_unload()
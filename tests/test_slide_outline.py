@@ -0,0 +1,99 @@
+import random
+
+import pydantic
+import pytest
+
+from helpers.slide_outline import OutlineParser, parse_json_outline, parse_outline
+
+# Pieces the random outlines are made of: every tag, text that looks like a tag but is not, and text
+PIECES = [
+    "[L_TS]", "[L_CS]", "[L_IS]", "[L_THS]", "[SLIDEBREAK]",
+    "[TITLE]", "[/TITLE]", "[SUBTITLE]", "[/SUBTITLE]",
+    "[CONTENT]", "[/CONTENT]", "[IMAGE]", "[/IMAGE]",
+    "[AI]", "[B]", "[/B]", "[TITLES]", "[L_T]", "[SLIDE]", "[/]", "[]", "[", "]", "[/", "[TITLE",
+    "[[TITLE]]", "[ TITLE]", "[title]",
+    "A", "b c", " ", "\n", "Some text. ", "x[y]z", "é ü",
+]
+
+
+def records(slides: list) -> list:
+    return [
+        (slide.kind, slide.title, slide.subtitle, slide.content, slide.image) for slide in slides
+    ]
+
+
+def parse_chunks(chunks: list) -> list:
+    parser = OutlineParser()
+    slides = []
+    for chunk in chunks:
+        slides += parser.feed(chunk)
+    return slides + parser.close()
+
+
+def random_chunks(text: str, rng: random.Random) -> list:
+    chunks = []
+    position = 0
+    while position < len(text):
+        size = rng.choice([1, 1, 2, 3, 5, 8, 16, 64])
+        chunks.append(text[position : position + size])
+        position += size
+    return chunks
+
+
+def test_unknown_bracketed_text_is_kept():
+    slides = parse_outline(
+        "[L_CS][TITLE]A [B] c[/TITLE][CONTENT]Ask the [AI] about [x] and [/y][/CONTENT][SLIDEBREAK]"
+    )
+    assert records(slides) == [("content", "A [B] c", "", "Ask the [AI] about [x] and [/y]", "")]
+
+
+@pytest.mark.parametrize(
+    "chunks, title",
+    [
+        (["[L_CS][TITLE]A [", "B] c[/TITLE][SLIDEBREAK]"], "A [B] c"),
+        (["[L_CS][TITLE]A [B", "] c[/TIT", "LE][SLIDE", "BREAK]"], "A [B] c"),
+        (["[L_CS][TITLE", "]A [AI]", " c[/TITLE", "][SLIDEBREAK]"], "A [AI] c"),
+    ],
+)
+def test_tags_split_across_chunks(chunks, title):
+    assert records(parse_chunks(chunks)) == [("content", title, "", "", "")]
+
+
+def test_any_chunking_equals_whole_text():
+    rng = random.Random(13)
+    for _ in range(2000):
+        text = "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 40)))
+        expected = records(parse_outline(text))
+        for _ in range(5):
+            assert records(parse_chunks(random_chunks(text, rng))) == expected, text
+        # One character at a time is the worst case for tags split across chunks
+        assert records(parse_chunks(list(text))) == expected, text
+
+
+def test_json_outline_is_stripped_into_records():
+    slides = parse_json_outline(
+        '{"slides": [{"type": "title", "title": " Cats ", "subtitle": "And dogs"},'
+        ' {"type": "image", "title": "Naps", "content": "All day", "image_query": "sleeping cat "}]}'
+    )
+    assert records(slides) == [
+        ("title", "Cats", "And dogs", "", ""),
+        ("image", "Naps", "", "All day", "sleeping cat"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "Here is your outline: [L_TS][TITLE]Cats[/TITLE]",
+        '{"slides": [{"type": "title", "title": "Cats"}',
+        '{"slides": [{"type": "chart", "title": "Cats"}]}',
+        '{"slides": [{"type": "content"}]}',
+        '{"slides": {"type": "title", "title": "Cats"}}',
+        '{"slides": []}',
+        "{}",
+    ],
+)
+def test_invalid_json_outline_is_rejected(text):
+    with pytest.raises(pydantic.ValidationError):
+        parse_json_outline(text)